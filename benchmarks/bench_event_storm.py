@@ -0,0 +1,355 @@
+"""Replay state_changed storms into Homebase42 and measure the reaction.
+
+Runs on the offline Home Assistant test harness
+(pytest-homeassistant-custom-component must be installed). From the
+repository root:
+
+    python benchmarks/bench_event_storm.py --entities 10000 --storm 0.3 --rate 5000
+    python benchmarks/bench_event_storm.py --replay storm.ndjson --speed 2
+    python benchmarks/bench_event_storm.py --storm 0.5 --save storm.ndjson
+
+A synthetic home is built (see synthetic_home.py) and the integration is set
+up. Then a stream of state changes is replayed: either a generated reconnect
+storm (a share of the entities goes unavailable and comes back, several
+cycles, at a fixed rate) or a recorded stream. Recordings are JSON lists or
+NDJSON files with one change per line, either
+
+    {"time": 0.25, "entity_id": "sensor.x", "state": "unavailable", "attributes": {}}
+
+(time in seconds from the start) or state_changed events as delivered by the
+websocket API (subscribe_events), replayed at their original pace times
+--speed.
+
+Measured are
+- the event loop lag (a probe sleeping --probe-interval, the lag is the
+  time it woke up late),
+- the latency of the health entities (from the last replayed change before a
+  state write of a Homebase42 entity to that write) and the time until they
+  settle after the last change,
+- the state writes per Homebase42 entity and the events handled by the
+  integration (runtime metrics).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import random
+import statistics
+import time
+from typing import Any
+
+# Also puts the repository root on sys.path
+from synthetic_home import async_setup_homebase42, async_test_hass, populate_home
+
+from homeassistant.const import EVENT_STATE_CHANGED, STATE_UNAVAILABLE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from custom_components.homebase42.const import (
+    CONF_FLAPPING_THRESHOLD,
+    DEFAULT_FLAPPING_THRESHOLD,
+    DOMAIN,
+)
+from custom_components.homebase42.metrics import METRIC_EVENTS, METRIC_HEALTH_UPDATES
+
+# Interval of the replay loop, changes due within one tick are set together
+REPLAY_TICK = 0.005
+
+
+@dataclass(slots=True)
+class Change:
+    """A state change of the replayed stream."""
+
+    offset: float
+    entity_id: str
+    state: str
+    attributes: dict[str, Any] | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the change in the recording format."""
+        change: dict[str, Any] = {
+            "time": round(self.offset, 6),
+            "entity_id": self.entity_id,
+            "state": self.state,
+        }
+        if self.attributes is not None:
+            change["attributes"] = self.attributes
+        return change
+
+
+def generate_storm(
+    states: dict[str, tuple[str, dict[str, Any]]],
+    share: float,
+    cycles: int,
+    rate: float,
+    outage: float,
+    seed: int = 42,
+) -> list[Change]:
+    """Return reconnect storms: entities go unavailable and come back.
+
+    Every cycle a random share of the available entities drops out at the
+    given rate (changes per second) and, after the outage, comes back with
+    its previous state in a different order.
+    """
+    rnd = random.Random(seed)
+    available = [
+        entity_id for entity_id, (state, _) in states.items() if state != STATE_UNAVAILABLE
+    ]
+    affected = rnd.sample(available, int(len(available) * share))
+    changes: list[Change] = []
+    offset = 0.0
+    for _ in range(cycles):
+        rnd.shuffle(affected)
+        for entity_id in affected:
+            changes.append(Change(offset, entity_id, STATE_UNAVAILABLE))
+            offset += 1 / rate
+        offset += outage
+        rnd.shuffle(affected)
+        for entity_id in affected:
+            state, attributes = states[entity_id]
+            changes.append(Change(offset, entity_id, state, attributes))
+            offset += 1 / rate
+        offset += outage
+    return changes
+
+
+def _iter_recording(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the records of a JSON list or an NDJSON file."""
+    with path.open(encoding="utf-8") as file:
+        first = file.read(1)
+        file.seek(0)
+        if first == "[":
+            yield from json.load(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_recording(path: Path) -> list[Change]:
+    """Load a recorded stream (offsets relative to the first change)."""
+    changes: list[Change] = []
+    start: float | None = None
+    for record in _iter_recording(path):
+        if "event_type" in record:
+            # state_changed event of the websocket API
+            if record["event_type"] != EVENT_STATE_CHANGED:
+                continue
+            data = record["data"]
+            if (new_state := data.get("new_state")) is None:
+                continue
+            fired = dt_util.parse_datetime(record["time_fired"])
+            if fired is None:
+                continue
+            offset = fired.timestamp()
+            change = Change(
+                offset, data["entity_id"], new_state["state"], new_state.get("attributes")
+            )
+        else:
+            offset = float(record["time"])
+            change = Change(
+                offset, record["entity_id"], record["state"], record.get("attributes")
+            )
+        if start is None:
+            start = offset
+        change.offset = offset - start
+        changes.append(change)
+    changes.sort(key=lambda change: change.offset)
+    return changes
+
+
+def _percentile(values: list[float], share: float) -> float:
+    """Return a percentile (nearest rank) of values."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def _summary_ms(values: list[float]) -> dict[str, float]:
+    """Return median, p99 and max (ms) of durations in seconds."""
+    return {
+        "p50_ms": round(_percentile(values, 0.5) * 1000, 3),
+        "p99_ms": round(_percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(max(values, default=0.0) * 1000, 3),
+    }
+
+
+def _latencies(changed_at: list[float], written_at: list[float]) -> list[float]:
+    """Return the time from the last change before every write to the write."""
+    latencies = []
+    for written in written_at:
+        if position := bisect_right(changed_at, written):
+            latencies.append(written - changed_at[position - 1])
+    return latencies
+
+
+async def _async_probe_loop(interval: float, lags: list[float], stop: asyncio.Event) -> None:
+    """Sleep interval in a loop and record how late the loop woke up."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(time.perf_counter() - start - interval, 0.0))
+
+
+async def async_replay(
+    hass: HomeAssistant, entry_id: str, changes: list[Change], speed: float, probe: float
+) -> dict[str, Any]:
+    """Replay the changes and measure lag, latency and state writes."""
+    entity_reg = er.async_get(hass)
+    own = {
+        entity.entity_id
+        for entity in er.async_entries_for_config_entry(entity_reg, entry_id)
+    }
+    metrics = hass.data[DOMAIN][entry_id]["metrics"]
+    events_before = metrics.timings[METRIC_EVENTS].count
+    updates_before = metrics.timings[METRIC_HEALTH_UPDATES].count
+    loop_time_before = metrics.loop_time
+
+    writes: Counter[str] = Counter()
+    # Wall clock times (like State.last_updated) of the replayed changes and
+    # of the writes; the listener may run long after a write during a burst
+    changed_at: list[float] = []
+    written_at: list[float] = []
+
+    @callback
+    def _async_own_write(event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        if entity_id not in own or (new_state := event.data["new_state"]) is None:
+            return
+        writes[entity_id] += 1
+        written_at.append(new_state.last_updated.timestamp())
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _async_own_write)
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe_task = hass.async_create_background_task(
+        _async_probe_loop(probe, lags, stop), "homebase42 loop lag probe"
+    )
+    try:
+        start = time.perf_counter()
+        position = 0
+        while position < len(changes):
+            elapsed = (time.perf_counter() - start) * speed
+            while position < len(changes) and changes[position].offset <= elapsed:
+                change = changes[position]
+                attributes = change.attributes
+                if attributes is None and (state := hass.states.get(change.entity_id)):
+                    attributes = state.attributes
+                changed_at.append(time.time())
+                hass.states.async_set(change.entity_id, change.state, attributes)
+                position += 1
+            await asyncio.sleep(REPLAY_TICK)
+        replay_end = time.perf_counter()
+        await hass.async_block_till_done()
+        # Let the probe see the loop idle once more
+        await asyncio.sleep(probe * 2)
+    finally:
+        stop.set()
+        await probe_task
+        unsub()
+
+    duration = replay_end - start
+    return {
+        "changes": len(changes),
+        "duration_s": round(duration, 3),
+        "rate_per_s": round(len(changes) / duration, 1) if duration else 0.0,
+        "loop_lag": {
+            **_summary_ms(lags),
+            "mean_ms": round(statistics.fmean(lags) * 1000, 3) if lags else 0.0,
+            "samples": len(lags),
+        },
+        "health_latency": _summary_ms(_latencies(changed_at, written_at)),
+        "settle_ms": round(
+            max(max(written_at, default=0.0) - changed_at[-1], 0.0) * 1000, 3
+        )
+        if changed_at
+        else 0.0,
+        "state_writes": sum(writes.values()),
+        "state_writes_per_entity": dict(writes.most_common()),
+        "events_handled": metrics.timings[METRIC_EVENTS].count - events_before,
+        "health_updates": metrics.timings[METRIC_HEALTH_UPDATES].count - updates_before,
+        "loop_time_ms": round((metrics.loop_time - loop_time_before) * 1000, 3),
+    }
+
+
+async def async_run(args: argparse.Namespace) -> dict[str, Any]:
+    """Build the home, set up the integration and replay the stream."""
+    async with async_test_hass() as hass:
+        home = populate_home(hass, args.entities)
+        if args.replay:
+            changes = load_recording(args.replay)
+        else:
+            changes = generate_storm(
+                home.states, args.storm, args.cycles, args.rate, args.outage
+            )
+        if args.save:
+            with args.save.open("w", encoding="utf-8") as file:
+                for change in changes:
+                    file.write(json.dumps(change.as_dict()) + "\n")
+
+        entry = await async_setup_homebase42(
+            hass, {CONF_FLAPPING_THRESHOLD: args.flapping_threshold}
+        )
+        result = await async_replay(
+            hass, entry.entry_id, changes, args.speed, args.probe_interval
+        )
+        result["home"] = home.as_dict()
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        return result
+
+
+def _print_result(result: dict[str, Any]) -> None:
+    """Print the measurements."""
+    print(
+        f"{result['changes']} changes in {result['duration_s']} s "
+        f"({result['rate_per_s']}/s)"
+    )
+    for key in ("loop_lag", "health_latency"):
+        values = result[key]
+        print(
+            f"{key:20} p50 {values['p50_ms']:9.3f} ms  p99 {values['p99_ms']:9.3f} ms"
+            f"  max {values['max_ms']:9.3f} ms"
+        )
+    print(f"{'settle':20} {result['settle_ms']:.3f} ms")
+    print(
+        f"{'state writes':20} {result['state_writes']} "
+        f"(events handled {result['events_handled']}, "
+        f"health updates {result['health_updates']}, "
+        f"loop time {result['loop_time_ms']:.1f} ms)"
+    )
+    for entity_id, count in result["state_writes_per_entity"].items():
+        print(f"  {entity_id:50} {count}")
+
+
+def main() -> None:
+    """Run the replay."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=10000)
+    parser.add_argument("--replay", type=Path, help="replay a recorded stream (JSON or NDJSON)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument("--storm", type=float, default=0.3, help="share of entities dropping out")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=5000, help="changes per second")
+    parser.add_argument("--outage", type=float, default=2.0, help="seconds between the waves")
+    parser.add_argument("--flapping-threshold", type=int, default=DEFAULT_FLAPPING_THRESHOLD)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--save", type=Path, help="write the replayed stream as NDJSON")
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(async_run(args))
+    _print_result(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
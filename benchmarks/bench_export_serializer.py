@@ -0,0 +1,100 @@
+"""Benchmark the state export serializers on a synthetic home.
+
+Run from the repository root with Home Assistant installed:
+
+    python benchmarks/bench_export_serializer.py --entities 20000
+
+Prints the time for building and serializing the export document with every
+serializer in ``export.SERIALIZERS`` and the speedup against stdlib json.
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timedelta, timezone
+from enum import StrEnum
+from pathlib import Path
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.homebase42.export import (  # noqa: E402
+    SERIALIZER_JSON,
+    SERIALIZERS,
+    build_export_data,
+)
+
+
+class _Category(StrEnum):
+    """Stand-in for EntityCategory."""
+
+    DIAGNOSTIC = "diagnostic"
+
+
+def make_snapshot(count: int) -> list[tuple]:
+    """Create a snapshot with a realistic mix of domains and attributes."""
+    now = datetime.now(timezone.utc)
+    domains = ["sensor", "binary_sensor", "light", "switch", "cover", "climate"]
+    snapshot = []
+    for i in range(count):
+        domain = domains[i % len(domains)]
+        attributes = {
+            "friendly_name": f"Entity {i}",
+            "device_class": "temperature" if domain == "sensor" else None,
+            "unit_of_measurement": "°C" if domain == "sensor" else None,
+            "icon": "mdi:thermometer",
+            "last_reset": now - timedelta(days=1),
+            "options": {"mode", "auto", "eco"},
+            "forecast": [
+                {"datetime": now + timedelta(hours=h), "temperature": 20.5 + h}
+                for h in range(4 if i % 50 == 0 else 0)
+            ],
+            "rgb_color": (255, 128, 0),
+        }
+        snapshot.append(
+            (
+                f"{domain}.entity_{i}",
+                domain,
+                str(i % 100),
+                attributes,
+                now,
+                now,
+                f"Raum {i % 40}",
+                (_Category.DIAGNOSTIC if i % 7 == 0 else None, False, False, "demo", None),
+            )
+        )
+    return snapshot
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    snapshot = make_snapshot(args.entities)
+    header = {"export_timestamp": datetime.now().isoformat()}
+    export_data = build_export_data(header, {}, snapshot)
+
+    results: dict[str, tuple[float, int]] = {}
+    for name, serializer in SERIALIZERS.items():
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            payload = serializer(export_data)
+            timings.append(time.perf_counter() - start)
+        results[name] = (statistics.median(timings), len(payload))
+
+    baseline = results[SERIALIZER_JSON][0]
+    print(f"{args.entities} entities, median of {args.rounds} rounds")
+    for name, (seconds, size) in results.items():
+        print(
+            f"  {name:8} {seconds * 1000:9.1f} ms  {size / 1_000_000:6.1f} MB"
+            f"  x{baseline / seconds:4.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Benchmark how Homebase42 scales with the size of the home.
+
+Runs on the offline Home Assistant test harness
+(pytest-homeassistant-custom-component must be installed). From the
+repository root:
+
+    python benchmarks/bench_scaling.py --sizes 1000,10000,50000 --json results.json
+    python benchmarks/bench_scaling.py --compare results.json
+
+For every size a synthetic home is built (see synthetic_home.py) and the
+integration is set up. Measured are the setup, one update of all health
+entities (median over the rounds), the state export in both formats and the
+peak memory of the health updates and the export (tracemalloc, in a separate
+pass so the timings are not affected). The results can be written as JSON
+and compared with an earlier run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+# Also puts the repository root on sys.path
+from synthetic_home import async_setup_homebase42, async_test_hass, populate_home
+
+from homeassistant.const import __version__ as HA_VERSION
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from custom_components.homebase42.const import DOMAIN, SIGNAL_OPTIONS_UPDATED
+from custom_components.homebase42.export import index_path_for
+from custom_components.homebase42.metrics import METRIC_HEALTH_UPDATES
+from custom_components.homebase42.services import async_export_states
+
+RESULTS_VERSION = 1
+FORMATS = ("json", "ndjson")
+# Metrics where a higher value is worse (all measured ones)
+COMPARED = (
+    "setup_ms",
+    "health_update_ms",
+    "health_update_max_entity_ms",
+    "health_update_peak_kb",
+    "export_json_ms",
+    "export_json_peak_kb",
+    "export_json_bytes",
+    "export_ndjson_ms",
+    "export_ndjson_peak_kb",
+    "export_ndjson_bytes",
+)
+
+
+async def _async_health_update(hass: HomeAssistant, entry_id: str) -> float:
+    """Update all health entities once, return the seconds until done."""
+    start = time.perf_counter()
+    # Same signal as an options change: every health entity re-evaluates
+    async_dispatcher_send(hass, f"{SIGNAL_OPTIONS_UPDATED}_{entry_id}")
+    await hass.async_block_till_done()
+    return time.perf_counter() - start
+
+
+async def _async_export(hass: HomeAssistant, entry, path: Path, file_format: str) -> float:
+    """Export once, return the seconds until the file is written."""
+    start = time.perf_counter()
+    await async_export_states(hass, entry, str(path), file_format=file_format)
+    return time.perf_counter() - start
+
+
+def _export_size(path: Path, file_format: str) -> int:
+    """Return the bytes written by an export (with the NDJSON index)."""
+    path = path.with_suffix(f".{file_format}")
+    size = path.stat().st_size
+    if file_format == "ndjson":
+        size += index_path_for(path).stat().st_size
+    return size
+
+
+async def _async_peak(coro) -> int:
+    """Return the peak of traced memory (KiB) while awaiting coro."""
+    tracemalloc.start()
+    try:
+        await coro
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+async def async_bench_size(entities: int, rounds: int) -> dict[str, Any]:
+    """Run the benchmark for one home size."""
+    async with async_test_hass() as hass:
+        home = populate_home(hass, entities)
+        result: dict[str, Any] = {"home": home.as_dict()}
+
+        start = time.perf_counter()
+        entry = await async_setup_homebase42(hass)
+        result["setup_ms"] = (time.perf_counter() - start) * 1000
+        entry_data = hass.data[DOMAIN][entry.entry_id]
+        metrics = entry_data["metrics"]
+
+        # Health entities (first pass warms up the caches)
+        await _async_health_update(hass, entry.entry_id)
+        health_timing = metrics.timings[METRIC_HEALTH_UPDATES]
+        health_timing.max = 0.0
+        timings = [
+            await _async_health_update(hass, entry.entry_id) for _ in range(rounds)
+        ]
+        result["health_update_ms"] = statistics.median(timings) * 1000
+        # Slowest single entity
+        result["health_update_max_entity_ms"] = health_timing.max * 1000
+        result["health_update_peak_kb"] = await _async_peak(
+            _async_health_update(hass, entry.entry_id)
+        )
+
+        # Export
+        path = Path(hass.config.path("bench_export"))
+        for file_format in FORMATS:
+            timings = [
+                await _async_export(hass, entry, path, file_format) for _ in range(rounds)
+            ]
+            result[f"export_{file_format}_ms"] = statistics.median(timings) * 1000
+            result[f"export_{file_format}_bytes"] = _export_size(path, file_format)
+            result[f"export_{file_format}_peak_kb"] = await _async_peak(
+                _async_export(hass, entry, path, file_format)
+            )
+
+        result["sizes"] = {
+            key: entry_data[key].size
+            for key in ("index", "unavailable", "stale", "flapping", "batteries")
+        }
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        return result
+
+
+def _print_results(results: dict[str, dict[str, Any]]) -> None:
+    """Print one column per home size."""
+    sizes = list(results)
+    print(f"{'':30}" + "".join(f"{size:>14}" for size in sizes))
+    for key in COMPARED:
+        values = [results[size][key] for size in sizes]
+        print(f"{key:30}" + "".join(f"{value:14.1f}" for value in values))
+
+
+def _print_comparison(results: dict[str, dict[str, Any]], baseline: dict[str, Any]) -> None:
+    """Print the change against an earlier run (ratio, above 1 is slower or bigger)."""
+    print(
+        f"\nCompared with {baseline['timestamp']} "
+        f"(Home Assistant {baseline['homeassistant']})"
+    )
+    sizes = [size for size in results if size in baseline["results"]]
+    print(f"{'':30}" + "".join(f"{size:>14}" for size in sizes))
+    for key in COMPARED:
+        ratios = []
+        for size in sizes:
+            old = baseline["results"][size].get(key)
+            new = results[size][key]
+            ratios.append(f"x{new / old:.2f}" if old else "-")
+        print(f"{key:30}" + "".join(f"{ratio:>14}" for ratio in ratios))
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write the results to this file")
+    parser.add_argument("--compare", type=Path, help="compare with an earlier results file")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, Any]] = {}
+    for size in (int(size) for size in args.sizes.split(",")):
+        print(f"Benchmarking {size} entities ...", file=sys.stderr)
+        results[str(size)] = asyncio.run(async_bench_size(size, args.rounds))
+
+    _print_results(results)
+    if args.compare:
+        _print_comparison(results, json.loads(args.compare.read_text()))
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "version": RESULTS_VERSION,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "homeassistant": HA_VERSION,
+                    "rounds": args.rounds,
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Synthetic homes for the Homebase42 benchmarks.
+
+Builds floors, areas, devices and entities in the registries of a test Home
+Assistant instance (pytest-homeassistant-custom-component) and sets their
+states. The mix follows a typical installation: devices with a handful of
+entities each, battery powered sensors, a few unavailable, hidden and
+disabled entities and entities without a device.
+"""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+import random
+import sys
+import tempfile
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# homeassistant.core before the loader (circular import otherwise)
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant import loader  # noqa: E402
+from homeassistant.const import STATE_UNAVAILABLE  # noqa: E402
+from homeassistant.helpers import (  # noqa: E402
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+    floor_registry as fr,
+)
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from custom_components.homebase42.const import DOMAIN  # noqa: E402
+
+# Integrations the synthetic entities belong to
+PLATFORMS = ("zha", "mqtt", "hue", "shelly", "esphome", "homematicip_cloud")
+FLOORS = ("Keller", "Erdgeschoss", "Obergeschoss", "Dachgeschoss")
+AREAS_PER_FLOOR = 8
+
+# (domain, device_class, unit, state factory) of the entities of a device
+DEVICE_ENTITIES: tuple[tuple[str, str | None, str | None, Any], ...] = (
+    ("sensor", "temperature", "°C", lambda rnd: f"{rnd.uniform(15, 25):.1f}"),
+    ("sensor", "humidity", "%", lambda rnd: f"{rnd.uniform(30, 70):.0f}"),
+    ("sensor", "battery", "%", lambda rnd: str(rnd.randint(0, 100))),
+    ("binary_sensor", "window", None, lambda rnd: rnd.choice(("on", "off"))),
+    ("light", None, None, lambda rnd: rnd.choice(("on", "off"))),
+    ("switch", None, None, lambda rnd: rnd.choice(("on", "off"))),
+    ("sensor", "power", "W", lambda rnd: f"{rnd.uniform(0, 2000):.1f}"),
+    ("cover", None, None, lambda rnd: rnd.choice(("open", "closed"))),
+)
+
+# Share of entities that are unavailable, hidden or disabled
+UNAVAILABLE_RATIO = 0.02
+HIDDEN_RATIO = 0.01
+DISABLED_RATIO = 0.01
+# Share of entities without a device (helpers, templates)
+WITHOUT_DEVICE_RATIO = 0.1
+
+
+@dataclass(slots=True)
+class SyntheticHome:
+    """Entities of a synthetic home."""
+
+    entities: int = 0
+    devices: int = 0
+    areas: int = 0
+    batteries: int = 0
+    unavailable: int = 0
+    hidden: int = 0
+    disabled: int = 0
+    # entity_id -> (state, attributes) of the entities with a state
+    states: dict[str, tuple[str, dict[str, Any]]] = field(default_factory=dict)
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the counts."""
+        return {
+            "entities": self.entities,
+            "devices": self.devices,
+            "areas": self.areas,
+            "batteries": self.batteries,
+            "unavailable": self.unavailable,
+            "hidden": self.hidden,
+            "disabled": self.disabled,
+        }
+
+
+@asynccontextmanager
+async def async_test_hass() -> AsyncIterator[HomeAssistant]:
+    """Return a test instance with custom integrations enabled.
+
+    The config directory is a temporary directory, so the blueprints and
+    stores written by the integration are removed afterwards.
+    """
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(storage_dir=config_dir) as hass:
+            hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+            try:
+                yield hass
+            finally:
+                await hass.async_stop(force=True)
+
+
+def populate_home(hass: HomeAssistant, entities: int, seed: int = 42) -> SyntheticHome:
+    """Create a home with about the given number of entities."""
+    rnd = random.Random(seed)
+    home = SyntheticHome()
+    floor_reg = fr.async_get(hass)
+    area_reg = ar.async_get(hass)
+    device_reg = dr.async_get(hass)
+    entity_reg = er.async_get(hass)
+
+    area_ids: list[str] = []
+    for floor_name in FLOORS:
+        floor = floor_reg.async_create(floor_name)
+        for number in range(AREAS_PER_FLOOR):
+            area = area_reg.async_create(f"{floor_name} Raum {number + 1}")
+            area_reg.async_update(area.id, floor_id=floor.floor_id)
+            area_ids.append(area.id)
+    home.areas = len(area_ids)
+
+    device_entry = MockConfigEntry(domain="demo")
+    device_entry.add_to_hass(hass)
+
+    device_id: str | None = None
+    position = len(DEVICE_ENTITIES)
+    for number in range(entities):
+        if position >= len(DEVICE_ENTITIES):
+            # Next device (or a group of entities without one)
+            position = rnd.randrange(len(DEVICE_ENTITIES) // 2)
+            platform = rnd.choice(PLATFORMS)
+            device_id = None
+            if rnd.random() >= WITHOUT_DEVICE_RATIO:
+                device = device_reg.async_get_or_create(
+                    config_entry_id=device_entry.entry_id,
+                    identifiers={(platform, f"device_{number}")},
+                    name=f"Gerät {number}",
+                )
+                device_reg.async_update_device(device.id, area_id=rnd.choice(area_ids))
+                device_id = device.id
+                home.devices += 1
+        domain, device_class, unit, state_factory = DEVICE_ENTITIES[position]
+        position += 1
+
+        hidden = rnd.random() < HIDDEN_RATIO
+        disabled = not hidden and rnd.random() < DISABLED_RATIO
+        entry = entity_reg.async_get_or_create(
+            domain,
+            platform,
+            f"entity_{number}",
+            suggested_object_id=f"{device_class or domain}_{number}",
+            device_id=device_id,
+            hidden_by=er.RegistryEntryHider.USER if hidden else None,
+            disabled_by=er.RegistryEntryDisabler.USER if disabled else None,
+        )
+        if device_id is None and rnd.random() < 0.5:
+            entity_reg.async_update_entity(entry.entity_id, area_id=rnd.choice(area_ids))
+        home.entities += 1
+        home.hidden += hidden
+        home.disabled += disabled
+        if disabled:
+            continue
+
+        if rnd.random() < UNAVAILABLE_RATIO:
+            state = STATE_UNAVAILABLE
+            home.unavailable += 1
+        else:
+            state = state_factory(rnd)
+        attributes: dict[str, Any] = {"friendly_name": f"{device_class or domain} {number}"}
+        if device_class:
+            attributes["device_class"] = device_class
+        if unit:
+            attributes["unit_of_measurement"] = unit
+            attributes["state_class"] = "measurement"
+        if device_class == "battery":
+            home.batteries += 1
+        hass.states.async_set(entry.entity_id, state, attributes)
+        home.states[entry.entity_id] = (state, attributes)
+    return home
+
+
+async def async_setup_homebase42(
+    hass: HomeAssistant, options: dict[str, Any] | None = None
+) -> MockConfigEntry:
+    """Set up the integration (the automatic export is disabled)."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        options={"export_states_enabled": False, **(options or {})},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
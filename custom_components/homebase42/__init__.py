@@ -2,31 +2,53 @@
 from __future__ import annotations
 
 import logging
-from pathlib import Path
-import shutil
+import time
 from typing import TYPE_CHECKING
 
-from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import issue_registry as ir
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.start import async_at_started
 
 from .const import (
     DOMAIN,
-    BLUEPRINTS_CORE,
-    BLUEPRINTS_OPTIONAL,
-    OPTIONAL_BLUEPRINTS,
-    TEMPLATES_OPTIONAL,
-    OPTIONAL_TEMPLATES,
+    CONF_CONFIGURE_FORWARDER,
+    CONF_CONFIGURE_KEYPAD,
+    CONF_CONFIGURE_SHUTTERS,
+    CONF_TEMPLATE_WEATHER,
+    CONF_BATTERY_CRITICAL_THRESHOLD,
+    CONF_FLAPPING_THRESHOLD,
+    CONF_FLAPPING_WINDOW,
+    CONF_STALE_THRESHOLDS,
     CONF_WEATHER_ENTITY,
+    DEFAULT_CONFIGURE_FORWARDER,
+    DEFAULT_CONFIGURE_KEYPAD,
+    DEFAULT_CONFIGURE_SHUTTERS,
+    DEFAULT_TEMPLATE_WEATHER,
+    DEFAULT_BATTERY_CRITICAL,
+    DEFAULT_FLAPPING_THRESHOLD,
+    DEFAULT_FLAPPING_WINDOW,
+    DEFAULT_STALE_THRESHOLDS,
     DEFAULT_WEATHER_ENTITY,
+    EXPORT_OPTIONS,
+    FORWARDER_OPTIONS,
+    HEALTH_RULE_OPTIONS,
+    KEYPAD_OPTIONS,
+    RELOAD_OPTIONS,
     REPAIR_RESTART_REQUIRED,
+    SHUTTER_OPTIONS,
+    SIGNAL_OPTIONS_UPDATED,
 )
-from .services import async_setup_services, async_unload_services
 
+# The integration modules are imported where they are used: the export worker
+# process imports this package and must not load the whole integration
 if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
     from homeassistant.helpers.typing import ConfigType
 
+    from .assets import AssetChange
+
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[Platform] = [
@@ -37,219 +59,326 @@ PLATFORMS: list[Platform] = [
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Homebase42 component."""
+    from .health import HealthSets
+    from .websocket_api import async_setup_websocket
+    
     hass.data.setdefault(DOMAIN, {})
     
+    # Entity sets of the health entities, kept across reloads of the entry so
+    # websocket subscribers keep getting consistent differences
+    hass.data[DOMAIN]["health_sets"] = HealthSets()
+    async_setup_websocket(hass)
+    
     # Services will be registered when a config entry is set up
     # (we need the config entry for options)
 
     return True
 
 
-def _copy_blueprints_sync(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Copy blueprints to the blueprints folder based on configuration (sync version).
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up Homebase42 from a config entry."""
+    from .battery import BatteryTracker
+    from .coordinator import WeatherForecastCoordinator
+    from .health import FlappingTracker, HealthLog, StaleTracker, UnavailableTracker
+    from .index import EntityIndex
+    from .metrics import IntegrationMetrics
+    from .rules import HealthRules
+    from .services import async_setup_services
+    from .statistics import HealthStatistics
     
-    Returns True if blueprints were changed (added/removed/updated), False otherwise.
-    """
-    # Source: integration blueprints folder
-    blueprints_dir = Path(__file__).parent / "blueprints"
+    setup_start = time.perf_counter()
+    # Counters and timings (diagnostic sensors and diagnostics download)
+    metrics = IntegrationMetrics()
+    hass.data[DOMAIN][entry.entry_id] = {
+        # Options the entry was set up with (to detect what changed on updates)
+        "options": dict(entry.options),
+        "metrics": metrics,
+    }
     
-    # Destination: HA config/blueprints/automation/homebase42/
-    dest_dir = Path(hass.config.path("blueprints", "automation", "homebase42"))
+    # Live entity index (counts by domain, area, floor and device class)
+    index = EntityIndex(hass, metrics)
+    index.async_setup()
+    entry.async_on_unload(index.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["index"] = index
     
-    if not blueprints_dir.exists():
-        _LOGGER.warning("Blueprints folder not found in integration")
-        return False
+    # Include/exclude rules (the trackers never track excluded entities)
+    rules = HealthRules(hass, entry, entry.options, metrics)
+    rules.async_setup()
+    entry.async_on_unload(rules.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["rules"] = rules
     
-    blueprints_changed = False
+    # Transitions between unavailable and available (queried by a service)
+    health_log = HealthLog(hass, entry)
+    await health_log.async_setup()
+    entry.async_on_unload(health_log.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["health_log"] = health_log
     
-    try:
-        # Create destination directory if it doesn't exist
-        dest_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Get options from config entry
-        options = entry.options
-        
-        # 1. Copy all CORE blueprints (always installed)
-        core_dir = blueprints_dir / BLUEPRINTS_CORE
-        if core_dir.exists():
-            for blueprint_file in core_dir.glob("*.yaml"):
-                dest_file = dest_dir / blueprint_file.name
-                
-                # Only copy if file doesn't exist or is different
-                if not dest_file.exists() or dest_file.read_text() != blueprint_file.read_text():
-                    shutil.copy2(blueprint_file, dest_file)
-                    _LOGGER.info("Copied core blueprint: %s", blueprint_file.name)
-                    blueprints_changed = True
-                else:
-                    _LOGGER.debug("Core blueprint already up to date: %s", blueprint_file.name)
-        
-        # 2. Handle OPTIONAL blueprints based on configuration
-        optional_dir = blueprints_dir / BLUEPRINTS_OPTIONAL
-        if optional_dir.exists():
-            for blueprint_filename, config_key in OPTIONAL_BLUEPRINTS.items():
-                blueprint_file = optional_dir / blueprint_filename
-                dest_file = dest_dir / blueprint_filename
-                
-                # Check if this optional blueprint is enabled
-                is_enabled = options.get(config_key, False)
-                
-                if is_enabled:
-                    # Blueprint is enabled -> copy it
-                    if blueprint_file.exists():
-                        if not dest_file.exists() or dest_file.read_text() != blueprint_file.read_text():
-                            shutil.copy2(blueprint_file, dest_file)
-                            _LOGGER.info("Copied optional blueprint: %s", blueprint_filename)
-                            blueprints_changed = True
-                        else:
-                            _LOGGER.debug("Optional blueprint already up to date: %s", blueprint_filename)
-                else:
-                    # Blueprint is disabled -> remove it if it exists
-                    if dest_file.exists():
-                        dest_file.unlink()
-                        _LOGGER.info("Removed disabled optional blueprint: %s", blueprint_filename)
-                        blueprints_changed = True
-                
-    except Exception as err:
-        _LOGGER.error("Failed to manage blueprints: %s", err)
-        return False
-    
-    return blueprints_changed
-
-
-async def _async_copy_blueprints(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Copy blueprints to the blueprints folder based on configuration.
+    # Persisted "unavailable since" timestamps (used by the health entities)
+    unavailable = UnavailableTracker(hass, entry, health_log, metrics, rules)
+    await unavailable.async_setup()
+    entry.async_on_unload(unavailable.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["unavailable"] = unavailable
     
-    Returns True if blueprints were changed, False otherwise.
-    """
-    return await hass.async_add_executor_job(_copy_blueprints_sync, hass, entry)
-
-
-def _copy_templates_sync(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Copy templates to the packages folder based on configuration (sync version).
+    # Entities that stopped reporting (used by the stale entities sensors)
+    stale = StaleTracker(
+        hass,
+        entry,
+        entry.options.get(CONF_STALE_THRESHOLDS, DEFAULT_STALE_THRESHOLDS),
+        metrics,
+        rules,
+    )
+    stale.async_setup()
+    entry.async_on_unload(stale.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["stale"] = stale
     
-    Returns True if templates were changed (added/removed/updated), False otherwise.
-    """
-    # Source: integration templates folder
-    templates_dir = Path(__file__).parent / "templates"
+    # Entities with frequent short outages (used by the flapping entities sensor)
+    flapping = FlappingTracker(
+        hass,
+        entry,
+        entry.options.get(CONF_FLAPPING_THRESHOLD, DEFAULT_FLAPPING_THRESHOLD),
+        entry.options.get(CONF_FLAPPING_WINDOW, DEFAULT_FLAPPING_WINDOW),
+        metrics,
+        rules,
+    )
+    flapping.async_setup()
+    entry.async_on_unload(flapping.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["flapping"] = flapping
     
-    # Destination: HA config/packages/homebase42/
-    dest_dir = Path(hass.config.path("packages", "homebase42"))
+    # Persisted battery levels (used by the batteries due soon sensor)
+    batteries = BatteryTracker(
+        hass,
+        entry,
+        entry.options.get(CONF_BATTERY_CRITICAL_THRESHOLD, DEFAULT_BATTERY_CRITICAL),
+        metrics,
+        rules,
+    )
+    await batteries.async_setup()
+    entry.async_on_unload(batteries.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["batteries"] = batteries
     
-    if not templates_dir.exists():
-        _LOGGER.debug("Templates folder not found in integration")
-        return False
+    # Hourly long-term statistics of the health counts
+    statistics = HealthStatistics(hass, entry)
+    statistics.async_setup()
+    entry.async_on_unload(statistics.async_unload)
+    hass.data[DOMAIN][entry.entry_id]["statistics"] = statistics
     
-    templates_changed = False
+    # Weather forecasts (shared by the forecast sensors)
+    if entry.options.get(CONF_TEMPLATE_WEATHER, DEFAULT_TEMPLATE_WEATHER):
+        coordinator = WeatherForecastCoordinator(
+            hass, entry.options.get(CONF_WEATHER_ENTITY, DEFAULT_WEATHER_ENTITY)
+        )
+        coordinator.async_setup()
+        entry.async_on_unload(coordinator.async_unload)
+        hass.data[DOMAIN][entry.entry_id]["weather"] = coordinator
+        # If the weather entity is not there yet, the first refresh happens once it is
+        if hass.states.get(coordinator.weather_entity) is not None:
+            entry.async_create_background_task(
+                hass, coordinator.async_refresh(), f"{DOMAIN} weather forecast"
+            )
     
-    try:
-        # Get options from config entry
-        options = entry.options
-        weather_entity = options.get(CONF_WEATHER_ENTITY, DEFAULT_WEATHER_ENTITY)
-        
-        # Handle OPTIONAL templates based on configuration
-        optional_dir = templates_dir / TEMPLATES_OPTIONAL
-        if optional_dir.exists():
-            for template_filename, config_key in OPTIONAL_TEMPLATES.items():
-                template_file = optional_dir / template_filename
-                
-                # Check if this optional template is enabled
-                is_enabled = options.get(config_key, False)
-                
-                if is_enabled:
-                    # Template is enabled -> copy it with weather entity replacement
-                    if template_file.exists():
-                        # Create destination directory if needed
-                        dest_dir.mkdir(parents=True, exist_ok=True)
-                        dest_file = dest_dir / template_filename
-                        
-                        # Read template content and replace placeholder
-                        content = template_file.read_text()
-                        content = content.replace("WEATHER_ENTITY_PLACEHOLDER", weather_entity)
-                        
-                        # Write to destination if different
-                        if not dest_file.exists() or dest_file.read_text() != content:
-                            dest_file.write_text(content)
-                            _LOGGER.info("Copied optional template: %s (using %s)", template_filename, weather_entity)
-                            templates_changed = True
-                        else:
-                            _LOGGER.debug("Optional template already up to date: %s", template_filename)
-                else:
-                    # Template is disabled -> remove it if it exists
-                    dest_file = dest_dir / template_filename
-                    if dest_file.exists():
-                        dest_file.unlink()
-                        _LOGGER.info("Removed disabled optional template: %s", template_filename)
-                        templates_changed = True
-                        
-                        # Remove directory if empty
-                        if dest_dir.exists() and not any(dest_dir.iterdir()):
-                            dest_dir.rmdir()
-                            _LOGGER.debug("Removed empty packages/homebase42 directory")
-                
-    except Exception as err:
-        _LOGGER.error("Failed to manage templates: %s", err)
-        return False
-    
-    return templates_changed
-
-
-async def _async_copy_templates(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Copy templates to the packages folder based on configuration.
+    # Shutter controller (native replacement for the cover automation blueprint)
+    _async_setup_shutters(hass, entry)
     
-    Returns True if templates were changed, False otherwise.
-    """
-    return await hass.async_add_executor_job(_copy_templates_sync, hass, entry)
-
-
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Homebase42 from a config entry."""
-    hass.data[DOMAIN][entry.entry_id] = {}
-    
-    # Copy blueprints to user's blueprint folder
-    blueprints_changed = await _async_copy_blueprints(hass, entry)
-    
-    # Copy templates to user's packages folder
-    templates_changed = await _async_copy_templates(hass, entry)
-    
-    # If blueprints or templates were changed, create a repair issue to notify user about restart
-    if blueprints_changed or templates_changed:
-        ir.async_create_issue(
-            hass,
-            DOMAIN,
-            REPAIR_RESTART_REQUIRED,
-            is_fixable=False,
-            severity=ir.IssueSeverity.WARNING,
-            translation_key="restart_required",
-        )
-    else:
-        # Remove repair issue if it exists (everything is up to date)
-        ir.async_delete_issue(hass, DOMAIN, REPAIR_RESTART_REQUIRED)
+    # Keypad handler (native replacement for the frient keypad blueprint)
+    _async_setup_keypad(hass, entry)
+    
+    # Notification forwarder (native replacement for the persistent notification blueprint)
+    _async_setup_forwarder(hass, entry)
     
     # Register services (only once for the first config entry)
     if len([e for e in hass.config_entries.async_entries(DOMAIN)]) == 1:
         await async_setup_services(hass, entry)
     
     # Register update listener for options changes
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    entry.async_on_unload(entry.add_update_listener(async_options_updated))
     
     # Forward entry setup to platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
+    # Sync blueprints and templates in the background so slow storage
+    # does not delay the health sensors
+    entry.async_create_background_task(
+        hass, _async_sync_assets(hass, entry), f"{DOMAIN} asset sync"
+    )
+    
+    setup_duration = time.perf_counter() - setup_start
+    hass.data[DOMAIN][entry.entry_id]["setup_duration"] = setup_duration
+    _LOGGER.debug("Setup of config entry took %.3f seconds", setup_duration)
+    
     return True
 
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry when options change."""
-    await hass.config_entries.async_reload(entry.entry_id)
+@callback
+def _async_setup_shutters(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """(Re)start the shutter controller with the current options."""
+    from .shutters import ShutterController
+    
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    if (controller := entry_data.pop("shutters", None)) is not None:
+        controller.async_unload()
+    if not entry.options.get(CONF_CONFIGURE_SHUTTERS, DEFAULT_CONFIGURE_SHUTTERS):
+        return
+    controller = ShutterController(hass, entry.options)
+    controller.async_setup()
+    entry_data["shutters"] = controller
+
+
+@callback
+def _async_setup_keypad(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """(Re)start the keypad handler with the current options."""
+    from .keypad import KeypadHandler
+    
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    if (handler := entry_data.pop("keypad", None)) is not None:
+        handler.async_unload()
+    if not entry.options.get(CONF_CONFIGURE_KEYPAD, DEFAULT_CONFIGURE_KEYPAD):
+        return
+    handler = KeypadHandler(hass, entry.options)
+    entry_data["keypad"] = handler
+    # Waits for the MQTT client, which may connect after this integration
+    entry.async_create_background_task(
+        hass, handler.async_setup(), f"{DOMAIN} keypad setup"
+    )
+
+
+@callback
+def _async_setup_forwarder(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """(Re)start the notification forwarder with the current options."""
+    from .forwarder import NotificationForwarder
+    
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    if (forwarder := entry_data.pop("forwarder", None)) is not None:
+        forwarder.async_unload()
+    if not entry.options.get(CONF_CONFIGURE_FORWARDER, DEFAULT_CONFIGURE_FORWARDER):
+        return
+    forwarder = NotificationForwarder(hass, entry.options)
+    forwarder.async_setup()
+    entry_data["forwarder"] = forwarder
+
+
+async def _async_sync_assets(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Sync blueprints and templates and apply the changes."""
+    from .assets import async_sync_assets
+    
+    sync_start = time.perf_counter()
+    asset_changes = await async_sync_assets(hass, entry)
+    sync_duration = time.perf_counter() - sync_start
+    if (entry_data := hass.data[DOMAIN].get(entry.entry_id)) is not None:
+        entry_data["asset_sync_duration"] = sync_duration
+    _LOGGER.debug(
+        "Asset sync took %.3f seconds (%d changes)", sync_duration, len(asset_changes)
+    )
+    
+    if not asset_changes:
+        # Remove repair issue if it exists (everything is up to date)
+        ir.async_delete_issue(hass, DOMAIN, REPAIR_RESTART_REQUIRED)
+        return
+    
+    # Reload once Home Assistant is running (automation and template are set up by then)
+    async def _async_apply(hass: HomeAssistant) -> None:
+        await _async_apply_asset_changes(hass, asset_changes)
+    
+    entry.async_on_unload(async_at_started(hass, _async_apply))
+
+
+async def _async_apply_asset_changes(
+    hass: HomeAssistant, asset_changes: list[AssetChange]
+) -> None:
+    """Apply changed blueprints and templates by reloading, restart as fallback."""
+    from .assets import async_reload_assets
+    
+    if await async_reload_assets(hass, asset_changes):
+        ir.async_delete_issue(hass, DOMAIN, REPAIR_RESTART_REQUIRED)
+        return
+    
+    # A reload was not possible, notify the user about the restart
+    ir.async_create_issue(
+        hass,
+        DOMAIN,
+        REPAIR_RESTART_REQUIRED,
+        is_fixable=False,
+        severity=ir.IssueSeverity.WARNING,
+        translation_key="restart_required",
+    )
+
+
+async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options.
+    
+    Only a changed asset selection needs a full reload. Thresholds, delays,
+    the hidden entity option and the health rules are re-evaluated by the
+    trackers and entities in place, export
+    settings only reschedule the export timer and the settings of the shutter
+    controller, keypad handler and notification forwarder only restart them.
+    """
+    from .services import async_schedule_automatic_export
+    
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    old_options = entry_data["options"]
+    new_options = dict(entry.options)
+    entry_data["options"] = new_options
+    
+    changed = {
+        key
+        for key in old_options.keys() | new_options.keys()
+        if old_options.get(key) != new_options.get(key)
+    }
+    if not changed:
+        return
+    
+    if changed & RELOAD_OPTIONS:
+        _LOGGER.debug("Asset selection changed (%s), reloading", ", ".join(sorted(changed)))
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    
+    _LOGGER.debug("Applying changed options live: %s", ", ".join(sorted(changed)))
+    if changed & HEALTH_RULE_OPTIONS:
+        entry_data["rules"].async_configure(entry.options)
+    if CONF_STALE_THRESHOLDS in changed:
+        entry_data["stale"].async_set_thresholds(
+            entry.options.get(CONF_STALE_THRESHOLDS, DEFAULT_STALE_THRESHOLDS)
+        )
+    if changed & {CONF_FLAPPING_THRESHOLD, CONF_FLAPPING_WINDOW}:
+        entry_data["flapping"].async_configure(
+            entry.options.get(CONF_FLAPPING_THRESHOLD, DEFAULT_FLAPPING_THRESHOLD),
+            entry.options.get(CONF_FLAPPING_WINDOW, DEFAULT_FLAPPING_WINDOW),
+        )
+    if CONF_BATTERY_CRITICAL_THRESHOLD in changed:
+        entry_data["batteries"].async_set_critical(
+            entry.options.get(CONF_BATTERY_CRITICAL_THRESHOLD, DEFAULT_BATTERY_CRITICAL)
+        )
+    if changed & EXPORT_OPTIONS:
+        async_schedule_automatic_export(hass, entry)
+    if changed & SHUTTER_OPTIONS:
+        _async_setup_shutters(hass, entry)
+    if changed & KEYPAD_OPTIONS:
+        _async_setup_keypad(hass, entry)
+    if changed & FORWARDER_OPTIONS:
+        _async_setup_forwarder(hass, entry)
+    
+    # Let the entities re-evaluate with the new thresholds
+    async_dispatcher_send(hass, f"{SIGNAL_OPTIONS_UPDATED}_{entry.entry_id}")
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    from .services import async_unload_services
+    
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        if (shutters := entry_data.get("shutters")) is not None:
+            shutters.async_unload()
+        if (keypad := entry_data.get("keypad")) is not None:
+            keypad.async_unload()
+        if (forwarder := entry_data.get("forwarder")) is not None:
+            forwarder.async_unload()
         
         # Unload services if no more config entries
-        if not hass.data[DOMAIN]:
+        # (hass.data[DOMAIN] also holds the export timer and worker pool)
+        if not any(
+            other.entry_id in hass.data[DOMAIN]
+            for other in hass.config_entries.async_entries(DOMAIN)
+        ):
             await async_unload_services(hass)
     
     return unload_ok
@@ -266,3 +395,6 @@ async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
         "Integration removed. Blueprints are kept in blueprints/automation/homebase42/. "
         "Delete manually if no longer needed."
     )
+    # Nothing is monitored anymore, subscribers see all entities removed
+    if (health_sets := hass.data.get(DOMAIN, {}).get("health_sets")) is not None:
+        health_sets.async_clear()
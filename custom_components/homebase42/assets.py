@@ -0,0 +1,303 @@
+"""Blueprint and template installation for Homebase42.
+
+Installed assets are tracked in a manifest (source hash, rendered hash, size and
+mtime) kept in a Store. When neither the shipped file nor the installed copy
+changed since the last sync, a stat() call per file is all the sync needs.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import SERVICE_RELOAD
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    BLUEPRINTS_CORE,
+    BLUEPRINTS_OPTIONAL,
+    OPTIONAL_BLUEPRINTS,
+    TEMPLATES_OPTIONAL,
+    OPTIONAL_TEMPLATES,
+    RETIRED_TEMPLATES,
+)
+from .files import write_atomic
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.assets"
+STORAGE_VERSION = 1
+
+ASSET_BLUEPRINT = "blueprint"
+ASSET_TEMPLATE = "template"
+
+# Integration that has to be reloaded to pick up a changed asset.
+# Blueprints are re-read by automation.reload, the shipped packages only
+# contain template entities.
+RELOAD_DOMAINS = {
+    ASSET_BLUEPRINT: "automation",
+    ASSET_TEMPLATE: "template",
+}
+
+
+@dataclass(slots=True)
+class Asset:
+    """A file that should be installed into the Home Assistant config folder."""
+
+    kind: str
+    source: Path
+    dest: Path
+    # Placeholder -> value replacements applied while installing
+    replacements: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class AssetChange:
+    """An installed, updated or removed asset."""
+
+    kind: str
+    name: str
+    action: str  # "installed", "updated" or "removed"
+
+
+def _build_plan(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> tuple[list[Asset], list[tuple[str, Path]]]:
+    """Return the assets to install and the (kind, path) of assets to remove (blocking)."""
+    options = entry.options
+    root = Path(__file__).parent
+    install: list[Asset] = []
+    remove: list[tuple[str, Path]] = []
+
+    # Blueprints: config/blueprints/automation/homebase42/
+    blueprints_dest = Path(hass.config.path("blueprints", "automation", "homebase42"))
+
+    # 1. CORE blueprints (always installed)
+    core_dir = root / "blueprints" / BLUEPRINTS_CORE
+    for blueprint_file in sorted(core_dir.glob("*.yaml")):
+        install.append(
+            Asset(ASSET_BLUEPRINT, blueprint_file, blueprints_dest / blueprint_file.name)
+        )
+
+    # 2. OPTIONAL blueprints based on configuration
+    optional_dir = root / "blueprints" / BLUEPRINTS_OPTIONAL
+    for blueprint_filename, config_key in OPTIONAL_BLUEPRINTS.items():
+        dest_file = blueprints_dest / blueprint_filename
+        if options.get(config_key, False):
+            install.append(
+                Asset(ASSET_BLUEPRINT, optional_dir / blueprint_filename, dest_file)
+            )
+        else:
+            remove.append((ASSET_BLUEPRINT, dest_file))
+
+    # 3. OPTIONAL templates: config/packages/homebase42/
+    templates_dest = Path(hass.config.path("packages", "homebase42"))
+    templates_dir = root / "templates" / TEMPLATES_OPTIONAL
+    for template_filename, config_key in OPTIONAL_TEMPLATES.items():
+        dest_file = templates_dest / template_filename
+        if options.get(config_key, False):
+            install.append(
+                Asset(ASSET_TEMPLATE, templates_dir / template_filename, dest_file)
+            )
+        else:
+            remove.append((ASSET_TEMPLATE, dest_file))
+
+    # 4. Templates that were replaced by native entities
+    remove.extend(_retired_templates(hass))
+
+    return install, remove
+
+
+def _retired_templates(hass: HomeAssistant) -> list[tuple[str, Path]]:
+    """Return the installed paths of the templates replaced by native entities."""
+    templates_dest = Path(hass.config.path("packages", "homebase42"))
+    return [
+        (ASSET_TEMPLATE, templates_dest / template_filename)
+        for template_filename in RETIRED_TEMPLATES
+    ]
+
+
+def _stat(path: Path) -> tuple[int, int] | None:
+    """Return (size, mtime_ns) of a file or None if it does not exist."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _sha256(data: bytes) -> str:
+    """Return the hex digest of some bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sync_asset(
+    asset: Asset, record: dict[str, Any] | None
+) -> tuple[str | None, dict[str, Any]]:
+    """Bring a single asset up to date.
+
+    Returns the action taken (or None) and the new manifest record.
+    """
+    source_stat = _stat(asset.source)
+    if source_stat is None:
+        raise FileNotFoundError(asset.source)
+    dest_stat = _stat(asset.dest)
+
+    # Fast path: nothing changed on either side since the last sync
+    if (
+        record is not None
+        and dest_stat is not None
+        and record["source_size"] == source_stat[0]
+        and record["source_mtime"] == source_stat[1]
+        and record["size"] == dest_stat[0]
+        and record["mtime"] == dest_stat[1]
+        and record["replacements"] == asset.replacements
+    ):
+        return None, record
+
+    source = asset.source.read_bytes()
+    rendered = source
+    if asset.replacements:
+        text = source.decode("utf-8")
+        for placeholder, value in asset.replacements.items():
+            text = text.replace(placeholder, value)
+        rendered = text.encode("utf-8")
+    rendered_hash = _sha256(rendered)
+
+    action = None
+    if dest_stat is None:
+        action = "installed"
+    elif record is not None and (record["size"], record["mtime"]) == dest_stat:
+        # Installed copy is still what we wrote last time
+        if record["rendered_hash"] != rendered_hash:
+            action = "updated"
+    elif _sha256(asset.dest.read_bytes()) != rendered_hash:
+        # Installed copy was touched outside of the integration (or is unknown)
+        action = "updated"
+
+    if action is not None:
+        write_atomic(asset.dest, (rendered,))
+        dest_stat = _stat(asset.dest)
+
+    return action, {
+        "source_hash": _sha256(source),
+        "source_size": source_stat[0],
+        "source_mtime": source_stat[1],
+        "rendered_hash": rendered_hash,
+        "size": dest_stat[0],
+        "mtime": dest_stat[1],
+        "replacements": asset.replacements,
+    }
+
+
+def sync_assets(
+    install: list[Asset],
+    remove: list[tuple[str, Path]],
+    manifest: dict[str, dict[str, Any]],
+) -> tuple[list[AssetChange], dict[str, dict[str, Any]]]:
+    """Install, update and remove assets (blocking).
+
+    Returns the changes and the new manifest.
+    """
+    changes: list[AssetChange] = []
+    new_manifest: dict[str, dict[str, Any]] = {}
+
+    for asset in install:
+        key = str(asset.dest)
+        try:
+            action, new_manifest[key] = _sync_asset(asset, manifest.get(key))
+        except OSError as err:
+            _LOGGER.error("Failed to install %s %s: %s", asset.kind, asset.dest.name, err)
+            continue
+        if action is not None:
+            _LOGGER.info("%s %s: %s", action.capitalize(), asset.kind, asset.dest.name)
+            changes.append(AssetChange(asset.kind, asset.dest.name, action))
+        else:
+            _LOGGER.debug("%s already up to date: %s", asset.kind.capitalize(), asset.dest.name)
+
+    for kind, dest in remove:
+        try:
+            dest.unlink()
+        except FileNotFoundError:
+            continue
+        except OSError as err:
+            _LOGGER.error("Failed to remove %s %s: %s", kind, dest.name, err)
+            continue
+        _LOGGER.info("Removed disabled optional %s: %s", kind, dest.name)
+        changes.append(AssetChange(kind, dest.name, "removed"))
+
+        # Remove the directory if it is empty (e.g. packages/homebase42)
+        try:
+            dest.parent.rmdir()
+            _LOGGER.debug("Removed empty directory %s", dest.parent)
+        except OSError:
+            pass
+
+    return changes, new_manifest
+
+
+def _plan_and_sync_assets(
+    hass: HomeAssistant, entry: ConfigEntry, manifest: dict[str, dict[str, Any]]
+) -> tuple[list[AssetChange], dict[str, dict[str, Any]]]:
+    """Build the asset plan and sync it in a single executor job."""
+    install, remove = _build_plan(hass, entry)
+    return sync_assets(install, remove, manifest)
+
+
+async def async_sync_assets(hass: HomeAssistant, entry: ConfigEntry) -> list[AssetChange]:
+    """Sync blueprints and templates with the config entry options.
+
+    Returns the list of installed, updated and removed assets.
+    """
+    store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+    manifest = (await store.async_load() or {}).get("assets", {})
+
+    changes, new_manifest = await hass.async_add_executor_job(
+        _plan_and_sync_assets, hass, entry, manifest
+    )
+
+    if new_manifest != manifest:
+        await store.async_save({"assets": new_manifest})
+
+    return changes
+
+
+async def async_remove_retired_templates(hass: HomeAssistant) -> list[AssetChange]:
+    """Remove the templates replaced by native entities right away.
+
+    The native entities take over the entity_ids of the template entities,
+    so the packages have to be gone before that, not only after the
+    background sync.
+    """
+    changes, _ = await hass.async_add_executor_job(
+        sync_assets, [], _retired_templates(hass), {}
+    )
+    return changes
+
+
+async def async_reload_assets(hass: HomeAssistant, changes: list[AssetChange]) -> bool:
+    """Reload the integrations that use the changed assets.
+
+    Returns False if at least one reload was not possible, in that case a
+    restart of Home Assistant is needed to apply the changes.
+    """
+    reloaded = True
+    for domain in sorted({RELOAD_DOMAINS[change.kind] for change in changes}):
+        if not hass.services.has_service(domain, SERVICE_RELOAD):
+            _LOGGER.debug("%s.%s is not available", domain, SERVICE_RELOAD)
+            reloaded = False
+            continue
+        try:
+            await hass.services.async_call(domain, SERVICE_RELOAD, blocking=True)
+        except HomeAssistantError as err:
+            _LOGGER.warning("Failed to reload %s after asset changes: %s", domain, err)
+            reloaded = False
+            continue
+        _LOGGER.info("Reloaded %s to apply changed assets", domain)
+    return reloaded
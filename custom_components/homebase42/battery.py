@@ -0,0 +1,287 @@
+"""Battery forecasts for Homebase42.
+
+Keeps a small, downsampled history of the level of every battery sensor
+(one sample every few hours in a ring buffer, persisted in a Store) and fits
+a discharge rate to it. From the rate the time the battery reaches the
+critical threshold is estimated, without querying the recorder. Batteries
+excluded by the health rules are not sampled.
+"""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Collection
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+from typing import Any
+
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_DEVICE_CLASS, EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, SIGNAL_BATTERY_UPDATED, SIGNAL_RULES_UPDATED
+from .metrics import METRIC_EVENTS, IntegrationMetrics, async_timed
+from .rules import HealthRules, async_exclusion_check
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Seconds to collect samples before writing the store
+SAVE_DELAY = 60
+
+# Minimum time between two samples of a battery
+SAMPLE_INTERVAL = timedelta(hours=6)
+# Samples per battery (with the interval above: two weeks)
+MAX_SAMPLES = 56
+# Samples and time span needed for a forecast
+MIN_SAMPLES = 3
+MIN_SPAN = timedelta(days=2)
+# A level rising by this much means the battery was replaced or recharged
+REPLACED_JUMP = 20.0
+# Slower discharge (% per day) is treated as not discharging
+MIN_DISCHARGE_RATE = 0.01
+
+# (timestamp, level)
+Sample = tuple[float, float]
+
+
+@dataclass(slots=True)
+class BatteryForecast:
+    """Discharge forecast of a battery."""
+
+    level: float
+    # Discharge in % per day (positive while discharging)
+    rate: float
+    critical_at: datetime
+
+    def days_to_critical(self, now: datetime) -> float:
+        """Return the days until the critical level is reached."""
+        return max((self.critical_at - now).total_seconds() / 86400, 0.0)
+
+
+def _battery_level(state: State) -> float | None:
+    """Return the level of a battery sensor (None for other entities)."""
+    if state.domain != "sensor" or (
+        state.attributes.get(ATTR_DEVICE_CLASS) != SensorDeviceClass.BATTERY
+    ):
+        return None
+    try:
+        return float(state.state)
+    except ValueError:
+        return None
+
+
+def fit_forecast(samples: deque[Sample], critical: float) -> BatteryForecast | None:
+    """Fit a line through the samples and return when it reaches the critical level."""
+    if len(samples) < MIN_SAMPLES or samples[-1][0] - samples[0][0] < MIN_SPAN.total_seconds():
+        return None
+    count = len(samples)
+    mean_t = sum(timestamp for timestamp, _ in samples) / count
+    mean_level = sum(level for _, level in samples) / count
+    variance = sum((timestamp - mean_t) ** 2 for timestamp, _ in samples)
+    if not variance:
+        return None
+    slope = (
+        sum((timestamp - mean_t) * (level - mean_level) for timestamp, level in samples)
+        / variance
+    )
+    rate = -slope * 86400
+    if rate < MIN_DISCHARGE_RATE:
+        return None
+    level = samples[-1][1]
+    # Time at which the fitted line reaches the critical level
+    critical_ts = mean_t + (critical - mean_level) / slope
+    return BatteryForecast(
+        level=level,
+        rate=round(rate, 3),
+        critical_at=dt_util.utc_from_timestamp(critical_ts),
+    )
+
+
+class BatteryTracker:
+    """Collect battery levels and forecast when they reach the critical level."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        critical: float,
+        metrics: IntegrationMetrics | None = None,
+        rules: HealthRules | None = None,
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self._metrics = metrics
+        self._rules = rules
+        self._excluded = async_exclusion_check(rules)
+        self._rules_signal = f"{SIGNAL_RULES_UPDATED}_{entry.entry_id}"
+        self._signal = f"{SIGNAL_BATTERY_UPDATED}_{entry.entry_id}"
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.batteries"
+        )
+        self._critical = float(critical)
+        # entity_id -> downsampled levels (oldest first)
+        self._samples: dict[str, deque[Sample]] = {}
+        self._forecasts: dict[str, BatteryForecast] = {}
+        self._unsubs: list[CALLBACK_TYPE] = []
+
+    async def async_setup(self) -> None:
+        """Load the stored samples, add the current levels and start listening."""
+        stored = (await self._store.async_load() or {}).get("samples", {})
+        for entity_id, samples in stored.items():
+            if self._excluded(entity_id):
+                continue
+            self._samples[entity_id] = deque(
+                ((float(timestamp), float(level)) for timestamp, level in samples),
+                maxlen=MAX_SAMPLES,
+            )
+
+        for state in self.hass.states.async_all("sensor"):
+            if (level := _battery_level(state)) is not None and not self._excluded(
+                state.entity_id
+            ):
+                self._async_add_sample(state.entity_id, level, state.last_updated)
+        for entity_id in self._samples:
+            self._async_update_forecast(entity_id)
+
+        self._unsubs = [
+            self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                async_timed(self._metrics, METRIC_EVENTS, self._async_state_changed),
+            ),
+            async_at_started(self.hass, self._async_prune),
+        ]
+        if self._rules is not None:
+            self._unsubs.append(
+                async_dispatcher_connect(
+                    self.hass, self._rules_signal, self._async_rules_updated
+                )
+            )
+        _LOGGER.debug("Tracking %d batteries", len(self._samples))
+
+    async def async_unload(self) -> None:
+        """Stop listening for state changes and write the samples now."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def async_set_critical(self, critical: float) -> None:
+        """Recompute the forecasts for a new critical threshold."""
+        self._critical = float(critical)
+        for entity_id in self._samples:
+            self._async_update_forecast(entity_id)
+        async_dispatcher_send(self.hass, self._signal)
+
+    @property
+    def size(self) -> int:
+        """Return the number of tracked batteries."""
+        return len(self._samples)
+
+    @callback
+    def async_batteries(self) -> Collection[str]:
+        """Return the tracked batteries (not excluded by the rules, do not modify)."""
+        return self._samples.keys()
+
+    @callback
+    def async_forecasts(self) -> dict[str, BatteryForecast]:
+        """Return the forecasts of all batteries that are discharging."""
+        return self._forecasts
+
+    @callback
+    def _async_prune(self, hass: HomeAssistant) -> None:
+        """Forget batteries that no longer exist once Home Assistant has started."""
+        entity_reg = er.async_get(hass)
+        removed = [
+            entity_id
+            for entity_id in self._samples
+            if hass.states.get(entity_id) is None and entity_reg.async_get(entity_id) is None
+        ]
+        for entity_id in removed:
+            del self._samples[entity_id]
+            self._forecasts.pop(entity_id, None)
+        if removed:
+            _LOGGER.debug("Forgot %d removed batteries", len(removed))
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+            async_dispatcher_send(self.hass, self._signal)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Add a sample when a battery level changed."""
+        if (new_state := event.data.get("new_state")) is None:
+            return
+        if (level := _battery_level(new_state)) is None:
+            return
+        entity_id: str = event.data["entity_id"]
+        if self._excluded(entity_id):
+            return
+        if self._async_add_sample(entity_id, level, new_state.last_updated):
+            self._async_update_forecast(entity_id)
+            async_dispatcher_send(self.hass, self._signal)
+
+    @callback
+    def _async_rules_updated(self, entity_ids: set[str] | None) -> None:
+        """Forget newly excluded batteries, sample newly included ones."""
+        if entity_ids is None:
+            entity_ids = {state.entity_id for state in self.hass.states.async_all("sensor")}
+            entity_ids.update(self._samples)
+        changed = False
+        for entity_id in entity_ids:
+            if self._excluded(entity_id):
+                if self._samples.pop(entity_id, None) is not None:
+                    self._forecasts.pop(entity_id, None)
+                    changed = True
+            elif (
+                entity_id not in self._samples
+                and (state := self.hass.states.get(entity_id)) is not None
+                and (level := _battery_level(state)) is not None
+            ):
+                self._async_add_sample(entity_id, level, state.last_updated)
+                self._async_update_forecast(entity_id)
+                changed = True
+        if changed:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+            async_dispatcher_send(self.hass, self._signal)
+
+    @callback
+    def _async_add_sample(self, entity_id: str, level: float, when: datetime) -> bool:
+        """Add a sample if the last one is old enough, return True if added."""
+        timestamp = when.timestamp()
+        if (samples := self._samples.get(entity_id)) is None:
+            samples = self._samples[entity_id] = deque(maxlen=MAX_SAMPLES)
+        elif samples:
+            last_timestamp, last_level = samples[-1]
+            if level - last_level >= REPLACED_JUMP:
+                # New or recharged battery, the old samples no longer apply
+                samples.clear()
+            elif timestamp - last_timestamp < SAMPLE_INTERVAL.total_seconds():
+                return False
+        samples.append((timestamp, level))
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        return True
+
+    @callback
+    def _async_update_forecast(self, entity_id: str) -> None:
+        """Fit the forecast of a battery again."""
+        if (forecast := fit_forecast(self._samples[entity_id], self._critical)) is None:
+            self._forecasts.pop(entity_id, None)
+        else:
+            self._forecasts[entity_id] = forecast
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data for the store."""
+        return {
+            "samples": {
+                entity_id: [[int(timestamp), level] for timestamp, level in samples]
+                for entity_id, samples in self._samples.items()
+                if samples
+            }
+        }
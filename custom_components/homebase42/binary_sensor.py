@@ -13,6 +13,7 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.event import async_track_time_interval
@@ -30,8 +31,27 @@ from .const import (
     DEFAULT_INCLUDE_HIDDEN_ENTITIES,
     ATTR_ENTITIES,
     ATTR_COUNT,
+    ATTR_DIGEST,
+    ATTR_OUTAGES,
     ATTR_LAST_UPDATED,
+    HEALTH_SET_BATTERY_CRITICAL,
+    HEALTH_SET_FLAPPING,
+    HEALTH_SET_STALE,
+    HEALTH_SET_UNAVAILABLE,
+    SIGNAL_OPTIONS_UPDATED,
+    UNRECORDED_ATTRIBUTES,
+    SIGNAL_FLAPPING_UPDATED,
+    SIGNAL_STALE_UPDATED,
 )
+from .battery import BatteryTracker
+from .health import (
+    FlappingTracker,
+    HealthSets,
+    StaleTracker,
+    UnavailableTracker,
+    render_digest,
+)
+from .metrics import IntegrationMetrics, timed_update
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -48,6 +68,8 @@ async def async_setup_entry(
     sensors = [
         Homebase42UnavailableSensor(hass, entry),
         Homebase42BatteryCriticalSensor(hass, entry),
+        Homebase42StaleSensor(hass, entry),
+        Homebase42FlappingSensor(hass, entry),
     ]
     
     async_add_entities(sensors, True)
@@ -60,13 +82,18 @@ class Homebase42UnavailableSensor(BinarySensorEntity, RestoreEntity):
     _attr_translation_key = "unavailable_entities"
     _attr_device_class = BinarySensorDeviceClass.PROBLEM
     _attr_icon = "mdi:alert-circle"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize the sensor."""
         self.hass = hass
         self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+        self._health_sets: HealthSets = hass.data[DOMAIN]["health_sets"]
         self._attr_unique_id = f"{entry.entry_id}_unavailable_entities"
         self._unavailable_entities: list[str] = []
+        self._digest = ""
+        self._tracker: UnavailableTracker = hass.data[DOMAIN][entry.entry_id]["unavailable"]
         self._attr_is_on = False
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, entry.entry_id)},
@@ -95,13 +122,22 @@ class Homebase42UnavailableSensor(BinarySensorEntity, RestoreEntity):
             )
         )
         
+        # Re-evaluate when options are changed (applied without a reload)
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{SIGNAL_OPTIONS_UPDATED}_{self._entry.entry_id}",
+                self._async_update,
+            )
+        )
+        
         # Initial update
         await self._async_update()
 
     @callback
+    @timed_update
     async def _async_update(self, now=None) -> None:
         """Update the sensor."""
-        unavailable_entities = []
         delay_hours = self._entry.options.get(
             CONF_UNAVAILABLE_NOTIFICATION_DELAY, DEFAULT_UNAVAILABLE_DELAY
         )
@@ -111,37 +147,15 @@ class Homebase42UnavailableSensor(BinarySensorEntity, RestoreEntity):
         )
         now = dt_util.utcnow()
         
-        # Get entity registry for checking hidden/disabled status
-        entity_registry = er.async_get(self.hass)
-
-        # Iterate through all entities
-        for state in self.hass.states.async_all():
-            # Skip entities from this integration
-            if state.entity_id.startswith(f"binary_sensor.{DOMAIN}_") or \
-               state.entity_id.startswith(f"sensor.{DOMAIN}_"):
-                continue
-
-            # Skip hidden entities if not configured to include them
-            if not include_hidden:
-                entity_entry = entity_registry.async_get(state.entity_id)
-                if entity_entry:
-                    # Check if entity is hidden or disabled in the registry
-                    # hidden: boolean field set when entity visibility is set to false in UI
-                    # hidden_by: string field (e.g., "user" or "integration")
-                    # disabled_by: string field
-                    if (entity_entry.hidden is True or 
-                        entity_entry.hidden_by is not None or 
-                        entity_entry.disabled_by is not None):
-                        continue
-
-            # Check if entity is unavailable
-            if state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-                # Check if it has been unavailable for long enough
-                if state.last_changed and (now - state.last_changed) >= delay:
-                    unavailable_entities.append(state.entity_id)
+        # Only entities that are unavailable are tracked, no need to look at all states.
+        # The timestamps survive restarts, so the delay is counted from the first outage.
+        unavailable = self._tracker.async_unavailable(delay, include_hidden, now)
+        unavailable_entities = [entity_id for entity_id, _ in unavailable]
+        self._digest = render_digest(unavailable, now)
         
         self._unavailable_entities = unavailable_entities
         self._attr_is_on = len(unavailable_entities) > 0
+        self._health_sets.async_publish(HEALTH_SET_UNAVAILABLE, unavailable_entities)
         
         self.async_write_ha_state()
 
@@ -151,6 +165,7 @@ class Homebase42UnavailableSensor(BinarySensorEntity, RestoreEntity):
         return {
             ATTR_ENTITIES: self._unavailable_entities,
             ATTR_COUNT: len(self._unavailable_entities),
+            ATTR_DIGEST: self._digest,
             ATTR_LAST_UPDATED: dt_util.utcnow().isoformat(),
         }
 
@@ -162,12 +177,16 @@ class Homebase42BatteryCriticalSensor(BinarySensorEntity, RestoreEntity):
     _attr_translation_key = "battery_critical"
     _attr_device_class = BinarySensorDeviceClass.PROBLEM
     _attr_icon = "mdi:battery-alert"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize the sensor."""
         self.hass = hass
         self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+        self._health_sets: HealthSets = hass.data[DOMAIN]["health_sets"]
         self._attr_unique_id = f"{entry.entry_id}_battery_critical"
+        self._batteries: BatteryTracker = hass.data[DOMAIN][entry.entry_id]["batteries"]
         self._critical_batteries: list[str] = []
         self._attr_is_on = False
         self._attr_device_info = DeviceInfo(
@@ -197,10 +216,20 @@ class Homebase42BatteryCriticalSensor(BinarySensorEntity, RestoreEntity):
             )
         )
         
+        # Re-evaluate when options are changed (applied without a reload)
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{SIGNAL_OPTIONS_UPDATED}_{self._entry.entry_id}",
+                self._async_update,
+            )
+        )
+        
         # Initial update
         await self._async_update()
 
     @callback
+    @timed_update
     async def _async_update(self, now=None) -> None:
         """Update the sensor."""
         critical_batteries = []
@@ -214,8 +243,10 @@ class Homebase42BatteryCriticalSensor(BinarySensorEntity, RestoreEntity):
         # Get entity registry for checking hidden/disabled status
         entity_registry = er.async_get(self.hass)
 
-        # Iterate through all sensor entities
-        for state in self.hass.states.async_all("sensor"):
+        # Only the batteries of the tracker, excluded ones are never tracked
+        for entity_id in self._batteries.async_batteries():
+            if (state := self.hass.states.get(entity_id)) is None:
+                continue
             # Skip hidden entities if not configured to include them
             if not include_hidden:
                 entity_entry = entity_registry.async_get(state.entity_id)
@@ -244,6 +275,7 @@ class Homebase42BatteryCriticalSensor(BinarySensorEntity, RestoreEntity):
         
         self._critical_batteries = critical_batteries
         self._attr_is_on = len(critical_batteries) > 0
+        self._health_sets.async_publish(HEALTH_SET_BATTERY_CRITICAL, critical_batteries)
         
         self.async_write_ha_state()
 
@@ -255,3 +287,138 @@ class Homebase42BatteryCriticalSensor(BinarySensorEntity, RestoreEntity):
             ATTR_COUNT: len(self._critical_batteries),
             ATTR_LAST_UPDATED: dt_util.utcnow().isoformat(),
         }
+
+
+class Homebase42StaleSensor(BinarySensorEntity):
+    """Binary sensor for entities that stopped reporting."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "stale_entities"
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
+    _attr_icon = "mdi:timer-sand-complete"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
+    _attr_should_poll = False
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self.hass = hass
+        self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+        self._health_sets: HealthSets = hass.data[DOMAIN]["health_sets"]
+        self._attr_unique_id = f"{entry.entry_id}_stale_entities"
+        self._stale_entities: list[str] = []
+        self._tracker: StaleTracker = hass.data[DOMAIN][entry.entry_id]["stale"]
+        self._attr_is_on = False
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=NAME,
+            manufacturer="Simon42",
+            model="Homebase42",
+            sw_version="0.1.0",
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Handle entity added to hass."""
+        await super().async_added_to_hass()
+        
+        # The tracker reports changes, no periodic update needed
+        for signal in (SIGNAL_STALE_UPDATED, SIGNAL_OPTIONS_UPDATED):
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass, f"{signal}_{self._entry.entry_id}", self._async_update
+                )
+            )
+        
+        self._async_update()
+
+    @callback
+    @timed_update
+    def _async_update(self) -> None:
+        """Update the sensor."""
+        include_hidden = self._entry.options.get(
+            CONF_INCLUDE_HIDDEN_ENTITIES, DEFAULT_INCLUDE_HIDDEN_ENTITIES
+        )
+        self._stale_entities = [
+            entity_id for entity_id, _ in self._tracker.async_stale(include_hidden)
+        ]
+        self._attr_is_on = len(self._stale_entities) > 0
+        self._health_sets.async_publish(HEALTH_SET_STALE, self._stale_entities)
+        
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            ATTR_ENTITIES: self._stale_entities,
+            ATTR_COUNT: len(self._stale_entities),
+            ATTR_LAST_UPDATED: dt_util.utcnow().isoformat(),
+        }
+
+
+class Homebase42FlappingSensor(BinarySensorEntity):
+    """Binary sensor for entities that become unavailable often."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "flapping_entities"
+    _attr_device_class = BinarySensorDeviceClass.PROBLEM
+    _attr_icon = "mdi:swap-vertical-circle"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
+    _attr_should_poll = False
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self.hass = hass
+        self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+        self._health_sets: HealthSets = hass.data[DOMAIN]["health_sets"]
+        self._attr_unique_id = f"{entry.entry_id}_flapping_entities"
+        self._flapping: list[tuple[str, int]] = []
+        self._tracker: FlappingTracker = hass.data[DOMAIN][entry.entry_id]["flapping"]
+        self._attr_is_on = False
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=NAME,
+            manufacturer="Simon42",
+            model="Homebase42",
+            sw_version="0.1.0",
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Handle entity added to hass."""
+        await super().async_added_to_hass()
+        
+        # The tracker reports changes, no periodic update needed
+        for signal in (SIGNAL_FLAPPING_UPDATED, SIGNAL_OPTIONS_UPDATED):
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass, f"{signal}_{self._entry.entry_id}", self._async_update
+                )
+            )
+        
+        self._async_update()
+
+    @callback
+    @timed_update
+    def _async_update(self) -> None:
+        """Update the sensor."""
+        include_hidden = self._entry.options.get(
+            CONF_INCLUDE_HIDDEN_ENTITIES, DEFAULT_INCLUDE_HIDDEN_ENTITIES
+        )
+        self._flapping = self._tracker.async_flapping(include_hidden)
+        self._attr_is_on = len(self._flapping) > 0
+        self._health_sets.async_publish(
+            HEALTH_SET_FLAPPING, (entity_id for entity_id, _ in self._flapping)
+        )
+        
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            ATTR_ENTITIES: [entity_id for entity_id, _ in self._flapping],
+            ATTR_COUNT: len(self._flapping),
+            ATTR_OUTAGES: dict(self._flapping),
+            ATTR_LAST_UPDATED: dt_util.utcnow().isoformat(),
+        }
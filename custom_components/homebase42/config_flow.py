@@ -10,7 +10,12 @@ from homeassistant import config_entries
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers import selector
+from homeassistant.helpers import (
+    entity_registry as er,
+    floor_registry as fr,
+    label_registry as lr,
+    selector,
+)
 
 from .const import (
     DOMAIN,
@@ -24,6 +29,10 @@ from .const import (
     CONF_CONFIGURE_WEATHER,
     CONF_BLUEPRINT_FRIENT_KEYPAD,
     CONF_TEMPLATE_WEATHER,
+    CONF_EXPORT_STATES_BACKEND,
+    EXPORT_BACKENDS,
+    CONF_EXPORT_STATES_FORMAT,
+    EXPORT_FORMATS,
     DEFAULT_BATTERY_CRITICAL,
     DEFAULT_BATTERY_LOW,
     DEFAULT_UNAVAILABLE_DELAY,
@@ -33,7 +42,75 @@ from .const import (
     DEFAULT_CONFIGURE_WEATHER,
     DEFAULT_BLUEPRINT_FRIENT_KEYPAD,
     DEFAULT_TEMPLATE_WEATHER,
+    DEFAULT_EXPORT_STATES_BACKEND,
+    DEFAULT_EXPORT_STATES_FORMAT,
+    CONF_CONFIGURE_SHUTTERS,
+    CONF_SHUTTER_COVERS,
+    CONF_SHUTTER_WINDOW_SENSORS,
+    CONF_SHUTTER_MORNING_TIME,
+    CONF_SHUTTER_MORNING_COVERS,
+    CONF_SHUTTER_MORNING_POSITION,
+    CONF_SHUTTER_TILTED_POSITION,
+    CONF_SHUTTER_RECLOSE_TIMEOUT,
+    CONF_SHUTTER_FORCE_CLOSE,
+    CONF_SHUTTER_WEATHER_ENTITY,
+    CONF_SHUTTER_WIND_THRESHOLD,
+    CONF_SHUTTER_PANZER_MODE,
+    CONF_SHUTTER_FORCE_STORM_ACTION,
+    CONF_SHUTTER_NIGHT_MODE,
+    CONF_SHUTTER_NOTIFY_DEVICES,
+    CONF_SHUTTER_NOTIFY_TIMEOUT,
+    CONF_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+    CONF_SHUTTER_USE_AREA_NAME,
+    CONF_SHUTTER_SLEEP_MODE,
+    DEFAULT_CONFIGURE_SHUTTERS,
+    DEFAULT_SHUTTER_MORNING_POSITION,
+    DEFAULT_SHUTTER_TILTED_POSITION,
+    DEFAULT_SHUTTER_RECLOSE_TIMEOUT,
+    DEFAULT_SHUTTER_WIND_THRESHOLD,
+    DEFAULT_SHUTTER_NOTIFY_TIMEOUT,
+    DEFAULT_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+    SHUTTER_OPTIONS,
+    CONF_CONFIGURE_KEYPAD,
+    CONF_KEYPAD_TOPIC,
+    CONF_KEYPAD_INVALID_CODE_NOTIFICATION,
+    DEFAULT_CONFIGURE_KEYPAD,
+    DEFAULT_KEYPAD_DELAY,
+    KEYPAD_CODES,
+    KEYPAD_DELAY,
+    KEYPAD_KEYS,
+    KEYPAD_NOTIFICATION,
+    KEYPAD_OPTIONS,
+    KEYPAD_SCRIPT,
+    CONF_CONFIGURE_FORWARDER,
+    CONF_FORWARDER_NOTIFY_DEVICES,
+    CONF_FORWARDER_WINDOW,
+    CONF_FORWARDER_INCLUDE_REMOVED,
+    DEFAULT_CONFIGURE_FORWARDER,
+    DEFAULT_FORWARDER_WINDOW,
+    DEFAULT_FORWARDER_INCLUDE_REMOVED,
+    FORWARDER_OPTIONS,
+    CONF_STALE_THRESHOLDS,
+    DEFAULT_STALE_THRESHOLDS,
+    CONF_FLAPPING_THRESHOLD,
+    CONF_FLAPPING_WINDOW,
+    DEFAULT_FLAPPING_THRESHOLD,
+    DEFAULT_FLAPPING_WINDOW,
+    CONF_BATTERY_DUE_DAYS,
+    DEFAULT_BATTERY_DUE_DAYS,
+    CONF_CONFIGURE_HEALTH_RULES,
+    DEFAULT_CONFIGURE_HEALTH_RULES,
+    HEALTH_RULE_AREAS,
+    HEALTH_RULE_DEVICE_CLASSES,
+    HEALTH_RULE_ENTITY_IDS,
+    HEALTH_RULE_FLOORS,
+    HEALTH_RULE_INTEGRATIONS,
+    HEALTH_RULE_KINDS,
+    HEALTH_RULE_LABELS,
+    HEALTH_RULE_MODES,
+    HEALTH_RULE_OPTIONS,
 )
+from .keypad import parse_codes
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -194,6 +271,8 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         """Initialize options flow."""
         self._user_input: dict[str, Any] = {}
+        # Controller steps that were already shown or skipped
+        self._handled_steps: set[str] = set()
 
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
@@ -216,8 +295,7 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
                 # User didn't select weather configuration, set to False
                 self._user_input[CONF_TEMPLATE_WEATHER] = False
             
-            # No additional steps needed, create entry
-            return self.async_create_entry(title="", data=self._user_input)
+            return await self._async_step_controllers_or_finish()
 
         options = self.config_entry.options
 
@@ -233,6 +311,10 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
                     CONF_BATTERY_LOW_THRESHOLD,
                     default=options.get(CONF_BATTERY_LOW_THRESHOLD, DEFAULT_BATTERY_LOW),
                 ): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+                vol.Optional(
+                    CONF_BATTERY_DUE_DAYS,
+                    default=options.get(CONF_BATTERY_DUE_DAYS, DEFAULT_BATTERY_DUE_DAYS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=365)),
                 vol.Optional(
                     CONF_UNAVAILABLE_NOTIFICATION_DELAY,
                     default=options.get(
@@ -245,6 +327,26 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
                         CONF_INCLUDE_HIDDEN_ENTITIES, DEFAULT_INCLUDE_HIDDEN_ENTITIES
                     ),
                 ): bool,
+                vol.Optional(
+                    CONF_FLAPPING_THRESHOLD,
+                    default=options.get(
+                        CONF_FLAPPING_THRESHOLD, DEFAULT_FLAPPING_THRESHOLD
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=2, max=50)),
+                vol.Optional(
+                    CONF_FLAPPING_WINDOW,
+                    default=options.get(CONF_FLAPPING_WINDOW, DEFAULT_FLAPPING_WINDOW),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=168)),
+                vol.Optional(
+                    CONF_STALE_THRESHOLDS,
+                    default=options.get(CONF_STALE_THRESHOLDS, DEFAULT_STALE_THRESHOLDS),
+                ): selector.ObjectSelector(),
+                vol.Optional(
+                    CONF_CONFIGURE_HEALTH_RULES,
+                    default=options.get(
+                        CONF_CONFIGURE_HEALTH_RULES, DEFAULT_CONFIGURE_HEALTH_RULES
+                    ),
+                ): bool,
                 vol.Optional(
                     CONF_CONFIGURE_BLUEPRINTS,
                     default=options.get(
@@ -257,6 +359,38 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
                         CONF_CONFIGURE_WEATHER, DEFAULT_CONFIGURE_WEATHER
                     ),
                 ): bool,
+                vol.Optional(
+                    CONF_CONFIGURE_SHUTTERS,
+                    default=options.get(
+                        CONF_CONFIGURE_SHUTTERS, DEFAULT_CONFIGURE_SHUTTERS
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_CONFIGURE_KEYPAD,
+                    default=options.get(CONF_CONFIGURE_KEYPAD, DEFAULT_CONFIGURE_KEYPAD),
+                ): bool,
+                vol.Optional(
+                    CONF_CONFIGURE_FORWARDER,
+                    default=options.get(
+                        CONF_CONFIGURE_FORWARDER, DEFAULT_CONFIGURE_FORWARDER
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_EXPORT_STATES_BACKEND,
+                    default=options.get(
+                        CONF_EXPORT_STATES_BACKEND, DEFAULT_EXPORT_STATES_BACKEND
+                    ),
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(options=EXPORT_BACKENDS)
+                ),
+                vol.Optional(
+                    CONF_EXPORT_STATES_FORMAT,
+                    default=options.get(
+                        CONF_EXPORT_STATES_FORMAT, DEFAULT_EXPORT_STATES_FORMAT
+                    ),
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(options=EXPORT_FORMATS)
+                ),
             }
         )
 
@@ -279,8 +413,7 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
                 # User didn't select weather configuration, set to False
                 self._user_input[CONF_TEMPLATE_WEATHER] = False
             
-            # No more steps, create entry
-            return self.async_create_entry(title="", data=self._user_input)
+            return await self._async_step_controllers_or_finish()
 
         options = self.config_entry.options
 
@@ -309,7 +442,7 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
             # Set template_weather to True since user went through this step
             self._user_input[CONF_TEMPLATE_WEATHER] = True
             
-            return self.async_create_entry(title="", data=self._user_input)
+            return await self._async_step_controllers_or_finish()
 
         options = self.config_entry.options
 
@@ -328,3 +461,357 @@ class Homebase42OptionsFlow(config_entries.OptionsFlow):
             step_id="weather_options",
             data_schema=data_schema,
         )
+
+    async def _async_step_controllers_or_finish(self) -> FlowResult:
+        """Show the next requested controller step, otherwise create the entry."""
+        for toggle, keys, step_id in (
+            (CONF_CONFIGURE_HEALTH_RULES, HEALTH_RULE_OPTIONS, "health_rules_options"),
+            (CONF_CONFIGURE_SHUTTERS, SHUTTER_OPTIONS, "shutters_options"),
+            (CONF_CONFIGURE_KEYPAD, KEYPAD_OPTIONS, "keypad_options"),
+            (CONF_CONFIGURE_FORWARDER, FORWARDER_OPTIONS, "forwarder_options"),
+        ):
+            if step_id in self._handled_steps:
+                continue
+            self._handled_steps.add(step_id)
+            if self._user_input.get(toggle, False):
+                return await getattr(self, f"async_step_{step_id}")()
+            
+            # Keep the configuration for when the controller is enabled again
+            for key in keys - {toggle}:
+                if key in self.config_entry.options:
+                    self._user_input[key] = self.config_entry.options[key]
+        
+        return self.async_create_entry(title="", data=self._user_input)
+
+    async def async_step_health_rules_options(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the include/exclude rules of the health monitoring in options."""
+        if user_input is not None:
+            self._user_input.update(user_input)
+            return await self._async_step_controllers_or_finish()
+
+        options = self.config_entry.options
+        entity_reg = er.async_get(self.hass)
+
+        # Choices from the registries and states, other values can be typed in
+        def _choices(
+            values: list[str] | list[selector.SelectOptionDict],
+        ) -> selector.SelectSelector:
+            return selector.SelectSelector(
+                selector.SelectSelectorConfig(
+                    options=values, multiple=True, custom_value=True, sort=True
+                )
+            )
+
+        integrations = sorted({entity.platform for entity in entity_reg.entities.values()})
+        floors = [
+            selector.SelectOptionDict(value=floor.floor_id, label=floor.name)
+            for floor in fr.async_get(self.hass).async_list_floors()
+        ]
+        labels = [
+            selector.SelectOptionDict(value=label.label_id, label=label.name)
+            for label in lr.async_get(self.hass).async_list_labels()
+        ]
+        device_classes = sorted(
+            {
+                device_class
+                for state in self.hass.states.async_all()
+                if isinstance(device_class := state.attributes.get("device_class"), str)
+            }
+        )
+        kind_selectors: dict[str, Any] = {
+            HEALTH_RULE_INTEGRATIONS: _choices(integrations),
+            HEALTH_RULE_AREAS: selector.AreaSelector(
+                selector.AreaSelectorConfig(multiple=True)
+            ),
+            HEALTH_RULE_FLOORS: _choices(floors),
+            HEALTH_RULE_LABELS: _choices(labels),
+            HEALTH_RULE_DEVICE_CLASSES: _choices(device_classes),
+            HEALTH_RULE_ENTITY_IDS: selector.TextSelector(
+                selector.TextSelectorConfig(multiple=True)
+            ),
+        }
+
+        fields: dict[vol.Marker, Any] = {}
+        for mode in HEALTH_RULE_MODES:
+            for kind in HEALTH_RULE_KINDS:
+                key = f"health_{mode}_{kind}"
+                fields[vol.Optional(key, default=options.get(key, []))] = kind_selectors[kind]
+
+        return self.async_show_form(
+            step_id="health_rules_options",
+            data_schema=vol.Schema(fields),
+        )
+
+    async def async_step_shutters_options(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the shutter controller step in options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            # Shutters and window sensors are paired by their position in the lists
+            if len(user_input.get(CONF_SHUTTER_COVERS, [])) != len(
+                user_input.get(CONF_SHUTTER_WINDOW_SENSORS, [])
+            ):
+                errors["base"] = "shutter_sensor_mismatch"
+            else:
+                self._user_input.update(user_input)
+                return await self._async_step_controllers_or_finish()
+
+        options = {**self.config_entry.options, **(user_input or {})}
+
+        def _optional_entity(key: str) -> vol.Optional:
+            """Optional entity field, without a default if nothing is selected."""
+            if options.get(key):
+                return vol.Optional(key, description={"suggested_value": options[key]})
+            return vol.Optional(key)
+
+        def _minutes(minimum: int, maximum: int) -> selector.NumberSelector:
+            return selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=minimum,
+                    max=maximum,
+                    step=1,
+                    unit_of_measurement="min",
+                    mode=selector.NumberSelectorMode.BOX,
+                )
+            )
+
+        percent = selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0,
+                max=100,
+                step=1,
+                unit_of_measurement="%",
+                mode=selector.NumberSelectorMode.SLIDER,
+            )
+        )
+        shutters = selector.EntitySelector(
+            selector.EntitySelectorConfig(
+                domain="cover", device_class="shutter", multiple=True
+            )
+        )
+
+        data_schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_SHUTTER_COVERS, default=options.get(CONF_SHUTTER_COVERS, [])
+                ): shutters,
+                vol.Optional(
+                    CONF_SHUTTER_WINDOW_SENSORS,
+                    default=options.get(CONF_SHUTTER_WINDOW_SENSORS, []),
+                ): selector.EntitySelector(
+                    selector.EntitySelectorConfig(
+                        domain=["binary_sensor", "sensor"], multiple=True
+                    )
+                ),
+                _optional_entity(CONF_SHUTTER_MORNING_TIME): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="input_datetime")
+                ),
+                vol.Optional(
+                    CONF_SHUTTER_MORNING_COVERS,
+                    default=options.get(CONF_SHUTTER_MORNING_COVERS, []),
+                ): shutters,
+                vol.Optional(
+                    CONF_SHUTTER_MORNING_POSITION,
+                    default=options.get(
+                        CONF_SHUTTER_MORNING_POSITION, DEFAULT_SHUTTER_MORNING_POSITION
+                    ),
+                ): percent,
+                vol.Optional(
+                    CONF_SHUTTER_TILTED_POSITION,
+                    default=options.get(
+                        CONF_SHUTTER_TILTED_POSITION, DEFAULT_SHUTTER_TILTED_POSITION
+                    ),
+                ): percent,
+                vol.Optional(
+                    CONF_SHUTTER_RECLOSE_TIMEOUT,
+                    default=options.get(
+                        CONF_SHUTTER_RECLOSE_TIMEOUT, DEFAULT_SHUTTER_RECLOSE_TIMEOUT
+                    ),
+                ): _minutes(1, 120),
+                vol.Optional(
+                    CONF_SHUTTER_FORCE_CLOSE,
+                    default=options.get(CONF_SHUTTER_FORCE_CLOSE, False),
+                ): bool,
+                vol.Optional(
+                    CONF_SHUTTER_WEATHER_ENTITY,
+                    default=options.get(CONF_SHUTTER_WEATHER_ENTITY, DEFAULT_WEATHER_ENTITY),
+                ): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="weather")
+                ),
+                vol.Optional(
+                    CONF_SHUTTER_WIND_THRESHOLD,
+                    default=options.get(
+                        CONF_SHUTTER_WIND_THRESHOLD, DEFAULT_SHUTTER_WIND_THRESHOLD
+                    ),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=30,
+                        max=120,
+                        step=1,
+                        unit_of_measurement="km/h",
+                        mode=selector.NumberSelectorMode.SLIDER,
+                    )
+                ),
+                vol.Optional(
+                    CONF_SHUTTER_PANZER_MODE,
+                    default=options.get(CONF_SHUTTER_PANZER_MODE, False),
+                ): bool,
+                vol.Optional(
+                    CONF_SHUTTER_FORCE_STORM_ACTION,
+                    default=options.get(CONF_SHUTTER_FORCE_STORM_ACTION, False),
+                ): bool,
+                _optional_entity(CONF_SHUTTER_NIGHT_MODE): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="input_boolean")
+                ),
+                vol.Optional(
+                    CONF_SHUTTER_NOTIFY_DEVICES,
+                    default=options.get(CONF_SHUTTER_NOTIFY_DEVICES, []),
+                ): selector.DeviceSelector(
+                    selector.DeviceSelectorConfig(integration="mobile_app", multiple=True)
+                ),
+                vol.Optional(
+                    CONF_SHUTTER_NOTIFY_TIMEOUT,
+                    default=options.get(
+                        CONF_SHUTTER_NOTIFY_TIMEOUT, DEFAULT_SHUTTER_NOTIFY_TIMEOUT
+                    ),
+                ): _minutes(5, 240),
+                vol.Optional(
+                    CONF_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+                    default=options.get(
+                        CONF_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+                        DEFAULT_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+                    ),
+                ): _minutes(5, 480),
+                vol.Optional(
+                    CONF_SHUTTER_USE_AREA_NAME,
+                    default=options.get(CONF_SHUTTER_USE_AREA_NAME, False),
+                ): bool,
+                _optional_entity(CONF_SHUTTER_SLEEP_MODE): selector.EntitySelector(
+                    selector.EntitySelectorConfig(domain="input_boolean")
+                ),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="shutters_options",
+            data_schema=data_schema,
+            errors=errors,
+        )
+
+    async def async_step_keypad_options(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the keypad handler step in options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            for key in KEYPAD_KEYS:
+                try:
+                    parse_codes(user_input.get(f"keypad_{key}_{KEYPAD_CODES}", ""))
+                except ValueError:
+                    errors[f"keypad_{key}_{KEYPAD_CODES}"] = "invalid_keypad_codes"
+            if not errors:
+                self._user_input.update(user_input)
+                return await self._async_step_controllers_or_finish()
+
+        options = {**self.config_entry.options, **(user_input or {})}
+
+        fields: dict[vol.Marker, Any] = {
+            vol.Required(
+                CONF_KEYPAD_TOPIC, default=options.get(CONF_KEYPAD_TOPIC, "")
+            ): selector.TextSelector(),
+        }
+        for key in KEYPAD_KEYS:
+            codes_key = f"keypad_{key}_{KEYPAD_CODES}"
+            script_key = f"keypad_{key}_{KEYPAD_SCRIPT}"
+            delay_key = f"keypad_{key}_{KEYPAD_DELAY}"
+            notification_key = f"keypad_{key}_{KEYPAD_NOTIFICATION}"
+            fields[vol.Optional(codes_key, default=options.get(codes_key, ""))] = (
+                selector.TextSelector()
+            )
+            if options.get(script_key):
+                script_marker = vol.Optional(
+                    script_key, description={"suggested_value": options[script_key]}
+                )
+            else:
+                script_marker = vol.Optional(script_key)
+            fields[script_marker] = selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="script")
+            )
+            fields[
+                vol.Optional(
+                    delay_key,
+                    default=options.get(
+                        delay_key, 0 if key == "emergency" else DEFAULT_KEYPAD_DELAY
+                    ),
+                )
+            ] = selector.NumberSelector(
+                selector.NumberSelectorConfig(
+                    min=0,
+                    max=60,
+                    step=1,
+                    unit_of_measurement="s",
+                    mode=selector.NumberSelectorMode.BOX,
+                )
+            )
+            fields[
+                vol.Optional(notification_key, default=options.get(notification_key, True))
+            ] = bool
+        fields[
+            vol.Optional(
+                CONF_KEYPAD_INVALID_CODE_NOTIFICATION,
+                default=options.get(CONF_KEYPAD_INVALID_CODE_NOTIFICATION, True),
+            )
+        ] = bool
+
+        return self.async_show_form(
+            step_id="keypad_options",
+            data_schema=vol.Schema(fields),
+            errors=errors,
+        )
+
+    async def async_step_forwarder_options(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle the notification forwarder step in options."""
+        if user_input is not None:
+            self._user_input.update(user_input)
+            return await self._async_step_controllers_or_finish()
+
+        options = self.config_entry.options
+
+        data_schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_FORWARDER_NOTIFY_DEVICES,
+                    default=options.get(CONF_FORWARDER_NOTIFY_DEVICES, []),
+                ): selector.DeviceSelector(
+                    selector.DeviceSelectorConfig(integration="mobile_app", multiple=True)
+                ),
+                vol.Optional(
+                    CONF_FORWARDER_WINDOW,
+                    default=options.get(CONF_FORWARDER_WINDOW, DEFAULT_FORWARDER_WINDOW),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=5,
+                        max=600,
+                        step=5,
+                        unit_of_measurement="s",
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
+                vol.Optional(
+                    CONF_FORWARDER_INCLUDE_REMOVED,
+                    default=options.get(
+                        CONF_FORWARDER_INCLUDE_REMOVED, DEFAULT_FORWARDER_INCLUDE_REMOVED
+                    ),
+                ): bool,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="forwarder_options",
+            data_schema=data_schema,
+        )
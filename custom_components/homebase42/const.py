@@ -6,16 +6,84 @@ NAME = "Homebase42"
 # Config flow constants
 CONF_BATTERY_CRITICAL_THRESHOLD = "battery_critical_threshold"
 CONF_BATTERY_LOW_THRESHOLD = "battery_low_threshold"
+CONF_BATTERY_DUE_DAYS = "battery_due_days"
 CONF_UNAVAILABLE_NOTIFICATION_DELAY = "unavailable_notification_delay"
 CONF_INCLUDE_HIDDEN_ENTITIES = "include_hidden_entities"
 CONF_WEATHER_ENTITY = "weather_entity"
 CONF_EXPORT_STATES_ENABLED = "export_states_enabled"
 CONF_EXPORT_STATES_PATH = "export_states_path"
 CONF_EXPORT_STATES_INTERVAL = "export_states_interval"
+CONF_EXPORT_STATES_BACKEND = "export_states_backend"
+CONF_EXPORT_STATES_FORMAT = "export_states_format"
+CONF_STALE_THRESHOLDS = "stale_thresholds"
+CONF_FLAPPING_THRESHOLD = "flapping_threshold"
+CONF_FLAPPING_WINDOW = "flapping_window"
 
 # Multi-step flow toggles
 CONF_CONFIGURE_BLUEPRINTS = "configure_blueprints"
 CONF_CONFIGURE_WEATHER = "configure_weather"
+CONF_CONFIGURE_SHUTTERS = "configure_shutters"
+CONF_CONFIGURE_KEYPAD = "configure_keypad"
+CONF_CONFIGURE_FORWARDER = "configure_notification_forwarder"
+CONF_CONFIGURE_HEALTH_RULES = "configure_health_rules"
+
+# Shutter controller
+CONF_SHUTTER_COVERS = "shutter_covers"
+CONF_SHUTTER_WINDOW_SENSORS = "shutter_window_sensors"
+CONF_SHUTTER_MORNING_TIME = "shutter_morning_time"
+CONF_SHUTTER_MORNING_COVERS = "shutter_morning_covers"
+CONF_SHUTTER_MORNING_POSITION = "shutter_morning_position"
+CONF_SHUTTER_TILTED_POSITION = "shutter_tilted_position"
+CONF_SHUTTER_RECLOSE_TIMEOUT = "shutter_reclose_timeout"
+CONF_SHUTTER_FORCE_CLOSE = "shutter_force_close"
+CONF_SHUTTER_WEATHER_ENTITY = "shutter_weather_entity"
+CONF_SHUTTER_WIND_THRESHOLD = "shutter_wind_threshold"
+CONF_SHUTTER_PANZER_MODE = "shutter_panzer_mode"
+CONF_SHUTTER_FORCE_STORM_ACTION = "shutter_force_storm_action"
+CONF_SHUTTER_NIGHT_MODE = "shutter_night_mode"
+CONF_SHUTTER_NOTIFY_DEVICES = "shutter_notify_devices"
+CONF_SHUTTER_NOTIFY_TIMEOUT = "shutter_notify_timeout"
+CONF_SHUTTER_NOTIFY_TIMEOUT_TILTED = "shutter_notify_timeout_tilted"
+CONF_SHUTTER_USE_AREA_NAME = "shutter_use_area_name"
+CONF_SHUTTER_SLEEP_MODE = "shutter_sleep_mode"
+
+# Keypad handler
+CONF_KEYPAD_TOPIC = "keypad_topic"
+CONF_KEYPAD_INVALID_CODE_NOTIFICATION = "keypad_invalid_code_notification"
+
+# Keypad keys (value of "action" in the MQTT payload)
+KEYPAD_KEYS = ("disarm", "arm_all_zones", "arm_day_zones", "arm_night_zones", "emergency")
+# Per key options are named keypad_<key>_<suffix>
+KEYPAD_CODES = "codes"
+KEYPAD_SCRIPT = "script"
+KEYPAD_DELAY = "delay"
+KEYPAD_NOTIFICATION = "notification"
+KEYPAD_KEY_OPTIONS = (KEYPAD_CODES, KEYPAD_SCRIPT, KEYPAD_DELAY, KEYPAD_NOTIFICATION)
+
+# Notification forwarder
+CONF_FORWARDER_NOTIFY_DEVICES = "forwarder_notify_devices"
+CONF_FORWARDER_WINDOW = "forwarder_window"
+CONF_FORWARDER_INCLUDE_REMOVED = "forwarder_include_removed"
+
+# Health rules (which entities the health monitoring looks at)
+HEALTH_RULE_INCLUDE = "include"
+HEALTH_RULE_EXCLUDE = "exclude"
+HEALTH_RULE_MODES = (HEALTH_RULE_INCLUDE, HEALTH_RULE_EXCLUDE)
+# Per mode options are named health_<mode>_<kind>
+HEALTH_RULE_INTEGRATIONS = "integrations"
+HEALTH_RULE_AREAS = "areas"
+HEALTH_RULE_FLOORS = "floors"
+HEALTH_RULE_LABELS = "labels"
+HEALTH_RULE_DEVICE_CLASSES = "device_classes"
+HEALTH_RULE_ENTITY_IDS = "entity_ids"  # glob patterns, e.g. sensor.gast_*
+HEALTH_RULE_KINDS = (
+    HEALTH_RULE_INTEGRATIONS,
+    HEALTH_RULE_AREAS,
+    HEALTH_RULE_FLOORS,
+    HEALTH_RULE_LABELS,
+    HEALTH_RULE_DEVICE_CLASSES,
+    HEALTH_RULE_ENTITY_IDS,
+)
 
 # Optional Blueprints
 CONF_BLUEPRINT_FRIENT_KEYPAD = "blueprint_frient_keypad"
@@ -23,9 +91,20 @@ CONF_BLUEPRINT_FRIENT_KEYPAD = "blueprint_frient_keypad"
 # Optional Templates
 CONF_TEMPLATE_WEATHER = "template_weather"
 
+# Export backends
+EXPORT_BACKEND_EXECUTOR = "executor"  # transform and write in an executor thread
+EXPORT_BACKEND_SUBPROCESS = "subprocess"  # transform and write in a worker process
+EXPORT_BACKENDS = [EXPORT_BACKEND_EXECUTOR, EXPORT_BACKEND_SUBPROCESS]
+
+# Export formats
+EXPORT_FORMAT_JSON = "json"  # single JSON document
+EXPORT_FORMAT_NDJSON = "ndjson"  # one entity per line plus a sidecar offset index
+EXPORT_FORMATS = [EXPORT_FORMAT_JSON, EXPORT_FORMAT_NDJSON]
+
 # Default values
 DEFAULT_BATTERY_CRITICAL = 20
 DEFAULT_BATTERY_LOW = 50
+DEFAULT_BATTERY_DUE_DAYS = 30
 DEFAULT_UNAVAILABLE_DELAY = 3  # hours
 DEFAULT_INCLUDE_HIDDEN_ENTITIES = False
 DEFAULT_WEATHER_ENTITY = "weather.forecast_home"
@@ -36,11 +115,64 @@ DEFAULT_TEMPLATE_WEATHER = False
 DEFAULT_EXPORT_STATES_ENABLED = True
 DEFAULT_EXPORT_STATES_PATH = "homebase42_state_export.json"
 DEFAULT_EXPORT_STATES_INTERVAL = 60  # minutes
+DEFAULT_EXPORT_STATES_BACKEND = EXPORT_BACKEND_EXECUTOR
+DEFAULT_EXPORT_STATES_FORMAT = EXPORT_FORMAT_JSON
+DEFAULT_FLAPPING_THRESHOLD = 5  # outages within the window
+DEFAULT_FLAPPING_WINDOW = 24  # hours
+# Hours without an update after which an entity counts as stale (device_class or domain)
+DEFAULT_STALE_THRESHOLDS = {
+    "temperature": 12,
+    "humidity": 12,
+    "pressure": 12,
+}
+DEFAULT_CONFIGURE_SHUTTERS = False
+DEFAULT_SHUTTER_MORNING_POSITION = 100  # %
+DEFAULT_SHUTTER_TILTED_POSITION = 20  # %
+DEFAULT_SHUTTER_RECLOSE_TIMEOUT = 30  # minutes
+DEFAULT_SHUTTER_WIND_THRESHOLD = 55  # km/h
+DEFAULT_SHUTTER_NOTIFY_TIMEOUT = 45  # minutes
+DEFAULT_SHUTTER_NOTIFY_TIMEOUT_TILTED = 60  # minutes
+DEFAULT_CONFIGURE_KEYPAD = False
+DEFAULT_KEYPAD_DELAY = 3  # seconds (0 for emergency)
+DEFAULT_CONFIGURE_FORWARDER = False
+DEFAULT_FORWARDER_WINDOW = 30  # seconds
+DEFAULT_FORWARDER_INCLUDE_REMOVED = False
+DEFAULT_CONFIGURE_HEALTH_RULES = False
+
+# Entity sets of the health entities (streamed by the websocket subscription)
+HEALTH_SET_UNAVAILABLE = "unavailable"
+HEALTH_SET_BATTERY_CRITICAL = "battery_critical"
+HEALTH_SET_BATTERY_LOW = "battery_low"
+HEALTH_SET_STALE = "stale"
+HEALTH_SET_FLAPPING = "flapping"
+HEALTH_SETS = (
+    HEALTH_SET_UNAVAILABLE,
+    HEALTH_SET_BATTERY_CRITICAL,
+    HEALTH_SET_BATTERY_LOW,
+    HEALTH_SET_STALE,
+    HEALTH_SET_FLAPPING,
+)
 
 # Attributes
 ATTR_ENTITIES = "entities"
 ATTR_COUNT = "count"
 ATTR_LAST_UPDATED = "last_updated"
+ATTR_DIGEST = "digest"
+ATTR_OUTAGES = "outages"
+ATTR_FORECASTS = "forecasts"
+
+# Attributes of the health entities that are not written to the recorder
+# (the transitions are kept in the health log instead)
+UNRECORDED_ATTRIBUTES = frozenset(
+    {
+        ATTR_ENTITIES,
+        ATTR_COUNT,
+        ATTR_LAST_UPDATED,
+        ATTR_DIGEST,
+        ATTR_OUTAGES,
+        ATTR_FORECASTS,
+    }
+)
 
 # Blueprint directories
 BLUEPRINTS_CORE = "core"
@@ -55,9 +187,97 @@ OPTIONAL_BLUEPRINTS = {
 }
 
 # Optional template mapping (filename -> config key)
-OPTIONAL_TEMPLATES = {
-    "s42_weather_forecasts.yaml": CONF_TEMPLATE_WEATHER,
-}
+OPTIONAL_TEMPLATES: dict[str, str] = {}
+
+# Templates replaced by native entities (removed from packages/homebase42 if installed)
+RETIRED_TEMPLATES = (
+    # Replaced by the weather forecast coordinator and sensors
+    "s42_weather_forecasts.yaml",
+)
+
+# Options that change the installed assets or the set of entities
+# (everything else is applied live)
+RELOAD_OPTIONS = frozenset(
+    {
+        CONF_BLUEPRINT_FRIENT_KEYPAD,
+        CONF_TEMPLATE_WEATHER,
+        CONF_WEATHER_ENTITY,
+    }
+)
+
+# Options of the automatic export (changes only reschedule the export timer)
+EXPORT_OPTIONS = frozenset(
+    {
+        CONF_EXPORT_STATES_ENABLED,
+        CONF_EXPORT_STATES_PATH,
+        CONF_EXPORT_STATES_INTERVAL,
+    }
+)
+
+# Options of the shutter controller (changes restart only the controller)
+SHUTTER_OPTIONS = frozenset(
+    {
+        CONF_CONFIGURE_SHUTTERS,
+        CONF_SHUTTER_COVERS,
+        CONF_SHUTTER_WINDOW_SENSORS,
+        CONF_SHUTTER_MORNING_TIME,
+        CONF_SHUTTER_MORNING_COVERS,
+        CONF_SHUTTER_MORNING_POSITION,
+        CONF_SHUTTER_TILTED_POSITION,
+        CONF_SHUTTER_RECLOSE_TIMEOUT,
+        CONF_SHUTTER_FORCE_CLOSE,
+        CONF_SHUTTER_WEATHER_ENTITY,
+        CONF_SHUTTER_WIND_THRESHOLD,
+        CONF_SHUTTER_PANZER_MODE,
+        CONF_SHUTTER_FORCE_STORM_ACTION,
+        CONF_SHUTTER_NIGHT_MODE,
+        CONF_SHUTTER_NOTIFY_DEVICES,
+        CONF_SHUTTER_NOTIFY_TIMEOUT,
+        CONF_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+        CONF_SHUTTER_USE_AREA_NAME,
+        CONF_SHUTTER_SLEEP_MODE,
+    }
+)
+
+# Options of the keypad handler (changes restart only the handler)
+KEYPAD_OPTIONS = frozenset(
+    {
+        CONF_CONFIGURE_KEYPAD,
+        CONF_KEYPAD_TOPIC,
+        CONF_KEYPAD_INVALID_CODE_NOTIFICATION,
+        *(f"keypad_{key}_{suffix}" for key in KEYPAD_KEYS for suffix in KEYPAD_KEY_OPTIONS),
+    }
+)
+
+# Options of the notification forwarder (changes restart only the forwarder)
+FORWARDER_OPTIONS = frozenset(
+    {
+        CONF_CONFIGURE_FORWARDER,
+        CONF_FORWARDER_NOTIFY_DEVICES,
+        CONF_FORWARDER_WINDOW,
+        CONF_FORWARDER_INCLUDE_REMOVED,
+    }
+)
+
+# Options of the health rules (changes recompile the rules)
+HEALTH_RULE_OPTIONS = frozenset(
+    {
+        CONF_CONFIGURE_HEALTH_RULES,
+        *(f"health_{mode}_{kind}" for mode in HEALTH_RULE_MODES for kind in HEALTH_RULE_KINDS),
+    }
+)
+
+# Dispatcher signal sent when options were applied live ({entry_id} is appended)
+SIGNAL_OPTIONS_UPDATED = f"{DOMAIN}_options_updated"
+# Dispatcher signal sent when the set of stale entities changed ({entry_id} is appended)
+SIGNAL_STALE_UPDATED = f"{DOMAIN}_stale_updated"
+# Dispatcher signal sent when the set of flapping entities changed ({entry_id} is appended)
+SIGNAL_FLAPPING_UPDATED = f"{DOMAIN}_flapping_updated"
+# Dispatcher signal sent when a battery forecast changed ({entry_id} is appended)
+SIGNAL_BATTERY_UPDATED = f"{DOMAIN}_battery_updated"
+# Dispatcher signal sent when the health rules decide differently for entities
+# ({entry_id} is appended, the changed entity_ids or None for all are passed)
+SIGNAL_RULES_UPDATED = f"{DOMAIN}_rules_updated"
 
 # Repair issues
 REPAIR_RESTART_REQUIRED = "restart_required_templates"
@@ -0,0 +1,127 @@
+"""Weather forecast coordinator for Homebase42.
+
+Fetches the daily and hourly forecast of the configured weather entity once
+per hour (at the full hour) and caches it for the forecast sensors.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+from typing import Any
+
+from homeassistant.components.weather import WeatherEntityFeature
+from homeassistant.const import ATTR_SUPPORTED_FEATURES, STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_change
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+FORECAST_DAILY = "daily"
+FORECAST_HOURLY = "hourly"
+
+# Forecast type -> feature the weather entity needs to provide it
+FORECAST_FEATURES = {
+    FORECAST_DAILY: WeatherEntityFeature.FORECAST_DAILY,
+    FORECAST_HOURLY: WeatherEntityFeature.FORECAST_HOURLY,
+}
+
+
+@dataclass(slots=True)
+class WeatherForecasts:
+    """Cached forecasts of a weather entity."""
+
+    condition: str | None
+    daily: list[dict[str, Any]]
+    hourly: list[dict[str, Any]]
+    updated: datetime
+
+
+class WeatherForecastCoordinator(DataUpdateCoordinator[WeatherForecasts]):
+    """Fetch the forecasts of a weather entity once and share them."""
+
+    def __init__(self, hass: HomeAssistant, weather_entity: str) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} weather forecast",
+            # Refreshed at the full hour, see async_setup
+            update_interval=None,
+        )
+        self.weather_entity = weather_entity
+        self._unsubs: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_setup(self) -> None:
+        """Refresh at every full hour and when the weather entity becomes available."""
+        self._unsubs = [
+            async_track_time_change(
+                self.hass, self._async_handle_full_hour, minute=0, second=0
+            ),
+            async_track_state_change_event(
+                self.hass, [self.weather_entity], self._async_weather_changed
+            ),
+        ]
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop the refresh listeners."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    async def _async_handle_full_hour(self, now: datetime) -> None:
+        """Refresh the forecasts."""
+        await self.async_refresh()
+
+    @callback
+    def _async_weather_changed(self, event: Event) -> None:
+        """Fetch forecasts as soon as the weather entity is available (e.g. at startup)."""
+        if self.data is not None and self.last_update_success:
+            return
+        new_state = event.data.get("new_state")
+        if new_state is None or new_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return
+        self.hass.async_create_task(self.async_request_refresh())
+
+    async def _async_update_data(self) -> WeatherForecasts:
+        """Fetch daily and hourly forecasts with one service call per type."""
+        state = self.hass.states.get(self.weather_entity)
+        if state is None or state.state == STATE_UNAVAILABLE:
+            raise UpdateFailed(f"{self.weather_entity} is not available")
+
+        supported = state.attributes.get(ATTR_SUPPORTED_FEATURES, 0)
+        forecasts: dict[str, list[dict[str, Any]]] = {}
+        for forecast_type, feature in FORECAST_FEATURES.items():
+            if not supported & feature:
+                forecasts[forecast_type] = []
+                continue
+            try:
+                response = await self.hass.services.async_call(
+                    "weather",
+                    "get_forecasts",
+                    {"type": forecast_type},
+                    target={"entity_id": self.weather_entity},
+                    blocking=True,
+                    return_response=True,
+                )
+            except HomeAssistantError as err:
+                raise UpdateFailed(
+                    f"Failed to get {forecast_type} forecast of {self.weather_entity}: {err}"
+                ) from err
+            forecasts[forecast_type] = (response or {}).get(self.weather_entity, {}).get(
+                "forecast", []
+            )
+
+        return WeatherForecasts(
+            condition=state.state,
+            daily=forecasts[FORECAST_DAILY],
+            hourly=forecasts[FORECAST_HOURLY],
+            updated=dt_util.now(),
+        )
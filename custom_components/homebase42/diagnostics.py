@@ -0,0 +1,45 @@
+"""Diagnostics support for Homebase42."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, KEYPAD_CODES, KEYPAD_KEYS
+
+# Keypad codes are secrets
+TO_REDACT = {f"keypad_{key}_{KEYPAD_CODES}" for key in KEYPAD_KEYS}
+
+# hass.data keys of the trackers with a size
+SIZED = (
+    "index",
+    "rules",
+    "health_log",
+    "unavailable",
+    "stale",
+    "flapping",
+    "batteries",
+    "statistics",
+)
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data: dict[str, Any] = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "options": async_redact_data(entry.options, TO_REDACT),
+        "setup_duration": entry_data.get("setup_duration"),
+        "asset_sync_duration": entry_data.get("asset_sync_duration"),
+        "sizes": {
+            key: entry_data[key].size for key in SIZED if key in entry_data
+        },
+        "controllers": {
+            key: entry_data.get(key) is not None
+            for key in ("weather", "shutters", "keypad", "forwarder")
+        },
+        "metrics": entry_data["metrics"].async_as_dict(),
+    }
@@ -0,0 +1,302 @@
+"""State export transform and serialization for Homebase42.
+
+The functions in this module only work on plain Python data (a compact snapshot
+of states and already resolved registry data). They do not touch Home Assistant
+objects, so they can run in an executor thread or in a separate worker process.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import date, datetime, time
+from enum import Enum
+import json
+import logging
+from pathlib import Path
+from typing import Any
+import uuid
+
+import orjson
+
+from .const import EXPORT_FORMAT_NDJSON
+from .files import write_atomic
+from .reader import INDEX_SUFFIX, INDEX_VERSION
+
+_LOGGER = logging.getLogger(__name__)
+
+SERIALIZER_ORJSON = "orjson"
+SERIALIZER_JSON = "json"
+
+# Attributes that are already exported as top level fields or are not useful for LLMs
+SKIPPED_ATTRIBUTES = frozenset(
+    {
+        "entity_picture",
+        "friendly_name",
+        "icon",
+        "device_class",
+        "unit_of_measurement",
+        "supported_features",
+        "attribution",
+    }
+)
+
+# Snapshot row layout (one tuple per state, keeps pickling between processes cheap)
+# (entity_id, domain, state, attributes, last_changed, last_updated, area_name, registry)
+# registry is None or (entity_category, disabled, hidden, platform, original_name)
+
+
+def build_export_data(
+    header: dict[str, Any],
+    floors_and_areas: dict[str, Any],
+    snapshot: list[tuple],
+    include_attributes: bool = True,
+    include_context: bool = True,
+    summary: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Transform a state snapshot into the export document.
+
+    If a precomputed summary (from the live entity index) is passed it is used
+    as is, otherwise the counts by domain and area are collected here.
+    """
+    count_summary = summary is None
+    if count_summary:
+        summary = {
+            "by_domain": {},
+            "by_area": {},
+        }
+    states_by_domain: dict[str, list[dict[str, Any]]] = {}
+
+    for (
+        entity_id,
+        domain,
+        state,
+        attributes,
+        last_changed,
+        last_updated,
+        area_name,
+        registry,
+    ) in snapshot:
+        entity_data: dict[str, Any] = {
+            "entity_id": entity_id,
+            "state": state,
+            "domain": domain,
+            "friendly_name": attributes.get("friendly_name", ""),
+            "device_class": attributes.get("device_class", ""),
+            "unit": attributes.get("unit_of_measurement", ""),
+            "supported_features": attributes.get("supported_features", 0),
+        }
+
+        # Add entity registry info if requested
+        if include_context and registry is not None:
+            (
+                entity_data["entity_category"],
+                entity_data["disabled"],
+                entity_data["hidden"],
+                entity_data["platform"],
+                entity_data["original_name"],
+            ) = registry
+
+        entity_data["area"] = area_name
+
+        # Add timestamps if requested
+        if include_context:
+            entity_data["last_changed"] = last_changed.isoformat()
+            entity_data["last_updated"] = last_updated.isoformat()
+
+        # Add all attributes if requested
+        if include_attributes:
+            # Filter out large attributes and internal ones.
+            # Datetimes, enums and sets are left as they are, the serializer handles them.
+            filtered_attrs = {
+                k: v
+                for k, v in attributes.items()
+                if k not in SKIPPED_ATTRIBUTES and not isinstance(v, (bytes, bytearray))
+            }
+
+            if filtered_attrs:
+                entity_data["attributes"] = filtered_attrs
+
+        # Group by domain
+        states_by_domain.setdefault(domain, []).append(entity_data)
+
+        # Update summary
+        if count_summary:
+            summary["by_domain"][domain] = summary["by_domain"].get(domain, 0) + 1
+            summary["by_area"][area_name] = summary["by_area"].get(area_name, 0) + 1
+
+    # Sort entities within each domain by entity_id
+    for entities in states_by_domain.values():
+        entities.sort(key=lambda x: x["entity_id"])
+
+    # Build export data with summary first
+    return {
+        **header,
+        "total_entities": len(snapshot),
+        "summary": summary,
+        "floors_and_areas": floors_and_areas,
+        "states_by_domain": states_by_domain,
+    }
+
+
+def _json_default(obj: Any) -> Any:
+    """Convert values the stdlib encoder does not know about."""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Convert values orjson does not handle natively.
+
+    Covers what the Home Assistant encoder converts (sets, float subclasses,
+    as_dict objects, paths) without importing its helpers into the worker
+    process, and falls back to str() like the stdlib serializer does.
+    """
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, float):
+        return float(obj)
+    if hasattr(obj, "as_dict"):
+        return obj.as_dict()
+    if isinstance(obj, Path):
+        return obj.as_posix()
+    return str(obj)
+
+
+def serialize_json(export_data: dict[str, Any]) -> bytes:
+    """Serialize with the stdlib json module."""
+    return json.dumps(
+        export_data, indent=2, ensure_ascii=False, default=_json_default
+    ).encode("utf-8")
+
+
+def serialize_orjson(export_data: dict[str, Any]) -> bytes:
+    """Serialize with orjson (datetimes, enums and dataclasses are handled natively)."""
+    return orjson.dumps(
+        export_data,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+        default=_orjson_default,
+    )
+
+
+# Available serializers (name -> function returning UTF-8 encoded JSON)
+SERIALIZERS: dict[str, Callable[[dict[str, Any]], bytes]] = {
+    SERIALIZER_ORJSON: serialize_orjson,
+    SERIALIZER_JSON: serialize_json,
+}
+
+
+def serialize(export_data: dict[str, Any], serializer: str = SERIALIZER_ORJSON) -> bytes:
+    """Serialize the export document, falling back to the stdlib serializer."""
+    if serializer != SERIALIZER_JSON:
+        try:
+            return SERIALIZERS[serializer](export_data)
+        except (KeyError, TypeError, orjson.JSONEncodeError) as err:
+            # e.g. integers above 64 bit or recursion that orjson refuses
+            _LOGGER.debug("Serializer %s failed (%s), using stdlib json", serializer, err)
+    return serialize_json(export_data)
+
+
+def serialize_line(data: dict[str, Any], serializer: str = SERIALIZER_ORJSON) -> bytes:
+    """Serialize a single NDJSON line (compact, without the trailing newline)."""
+    if serializer != SERIALIZER_JSON:
+        try:
+            return orjson.dumps(
+                data, option=orjson.OPT_NON_STR_KEYS, default=_orjson_default
+            )
+        except TypeError as err:
+            _LOGGER.debug("Serializer %s failed (%s), using stdlib json", serializer, err)
+    return json.dumps(
+        data, ensure_ascii=False, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+def index_path_for(file_path: Path) -> Path:
+    """Return the path of the sidecar index that belongs to an NDJSON export."""
+    return file_path.with_suffix(INDEX_SUFFIX)
+
+
+def write_ndjson_file(
+    file_path: Path, export_data: dict[str, Any], serializer: str = SERIALIZER_ORJSON
+) -> None:
+    """Write the export as NDJSON plus a sidecar offset index.
+
+    The first line holds everything except the entities. It is followed by one
+    line per entity, sorted by domain and entity_id, so every domain is one
+    contiguous byte range. The index maps entity_ids to (offset, length), domains
+    to byte ranges and areas to their entity_ids.
+    
+    Both files are replaced atomically, the body first and the index last. The
+    header line and the index carry the same export_id, so a reader that opens
+    the new body with the old index notices the mismatch.
+    """
+    states_by_domain = export_data["states_by_domain"]
+    export_id = uuid.uuid4().hex
+    header = {k: v for k, v in export_data.items() if k != "states_by_domain"}
+    header["export_id"] = export_id
+
+    lines = [serialize_line(header, serializer)]
+    offset = len(lines[0]) + 1
+    entities: dict[str, tuple[int, int]] = {}
+    domains: dict[str, tuple[int, int]] = {}
+    areas: dict[str, list[str]] = {}
+    for domain in sorted(states_by_domain):
+        domain_start = offset
+        for entity_data in states_by_domain[domain]:
+            line = serialize_line(entity_data, serializer)
+            lines.append(line)
+            entities[entity_data["entity_id"]] = (offset, len(line))
+            areas.setdefault(entity_data["area"], []).append(entity_data["entity_id"])
+            offset += len(line) + 1
+        domains[domain] = (domain_start, offset - domain_start)
+
+    index = {
+        "version": INDEX_VERSION,
+        "export_id": export_id,
+        "body": file_path.name,
+        "size": offset,
+        "header": (0, len(lines[0])),
+        "entities": entities,
+        "domains": domains,
+        "areas": areas,
+    }
+
+    write_atomic(file_path, (chunk for line in lines for chunk in (line, b"\n")))
+    write_atomic(index_path_for(file_path), (serialize_line(index, serializer),))
+
+
+def write_json_file(
+    file_path: Path, export_data: dict[str, Any], serializer: str = SERIALIZER_ORJSON
+) -> None:
+    """Write the export document to disk."""
+    payload = serialize(export_data, serializer)
+    write_atomic(file_path, (payload,))
+
+
+def run_export(
+    file_path: Path,
+    header: dict[str, Any],
+    floors_and_areas: dict[str, Any],
+    snapshot: list[tuple],
+    include_attributes: bool = True,
+    include_context: bool = True,
+    summary: dict[str, Any] | None = None,
+    export_format: str | None = None,
+    serializer: str = SERIALIZER_ORJSON,
+) -> int:
+    """Transform and write an export (blocking).
+
+    This is the entry point for both the executor and the worker process backend.
+    Returns the number of exported entities.
+    """
+    export_data = build_export_data(
+        header, floors_and_areas, snapshot, include_attributes, include_context, summary
+    )
+    if export_format == EXPORT_FORMAT_NDJSON:
+        write_ndjson_file(file_path, export_data, serializer)
+    else:
+        write_json_file(file_path, export_data, serializer)
+    return export_data["total_entities"]
@@ -0,0 +1,26 @@
+"""File helpers for Homebase42.
+
+Only depends on the standard library. The export worker process imports this
+module next to export.py, the package __init__ does not import the integration
+modules, so keep it free of Home Assistant helpers.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+import os
+from pathlib import Path
+import tempfile
+
+
+def write_atomic(path: Path, chunks: Iterable[bytes]) -> None:
+    """Write a file via a temporary file and rename, so it is never half written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            for chunk in chunks:
+                tmp_file.write(chunk)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
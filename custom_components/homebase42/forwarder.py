@@ -0,0 +1,220 @@
+"""Notification forwarder for Homebase42.
+
+Native replacement for the s42_persistent_notification_to_mobile blueprint.
+Persistent notification updates are collected over a short window, updates of
+the same notification and identical notifications are merged, and every
+target gets one digest per window. Targets that fail are retried with an
+increasing delay, new notifications are added to their next digest.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+import logging
+from typing import Any
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import slugify
+
+from .const import (
+    CONF_FORWARDER_NOTIFY_DEVICES,
+    CONF_FORWARDER_WINDOW,
+    CONF_FORWARDER_INCLUDE_REMOVED,
+    DEFAULT_FORWARDER_WINDOW,
+    DEFAULT_FORWARDER_INCLUDE_REMOVED,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper limit for the retry delay of a failing target (seconds)
+MAX_BACKOFF = 3600
+# Lines in a digest, the rest is summarized
+MAX_DIGEST_LINES = 20
+
+
+@dataclass(slots=True)
+class ForwardedNotification:
+    """Latest state of a notification within a window."""
+
+    title: str | None
+    message: str
+    removed: bool = False
+
+    @property
+    def line(self) -> str:
+        """Return the notification as one digest line."""
+        text = f"{self.title}: {self.message}" if self.title else self.message
+        return f"Entfernt: {text}" if self.removed else text
+
+
+@dataclass(slots=True)
+class NotifyTarget:
+    """Delivery state of a notify service."""
+
+    service: str
+    # notification_id -> notification not delivered yet
+    backlog: dict[str, ForwardedNotification] = field(default_factory=dict)
+    failures: int = 0
+    retry: CALLBACK_TYPE | None = None
+    sending: bool = False
+
+
+def render_digest(notifications: list[ForwardedNotification]) -> tuple[str | None, str]:
+    """Return title and message for a list of notifications.
+
+    A single notification is sent as it is, identical lines are merged.
+    """
+    if len(notifications) == 1 and not notifications[0].removed:
+        return notifications[0].title, notifications[0].message
+
+    counts: dict[str, int] = {}
+    for notification in notifications:
+        counts[notification.line] = counts.get(notification.line, 0) + 1
+    lines = [
+        f"• {line} ({count}×)" if count > 1 else f"• {line}"
+        for line, count in counts.items()
+    ]
+    if len(lines) > MAX_DIGEST_LINES:
+        hidden = len(lines) - MAX_DIGEST_LINES
+        lines = [*lines[:MAX_DIGEST_LINES], f"… und {hidden} weitere"]
+    return f"{len(notifications)} Benachrichtigungen", "\n".join(lines)
+
+
+class NotificationForwarder:
+    """Forward persistent notifications to mobile apps in batches."""
+
+    def __init__(self, hass: HomeAssistant, options: Mapping[str, Any]) -> None:
+        """Compile the options."""
+        self.hass = hass
+        self._device_ids: list[str] = options.get(CONF_FORWARDER_NOTIFY_DEVICES, [])
+        self._window: float = options.get(CONF_FORWARDER_WINDOW, DEFAULT_FORWARDER_WINDOW)
+        self._include_removed: bool = options.get(
+            CONF_FORWARDER_INCLUDE_REMOVED, DEFAULT_FORWARDER_INCLUDE_REMOVED
+        )
+        self._targets: list[NotifyTarget] = []
+        # notification_id -> latest update in the current window
+        self._pending: dict[str, ForwardedNotification] = {}
+        self._unsub: CALLBACK_TYPE | None = None
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_setup(self) -> None:
+        """Resolve the notify services and start listening."""
+        device_reg = dr.async_get(self.hass)
+        for device_id in self._device_ids:
+            if (device := device_reg.async_get(device_id)) is None:
+                continue
+            self._targets.append(NotifyTarget(f"mobile_app_{slugify(device.name or '')}"))
+        if not self._targets:
+            return
+        self._unsub = persistent_notification.async_register_callback(
+            self.hass, self._async_notifications_updated
+        )
+        _LOGGER.debug(
+            "Forwarding notifications to %s",
+            ", ".join(target.service for target in self._targets),
+        )
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop listening and cancel pending digests."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        for target in self._targets:
+            if target.retry is not None:
+                target.retry()
+                target.retry = None
+        self._pending.clear()
+
+    @callback
+    def _async_notifications_updated(
+        self,
+        update_type: persistent_notification.UpdateType,
+        notifications: dict[str, persistent_notification.Notification],
+    ) -> None:
+        """Collect notification updates for the next digest."""
+        if update_type == persistent_notification.UpdateType.CURRENT:
+            # Sent once on registration with the existing notifications
+            return
+
+        for notification_id, notification in notifications.items():
+            if update_type != persistent_notification.UpdateType.REMOVED:
+                self._pending[notification_id] = ForwardedNotification(
+                    notification.get("title"), notification["message"]
+                )
+                continue
+            # Added and removed within the same window: nothing to forward
+            if (pending := self._pending.get(notification_id)) is not None and (
+                not pending.removed
+            ):
+                del self._pending[notification_id]
+            elif self._include_removed:
+                self._pending[notification_id] = ForwardedNotification(
+                    notification.get("title"), notification["message"], removed=True
+                )
+
+        if self._pending and self._unsub_flush is None:
+            self._unsub_flush = async_call_later(self.hass, self._window, self._async_flush)
+
+    @callback
+    def _async_flush(self, now: datetime) -> None:
+        """Hand the collected notifications to every target."""
+        self._unsub_flush = None
+        pending, self._pending = self._pending, {}
+        for target in self._targets:
+            target.backlog.update(pending)
+            # Failing or busy targets get the notifications with their next send
+            if target.retry is None and not target.sending:
+                self.hass.async_create_task(self._async_send(target))
+
+    async def _async_send(self, target: NotifyTarget) -> None:
+        """Send the backlog of a target as one notification."""
+        target.retry = None
+        if not target.backlog:
+            return
+        backlog, target.backlog = target.backlog, {}
+        title, message = render_digest(list(backlog.values()))
+        data: dict[str, Any] = {"message": message}
+        if title:
+            data["title"] = title
+        target.sending = True
+        try:
+            await self.hass.services.async_call("notify", target.service, data, blocking=True)
+        except HomeAssistantError as err:
+            # Keep the notifications, newer updates of the same notification win
+            target.backlog = {**backlog, **target.backlog}
+            target.failures += 1
+            delay = min(self._window * 2**target.failures, MAX_BACKOFF)
+            _LOGGER.warning(
+                "Failed to forward notifications to notify.%s, retrying in %d seconds: %s",
+                target.service,
+                delay,
+                err,
+            )
+            target.retry = async_call_later(
+                self.hass, delay, partial(self._async_retry, target)
+            )
+            return
+        finally:
+            target.sending = False
+        target.failures = 0
+        if target.backlog:
+            # Collected while sending, at most one digest per window
+            target.retry = async_call_later(
+                self.hass, self._window, partial(self._async_retry, target)
+            )
+
+    @callback
+    def _async_retry(self, target: NotifyTarget, now: datetime) -> None:
+        """Retry sending to a failing target."""
+        self.hass.async_create_task(self._async_send(target))
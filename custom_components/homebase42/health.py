@@ -0,0 +1,909 @@
+"""Health tracking for Homebase42.
+
+Remembers since when entities are unavailable. The timestamps are kept up to
+date from state events and persisted, so they survive a restart (where every
+entity gets a new last_changed) and the health sensors only have to look at
+the entities that are actually unavailable.
+
+Stale entities (no update for longer than a threshold) are found with a heap
+of deadlines and a single timer, no periodic scans of all states.
+
+Flapping entities (short outages many times a day) are found from the times
+of their recent outages, kept in a fixed size deque per entity.
+
+Entities excluded by the health rules are never tracked, the trackers re-check
+their entities when the rules decide differently.
+
+Transitions between unavailable and available are appended to a compact
+health log (limited by age and number of entries), so the entity lists don't
+have to be written to the recorder with every state of the health entities.
+
+The health entities publish their entity lists to the health sets, which pass
+only the added and removed entities on to subscribers (websocket API).
+"""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from collections.abc import Callable, Collection, Iterable, Mapping
+from datetime import datetime, timedelta
+import heapq
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    ATTR_DEVICE_CLASS,
+    EVENT_STATE_CHANGED,
+    EVENT_STATE_REPORTED,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+)
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_point_in_utc_time
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    HEALTH_SETS,
+    SIGNAL_FLAPPING_UPDATED,
+    SIGNAL_RULES_UPDATED,
+    SIGNAL_STALE_UPDATED,
+)
+from .metrics import METRIC_EVENTS, IntegrationMetrics, async_timed
+from .rules import HealthRules, async_exclusion_check
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Seconds to collect changes before writing the store
+SAVE_DELAY = 30
+
+UNAVAILABLE_STATES = (STATE_UNAVAILABLE, STATE_UNKNOWN)
+
+# Outdated heap entries allowed before the heap is rebuilt
+STALE_HEAP_SLACK = 256
+# Entities with recorded outages, the least recently failing ones are dropped
+MAX_FLAPPING_ENTITIES = 2000
+
+# Retention of the health log
+HEALTH_LOG_RETENTION = timedelta(days=14)
+MAX_HEALTH_LOG_ENTRIES = 10000
+
+# Events in the health log (stored as their index)
+HEALTH_EVENT_UNAVAILABLE = "unavailable"
+HEALTH_EVENT_RECOVERED = "recovered"
+HEALTH_EVENTS = (HEALTH_EVENT_UNAVAILABLE, HEALTH_EVENT_RECOVERED)
+
+
+def is_own_entity(entity_id: str) -> bool:
+    """Return True for the health entities of this integration."""
+    return entity_id.startswith((f"binary_sensor.{DOMAIN}_", f"sensor.{DOMAIN}_"))
+
+
+def format_duration(duration: timedelta) -> str:
+    """Return a duration as "X Tagen, Y Stunden" (format of the notification blueprint)."""
+    return f"{duration.days} Tagen, {duration.seconds // 3600} Stunden"
+
+
+def render_digest(unavailable: list[tuple[str, datetime]], now: datetime | None = None) -> str:
+    """Return a pre-rendered list for notifications (one line per entity)."""
+    now = now or dt_util.utcnow()
+    return "\n".join(
+        f"- {entity_id} (nicht verfügbar seit {format_duration(now - since)})"
+        for entity_id, since in unavailable
+    )
+
+
+class HealthLog:
+    """Append-only log of health transitions with retention limits.
+
+    Every entry is a (timestamp, entity_id, event) tuple, entries are added
+    in order of time. The oldest entries are dropped when they are older than
+    the retention or the log is full.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the log."""
+        self.hass = hass
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.health_log"
+        )
+        self._entries: deque[tuple[float, str, int]] = deque(maxlen=MAX_HEALTH_LOG_ENTRIES)
+
+    async def async_setup(self) -> None:
+        """Load the stored entries."""
+        stored = (await self._store.async_load() or {}).get("entries", [])
+        self._entries.extend(
+            (float(timestamp), entity_id, int(event))
+            for timestamp, entity_id, event in stored
+            if 0 <= int(event) < len(HEALTH_EVENTS)
+        )
+        self._async_expire(dt_util.utcnow().timestamp())
+
+    async def async_unload(self) -> None:
+        """Write the entries now instead of after the save delay.
+
+        On a reload the new log loads the store right away, transitions of
+        the last seconds would be lost otherwise.
+        """
+        await self._store.async_save(self._data_to_save())
+
+    @property
+    def size(self) -> int:
+        """Return the number of entries."""
+        return len(self._entries)
+
+    @callback
+    def async_append(self, entity_id: str, event: str, when: datetime) -> None:
+        """Add a transition to the log."""
+        timestamp = when.timestamp()
+        # Transitions found at setup may be older than the last entry
+        if self._entries and timestamp < self._entries[-1][0]:
+            timestamp = self._entries[-1][0]
+        self._entries.append((timestamp, entity_id, HEALTH_EVENTS.index(event)))
+        self._async_expire(timestamp)
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_query(
+        self,
+        entity_ids: Collection[str] | None = None,
+        event: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return matching transitions, newest first."""
+        self._async_expire(dt_util.utcnow().timestamp())
+        start_ts = start.timestamp() if start else None
+        end_ts = end.timestamp() if end else None
+        event_index = HEALTH_EVENTS.index(event) if event else None
+        transitions: list[dict[str, Any]] = []
+        for timestamp, entity_id, index in reversed(self._entries):
+            if end_ts is not None and timestamp > end_ts:
+                continue
+            if start_ts is not None and timestamp < start_ts:
+                break
+            if entity_ids is not None and entity_id not in entity_ids:
+                continue
+            if event_index is not None and index != event_index:
+                continue
+            transitions.append(
+                {
+                    "entity_id": entity_id,
+                    "event": HEALTH_EVENTS[index],
+                    "time": dt_util.utc_from_timestamp(timestamp).isoformat(),
+                }
+            )
+            if limit is not None and len(transitions) >= limit:
+                break
+        return transitions
+
+    @callback
+    def _async_expire(self, now: float) -> None:
+        """Drop entries older than the retention."""
+        cutoff = now - HEALTH_LOG_RETENTION.total_seconds()
+        while self._entries and self._entries[0][0] < cutoff:
+            self._entries.popleft()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data for the store."""
+        return {
+            "entries": [
+                [round(timestamp, 1), entity_id, event]
+                for timestamp, entity_id, event in self._entries
+            ]
+        }
+
+
+class UnavailableTracker:
+    """Track since when entities are unavailable or unknown."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        log: HealthLog | None = None,
+        metrics: IntegrationMetrics | None = None,
+        rules: HealthRules | None = None,
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self._log = log
+        self._metrics = metrics
+        self._rules = rules
+        self._excluded = async_exclusion_check(rules)
+        self._rules_signal = f"{SIGNAL_RULES_UPDATED}_{entry.entry_id}"
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.unavailable"
+        )
+        # entity_id -> first time it was seen unavailable
+        self._since: dict[str, datetime] = {}
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._entity_reg = er.async_get(hass)
+
+    async def async_setup(self) -> None:
+        """Load the stored timestamps, sync them with the states and start listening."""
+        stored = (await self._store.async_load() or {}).get("unavailable_since", {})
+        for entity_id, since in stored.items():
+            if (parsed := dt_util.parse_datetime(since)) is not None:
+                self._since[entity_id] = parsed
+
+        for entity_id in list(self._since):
+            if self._excluded(entity_id):
+                del self._since[entity_id]
+                continue
+            # Entities without a state may still be loading, they are checked at start
+            if (state := self.hass.states.get(entity_id)) is not None and (
+                state.state not in UNAVAILABLE_STATES
+            ):
+                del self._since[entity_id]
+                self._async_log(entity_id, HEALTH_EVENT_RECOVERED, state.last_changed)
+        for state in self.hass.states.async_all():
+            if (
+                state.state in UNAVAILABLE_STATES
+                and not is_own_entity(state.entity_id)
+                and state.entity_id not in self._since
+                and not self._excluded(state.entity_id)
+            ):
+                self._since[state.entity_id] = state.last_changed
+                self._async_log(state.entity_id, HEALTH_EVENT_UNAVAILABLE, state.last_changed)
+
+        self._unsubs = [
+            self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                async_timed(self._metrics, METRIC_EVENTS, self._async_state_changed),
+            ),
+            async_at_started(self.hass, self._async_prune),
+        ]
+        if self._rules is not None:
+            self._unsubs.append(
+                async_dispatcher_connect(
+                    self.hass, self._rules_signal, self._async_rules_updated
+                )
+            )
+        self._async_schedule_save()
+        _LOGGER.debug("Tracking %d unavailable entities", len(self._since))
+
+    async def async_unload(self) -> None:
+        """Stop listening for state changes and write the timestamps now.
+
+        The tracker of a reloaded entry loads the store right away, it would
+        start from outdated timestamps while a delayed save is pending.
+        """
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        await self._store.async_save(self._data_to_save())
+
+    @property
+    def size(self) -> int:
+        """Return the number of tracked entities."""
+        return len(self._since)
+
+    @callback
+    def async_since(self, entity_id: str) -> datetime | None:
+        """Return since when an entity is unavailable (None if it is available)."""
+        return self._since.get(entity_id)
+
+    @callback
+    def async_unavailable(
+        self, delay: timedelta, include_hidden: bool, now: datetime | None = None
+    ) -> list[tuple[str, datetime]]:
+        """Return (entity_id, since) of entities unavailable for at least delay.
+
+        Hidden and disabled entities are skipped unless include_hidden is set.
+        The result is sorted by entity_id.
+        """
+        now = now or dt_util.utcnow()
+        unavailable: list[tuple[str, datetime]] = []
+        for entity_id, since in self._since.items():
+            if now - since < delay or self.hass.states.get(entity_id) is None:
+                continue
+            if not include_hidden and (
+                entity_entry := self._entity_reg.async_get(entity_id)
+            ):
+                if entity_entry.hidden_by is not None or entity_entry.disabled_by is not None:
+                    continue
+            unavailable.append((entity_id, since))
+        unavailable.sort()
+        return unavailable
+
+    @callback
+    def async_details(
+        self, unavailable: list[tuple[str, datetime]], now: datetime | None = None
+    ) -> list[dict[str, Any]]:
+        """Return ready to use durations for a list of unavailable entities."""
+        now = now or dt_util.utcnow()
+        details = []
+        for entity_id, since in unavailable:
+            state = self.hass.states.get(entity_id)
+            duration = now - since
+            details.append(
+                {
+                    "entity_id": entity_id,
+                    "name": state.name if state else entity_id,
+                    "since": since.isoformat(),
+                    "duration": int(duration.total_seconds()),
+                    "duration_text": format_duration(duration),
+                }
+            )
+        return details
+
+    @callback
+    def _async_log(self, entity_id: str, event: str, when: datetime) -> None:
+        """Add a transition to the health log."""
+        if self._log is not None:
+            self._log.async_append(entity_id, event, when)
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Write the timestamps to the store after a short delay."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data for the store."""
+        return {
+            "unavailable_since": {
+                entity_id: since.isoformat() for entity_id, since in self._since.items()
+            }
+        }
+
+    @callback
+    def _async_prune(self, hass: HomeAssistant) -> None:
+        """Forget stored entities that no longer exist once Home Assistant has started."""
+        removed = [
+            entity_id
+            for entity_id in self._since
+            if self.hass.states.get(entity_id) is None
+            and self._entity_reg.async_get(entity_id) is None
+        ]
+        for entity_id in removed:
+            del self._since[entity_id]
+        if removed:
+            _LOGGER.debug("Forgot %d removed unavailable entities", len(removed))
+            self._async_schedule_save()
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Start or stop tracking an entity."""
+        entity_id: str = event.data["entity_id"]
+        new_state = event.data.get("new_state")
+
+        if new_state is None:
+            # Entities of a reloaded integration come back, only forget removed ones
+            if self._entity_reg.async_get(entity_id) is None and (
+                self._since.pop(entity_id, None) is not None
+            ):
+                self._async_schedule_save()
+            return
+
+        if new_state.state not in UNAVAILABLE_STATES:
+            if self._since.pop(entity_id, None) is not None:
+                self._async_log(entity_id, HEALTH_EVENT_RECOVERED, new_state.last_changed)
+                self._async_schedule_save()
+            return
+
+        # unavailable <-> unknown keeps the first timestamp
+        if (
+            entity_id not in self._since
+            and not is_own_entity(entity_id)
+            and not self._excluded(entity_id)
+        ):
+            self._since[entity_id] = new_state.last_changed
+            self._async_log(entity_id, HEALTH_EVENT_UNAVAILABLE, new_state.last_changed)
+            self._async_schedule_save()
+
+    @callback
+    def _async_rules_updated(self, entity_ids: set[str] | None) -> None:
+        """Forget newly excluded entities, track newly included unavailable ones.
+
+        Changed rules are no transitions, so nothing is added to the health log.
+        """
+        if entity_ids is None:
+            entity_ids = {
+                state.entity_id
+                for state in self.hass.states.async_all()
+                if state.state in UNAVAILABLE_STATES
+            }
+            entity_ids.update(self._since)
+        changed = False
+        for entity_id in entity_ids:
+            if self._excluded(entity_id):
+                changed |= self._since.pop(entity_id, None) is not None
+            elif (
+                entity_id not in self._since
+                and not is_own_entity(entity_id)
+                and (state := self.hass.states.get(entity_id)) is not None
+                and state.state in UNAVAILABLE_STATES
+            ):
+                self._since[entity_id] = state.last_changed
+                changed = True
+        if changed:
+            self._async_schedule_save()
+
+
+def _is_visible(entity_reg: er.EntityRegistry, entity_id: str) -> bool:
+    """Return False for hidden and disabled entities."""
+    if (entity_entry := entity_reg.async_get(entity_id)) is None:
+        return True
+    return entity_entry.hidden_by is None and entity_entry.disabled_by is None
+
+
+class StaleTracker:
+    """Track entities that stopped reporting.
+
+    An entity is stale when its last_reported is older than the threshold for
+    its device class (or domain), so a sensor that keeps reporting the same
+    value is not stale. Every tracked entity has a deadline (last report +
+    threshold) in a heap, a single timer fires at the earliest one. State
+    changes push a new deadline, outdated entries are skipped when they reach
+    the top of the heap. Reports of an unchanged value are not followed for
+    tracked entities (that would be most state writes); when the deadline is
+    reached, last_reported is checked and the deadline moved forward instead.
+    Only reports of stale entities are listened to, they clear the flag.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        thresholds: Mapping[str, Any],
+        metrics: IntegrationMetrics | None = None,
+        rules: HealthRules | None = None,
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self._metrics = metrics
+        self._rules = rules
+        self._excluded = async_exclusion_check(rules)
+        self._rules_signal = f"{SIGNAL_RULES_UPDATED}_{entry.entry_id}"
+        self._signal = f"{SIGNAL_STALE_UPDATED}_{entry.entry_id}"
+        self._thresholds: dict[str, timedelta] = {}
+        # entity_id -> current deadline of a tracked entity
+        self._deadlines: dict[str, datetime] = {}
+        self._heap: list[tuple[datetime, str]] = []
+        # entity_id -> last update of a stale entity
+        self._stale: dict[str, datetime] = {}
+        self._next: datetime | None = None
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._entity_reg = er.async_get(hass)
+        self._async_compile_thresholds(thresholds)
+
+    @callback
+    def async_setup(self) -> None:
+        """Index the current states and start listening."""
+        self._async_rebuild()
+        state_changed = async_timed(self._metrics, METRIC_EVENTS, self._async_state_changed)
+        self._unsubs = [
+            self.hass.bus.async_listen(EVENT_STATE_CHANGED, state_changed),
+            self.hass.bus.async_listen(
+                EVENT_STATE_REPORTED,
+                state_changed,
+                event_filter=self._async_stale_reported,
+                run_immediately=True,
+            ),
+        ]
+        if self._rules is not None:
+            self._unsubs.append(
+                async_dispatcher_connect(
+                    self.hass, self._rules_signal, self._async_rules_updated
+                )
+            )
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop listening and cancel the timer."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        self._async_cancel_timer()
+
+    @callback
+    def async_set_thresholds(self, thresholds: Mapping[str, Any]) -> None:
+        """Apply new thresholds (re-indexes all states once)."""
+        self._async_compile_thresholds(thresholds)
+        self._async_rebuild()
+        async_dispatcher_send(self.hass, self._signal)
+
+    @property
+    def size(self) -> int:
+        """Return the number of tracked entities (including stale ones)."""
+        return len(self._deadlines) + len(self._stale)
+
+    @callback
+    def async_stale(self, include_hidden: bool) -> list[tuple[str, datetime]]:
+        """Return (entity_id, last_reported) of stale entities, sorted by entity_id."""
+        stale = [
+            (entity_id, last_reported)
+            for entity_id, last_reported in self._stale.items()
+            if include_hidden or _is_visible(self._entity_reg, entity_id)
+        ]
+        stale.sort()
+        return stale
+
+    @callback
+    def _async_compile_thresholds(self, thresholds: Mapping[str, Any]) -> None:
+        """Convert the configured hours to timedeltas."""
+        self._thresholds = {}
+        for key, hours in thresholds.items():
+            try:
+                self._thresholds[key] = timedelta(hours=float(hours))
+            except (TypeError, ValueError):
+                _LOGGER.warning("Ignoring invalid stale threshold %s: %s", key, hours)
+
+    def _threshold(self, state: State) -> timedelta | None:
+        """Return the threshold of an entity (device class before domain)."""
+        if (device_class := state.attributes.get(ATTR_DEVICE_CLASS)) is not None and (
+            threshold := self._thresholds.get(device_class)
+        ) is not None:
+            return threshold
+        return self._thresholds.get(state.domain)
+
+    @callback
+    def _async_rebuild(self) -> None:
+        """Index all current states."""
+        self._deadlines.clear()
+        self._stale.clear()
+        self._heap = []
+        if self._thresholds:
+            now = dt_util.utcnow()
+            for state in self.hass.states.async_all():
+                self._async_track(state, now)
+        self._async_schedule()
+
+    @callback
+    def _async_track(self, state: State, now: datetime) -> bool:
+        """Start, update or stop tracking an entity, return True if it was stale."""
+        entity_id = state.entity_id
+        was_stale = self._stale.pop(entity_id, None) is not None
+        if (
+            state.state in UNAVAILABLE_STATES
+            or is_own_entity(entity_id)
+            or (threshold := self._threshold(state)) is None
+            or self._excluded(entity_id)
+        ):
+            # Unavailable entities are reported by the unavailable sensors
+            self._deadlines.pop(entity_id, None)
+            return was_stale
+
+        deadline = state.last_reported + threshold
+        if deadline <= now:
+            self._deadlines.pop(entity_id, None)
+            self._stale[entity_id] = state.last_reported
+            return not was_stale
+        self._deadlines[entity_id] = deadline
+        heapq.heappush(self._heap, (deadline, entity_id))
+        return was_stale
+
+    @callback
+    def _async_stale_reported(self, event_data: Mapping[str, Any]) -> bool:
+        """Let only reports of stale entities through (unchanged values)."""
+        return event_data["entity_id"] in self._stale
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Move the deadline of an updated or reporting entity."""
+        entity_id: str = event.data["entity_id"]
+        if (new_state := event.data.get("new_state")) is None:
+            self._deadlines.pop(entity_id, None)
+            if self._stale.pop(entity_id, None) is not None:
+                async_dispatcher_send(self.hass, self._signal)
+            return
+        if not self._thresholds:
+            return
+
+        changed = self._async_track(new_state, dt_util.utcnow())
+        if (deadline := self._deadlines.get(entity_id)) is not None:
+            if self._next is None or deadline < self._next:
+                self._async_schedule()
+            elif len(self._heap) > 2 * len(self._deadlines) + STALE_HEAP_SLACK:
+                self._async_compact()
+        if changed:
+            async_dispatcher_send(self.hass, self._signal)
+
+    @callback
+    def _async_rules_updated(self, entity_ids: set[str] | None) -> None:
+        """Stop or start tracking entities the rules decide differently for."""
+        if entity_ids is None:
+            self._async_rebuild()
+            async_dispatcher_send(self.hass, self._signal)
+            return
+        now = dt_util.utcnow()
+        changed = False
+        for entity_id in entity_ids:
+            if (state := self.hass.states.get(entity_id)) is not None:
+                changed |= self._async_track(state, now)
+            else:
+                self._deadlines.pop(entity_id, None)
+                changed |= self._stale.pop(entity_id, None) is not None
+        self._async_schedule()
+        if changed:
+            async_dispatcher_send(self.hass, self._signal)
+
+    @callback
+    def _async_compact(self) -> None:
+        """Drop outdated heap entries."""
+        self._heap = [(deadline, entity_id) for entity_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    @callback
+    def _async_cancel_timer(self) -> None:
+        """Cancel the deadline timer."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._next = None
+
+    @callback
+    def _async_schedule(self) -> None:
+        """Run the timer at the earliest current deadline."""
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        if not heap:
+            self._async_cancel_timer()
+            return
+        deadline = heap[0][0]
+        if deadline == self._next:
+            return
+        self._async_cancel_timer()
+        self._next = deadline
+        self._unsub_timer = async_track_point_in_utc_time(
+            self.hass, self._async_deadline_reached, deadline
+        )
+
+    @callback
+    def _async_deadline_reached(self, now: datetime) -> None:
+        """Mark the entities whose deadline has passed as stale."""
+        self._unsub_timer = None
+        self._next = None
+        changed = False
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, entity_id = heapq.heappop(heap)
+            if self._deadlines.get(entity_id) != deadline:
+                continue
+            del self._deadlines[entity_id]
+            if (state := self.hass.states.get(entity_id)) is None:
+                self._stale[entity_id] = deadline
+                changed = True
+                continue
+            # Reported the same value since: moves the deadline forward
+            changed |= self._async_track(state, now)
+        self._async_schedule()
+        if changed:
+            _LOGGER.debug("%d stale entities", len(self._stale))
+            async_dispatcher_send(self.hass, self._signal)
+
+
+class FlappingTracker:
+    """Track entities that become unavailable often.
+
+    For every entity only the times of the last `threshold` outages are kept.
+    An entity flaps when all of them lie within the window. The number of
+    entities with recorded outages is limited as well, so memory stays bounded
+    however many entities fail.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        threshold: int,
+        window: float,
+        metrics: IntegrationMetrics | None = None,
+        rules: HealthRules | None = None,
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self._metrics = metrics
+        self._rules = rules
+        self._excluded = async_exclusion_check(rules)
+        self._rules_signal = f"{SIGNAL_RULES_UPDATED}_{entry.entry_id}"
+        self._signal = f"{SIGNAL_FLAPPING_UPDATED}_{entry.entry_id}"
+        self._threshold = max(int(threshold), 2)
+        self._window = timedelta(hours=window)
+        # entity_id -> times of the recent outages (most recently failing entity last)
+        self._outages: OrderedDict[str, deque[datetime]] = OrderedDict()
+        self._flapping: set[str] = set()
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._unsub_expire: CALLBACK_TYPE | None = None
+        self._entity_reg = er.async_get(hass)
+
+    @callback
+    def async_setup(self) -> None:
+        """Start listening for state changes."""
+        self._unsubs = [
+            self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                async_timed(self._metrics, METRIC_EVENTS, self._async_state_changed),
+            )
+        ]
+        if self._rules is not None:
+            self._unsubs.append(
+                async_dispatcher_connect(
+                    self.hass, self._rules_signal, self._async_rules_updated
+                )
+            )
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop listening and cancel the timer."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        if self._unsub_expire is not None:
+            self._unsub_expire()
+            self._unsub_expire = None
+
+    @callback
+    def async_configure(self, threshold: int, window: float) -> None:
+        """Apply a new threshold and window to the recorded outages."""
+        self._threshold = max(int(threshold), 2)
+        self._window = timedelta(hours=window)
+        for entity_id, outages in self._outages.items():
+            self._outages[entity_id] = deque(outages, maxlen=self._threshold)
+        self._async_evaluate(dt_util.utcnow())
+
+    @property
+    def size(self) -> int:
+        """Return the number of entities with recorded outages."""
+        return len(self._outages)
+
+    @callback
+    def async_flapping(self, include_hidden: bool) -> list[tuple[str, int]]:
+        """Return (entity_id, outages within the window) of flapping entities."""
+        now = dt_util.utcnow()
+        flapping = [
+            (
+                entity_id,
+                sum(1 for outage in self._outages[entity_id] if now - outage <= self._window),
+            )
+            for entity_id in self._flapping
+            if include_hidden or _is_visible(self._entity_reg, entity_id)
+        ]
+        flapping.sort()
+        return flapping
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Record an outage (available -> unavailable/unknown)."""
+        new_state = event.data.get("new_state")
+        old_state = event.data.get("old_state")
+        if (
+            new_state is None
+            or old_state is None
+            or new_state.state not in UNAVAILABLE_STATES
+            or old_state.state in UNAVAILABLE_STATES
+        ):
+            return
+        entity_id: str = event.data["entity_id"]
+        if is_own_entity(entity_id) or self._excluded(entity_id):
+            return
+
+        changed = False
+        if (outages := self._outages.get(entity_id)) is None:
+            outages = self._outages[entity_id] = deque(maxlen=self._threshold)
+            if len(self._outages) > MAX_FLAPPING_ENTITIES:
+                evicted, _ = self._outages.popitem(last=False)
+                if evicted in self._flapping:
+                    self._flapping.discard(evicted)
+                    changed = True
+        else:
+            self._outages.move_to_end(entity_id)
+        outages.append(new_state.last_changed)
+
+        if entity_id not in self._flapping and self._is_flapping(outages, dt_util.utcnow()):
+            self._flapping.add(entity_id)
+            changed = True
+        if changed:
+            self._async_schedule_expire()
+            async_dispatcher_send(self.hass, self._signal)
+
+    @callback
+    def _async_rules_updated(self, entity_ids: set[str] | None) -> None:
+        """Forget the outages of newly excluded entities."""
+        candidates = list(self._outages) if entity_ids is None else entity_ids
+        changed = False
+        for entity_id in candidates:
+            if entity_id in self._outages and self._excluded(entity_id):
+                del self._outages[entity_id]
+                if entity_id in self._flapping:
+                    self._flapping.discard(entity_id)
+                    changed = True
+        if changed:
+            self._async_schedule_expire()
+            async_dispatcher_send(self.hass, self._signal)
+
+    def _is_flapping(self, outages: deque[datetime], now: datetime) -> bool:
+        """Return True if the last threshold outages lie within the window."""
+        return len(outages) == outages.maxlen and now - outages[0] <= self._window
+
+    @callback
+    def _async_evaluate(self, now: datetime) -> None:
+        """Re-check the flapping entities (and all recorded ones after a reconfigure)."""
+        self._unsub_expire = None
+        flapping = {
+            entity_id
+            for entity_id, outages in self._outages.items()
+            if self._is_flapping(outages, now)
+        }
+        changed = flapping != self._flapping
+        self._flapping = flapping
+        self._async_schedule_expire()
+        if changed:
+            async_dispatcher_send(self.hass, self._signal)
+
+    @callback
+    def _async_schedule_expire(self) -> None:
+        """Re-check when the oldest outage of a flapping entity leaves the window."""
+        if self._unsub_expire is not None:
+            self._unsub_expire()
+            self._unsub_expire = None
+        if not self._flapping:
+            return
+        expires = min(self._outages[entity_id][0] for entity_id in self._flapping) + self._window
+        delay = max((expires - dt_util.utcnow()).total_seconds(), 0) + 1
+        self._unsub_expire = async_call_later(self.hass, delay, self._async_evaluate)
+
+
+class HealthSets:
+    """Current entity sets of the health entities.
+
+    The entities publish their complete lists, subscribers only get the
+    entities added to or removed from a set. The sets belong to the domain,
+    not a config entry, so they survive a reload and the first lists
+    published afterwards are diffs against the lists before the reload.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the sets."""
+        self._sets: dict[str, frozenset[str]] = {name: frozenset() for name in HEALTH_SETS}
+        self._listeners: list[Callable[[str, list[str], list[str]], None]] = []
+
+    @callback
+    def async_publish(self, name: str, entity_ids: Iterable[str]) -> None:
+        """Replace a set, pass the differences on to the subscribers."""
+        new = frozenset(entity_ids)
+        old = self._sets[name]
+        if new == old:
+            return
+        self._sets[name] = new
+        if not self._listeners:
+            return
+        added = sorted(new - old)
+        removed = sorted(old - new)
+        for listener in list(self._listeners):
+            listener(name, added, removed)
+
+    @callback
+    def async_subscribe(
+        self, listener: Callable[[str, list[str], list[str]], None]
+    ) -> CALLBACK_TYPE:
+        """Call listener(name, added, removed) for every change of a set."""
+        self._listeners.append(listener)
+
+        @callback
+        def _async_unsubscribe() -> None:
+            self._listeners.remove(listener)
+
+        return _async_unsubscribe
+
+    @callback
+    def async_clear(self) -> None:
+        """Empty all sets."""
+        for name in self._sets:
+            self.async_publish(name, ())
+
+    @callback
+    def async_get(self, name: str) -> list[str]:
+        """Return the entities of a set, sorted by entity_id."""
+        return sorted(self._sets[name])
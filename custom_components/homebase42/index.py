@@ -0,0 +1,334 @@
+"""Live entity index for Homebase42.
+
+Keeps entities bucketed by domain, area, floor, device class and state. The
+buckets are updated from state and registry events, so summaries and queries
+never have to walk all states again.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+from typing import Any
+
+from homeassistant.const import ATTR_DEVICE_CLASS, EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+    floor_registry as fr,
+)
+
+from .metrics import METRIC_EVENTS, IntegrationMetrics, async_timed
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bucket names
+INDEX_DOMAIN = "domain"
+INDEX_AREA = "area"
+INDEX_FLOOR = "floor"
+INDEX_DEVICE_CLASS = "device_class"
+INDEX_STATE = "state"
+INDEXES = (INDEX_DOMAIN, INDEX_AREA, INDEX_FLOOR, INDEX_DEVICE_CLASS, INDEX_STATE)
+
+
+@dataclass(slots=True)
+class IndexedEntity:
+    """Bucket keys of a single indexed entity."""
+
+    domain: str
+    area_id: str | None
+    floor_id: str | None
+    device_class: str | None
+    state: str
+
+    def key(self, index: str) -> str | None:
+        """Return the bucket key of this entity for an index."""
+        if index == INDEX_DOMAIN:
+            return self.domain
+        if index == INDEX_AREA:
+            return self.area_id
+        if index == INDEX_FLOOR:
+            return self.floor_id
+        if index == INDEX_STATE:
+            return self.state
+        return self.device_class
+
+
+class EntityIndex:
+    """Secondary indexes over all entity states."""
+
+    def __init__(self, hass: HomeAssistant, metrics: IntegrationMetrics | None = None) -> None:
+        """Initialize the index."""
+        self.hass = hass
+        self._metrics = metrics
+        self._entities: dict[str, IndexedEntity] = {}
+        # index name -> bucket key -> entity_ids
+        self._buckets: dict[str, dict[str | None, set[str]]] = {
+            index: {} for index in INDEXES
+        }
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._entity_reg = er.async_get(hass)
+        self._device_reg = dr.async_get(hass)
+        self._area_reg = ar.async_get(hass)
+        self._floor_reg = fr.async_get(hass)
+
+    @callback
+    def async_setup(self) -> None:
+        """Build the index from the current states and start listening."""
+        for state in self.hass.states.async_all():
+            self._async_add(state)
+
+        self._unsubs = [
+            self.hass.bus.async_listen(event_type, async_timed(self._metrics, METRIC_EVENTS, handler))
+            for event_type, handler in (
+                (EVENT_STATE_CHANGED, self._async_state_changed),
+                (er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_registry_updated),
+                (dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_registry_updated),
+                (ar.EVENT_AREA_REGISTRY_UPDATED, self._async_area_registry_updated),
+            )
+        ]
+        _LOGGER.debug("Entity index built with %d entities", len(self._entities))
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop listening for events."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    @property
+    def size(self) -> int:
+        """Return the number of indexed entities."""
+        return len(self._entities)
+
+    @callback
+    def async_entity_ids(self, index: str, key: str | None) -> set[str]:
+        """Return the entity_ids in a bucket (do not modify the result)."""
+        return self._buckets[index].get(key, set())
+
+    @callback
+    def async_get(self, entity_id: str) -> IndexedEntity | None:
+        """Return the index record of an entity."""
+        return self._entities.get(entity_id)
+
+    @callback
+    def async_query(self, filters: dict[str, list[str | None]]) -> list[str]:
+        """Return the entity_ids matching all filters.
+
+        Filters map an index name to the accepted bucket keys (OR within a filter,
+        AND between filters). The smallest matching bucket is walked and checked
+        against the others, so the cost depends on the matches, not the home size.
+        """
+        candidates: list[set[str]] = []
+        for index, keys in filters.items():
+            buckets = self._buckets[index]
+            if len(keys) == 1:
+                candidates.append(buckets.get(keys[0], set()))
+            else:
+                candidates.append(set().union(*(buckets.get(key, ()) for key in keys)))
+
+        if not candidates:
+            return list(self._entities)
+
+        candidates.sort(key=len)
+        smallest, *others = candidates
+        return [
+            entity_id
+            for entity_id in smallest
+            if all(entity_id in ids for ids in others)
+        ]
+
+    @callback
+    def async_resolve_area_ids(self, values: list[str]) -> list[str | None]:
+        """Resolve area IDs or names to area IDs (unknown areas match nothing)."""
+        area_ids: list[str | None] = []
+        for value in values:
+            if self._area_reg.async_get_area(value):
+                area_ids.append(value)
+            elif area := self._area_reg.async_get_area_by_name(value):
+                area_ids.append(area.id)
+        return area_ids
+
+    @callback
+    def async_resolve_floor_ids(self, values: list[str]) -> list[str | None]:
+        """Resolve floor IDs or names to floor IDs (unknown floors match nothing)."""
+        floor_ids: list[str | None] = []
+        for value in values:
+            if self._floor_reg.async_get_floor(value):
+                floor_ids.append(value)
+            elif floor := self._floor_reg.async_get_floor_by_name(value):
+                floor_ids.append(floor.floor_id)
+        return floor_ids
+
+    @callback
+    def async_area_name(self, area_id: str | None) -> str:
+        """Return the name of an area ("None" if not assigned)."""
+        if area_id and (area := self._area_reg.async_get_area(area_id)):
+            return area.name
+        return "None"
+
+    @callback
+    def async_floor_name(self, floor_id: str | None) -> str:
+        """Return the name of a floor ("No Floor" if not assigned)."""
+        if floor_id and (floor := self._floor_reg.async_get_floor(floor_id)):
+            return floor.name
+        return "No Floor"
+
+    @callback
+    def async_counts(self, index: str) -> dict[str | None, int]:
+        """Return the number of entities per bucket key of an index."""
+        return {key: len(ids) for key, ids in self._buckets[index].items()}
+
+    @callback
+    def async_summary(self) -> dict[str, Any]:
+        """Return entity counts with area and floor IDs resolved to names."""
+        by_area: dict[str, int] = {}
+        for area_id, count in self.async_counts(INDEX_AREA).items():
+            name = self.async_area_name(area_id)
+            by_area[name] = by_area.get(name, 0) + count
+
+        by_floor: dict[str, int] = {}
+        for floor_id, count in self.async_counts(INDEX_FLOOR).items():
+            name = self.async_floor_name(floor_id)
+            by_floor[name] = by_floor.get(name, 0) + count
+
+        by_device_class = {
+            device_class or "None": count
+            for device_class, count in self.async_counts(INDEX_DEVICE_CLASS).items()
+        }
+
+        return {
+            "total_entities": len(self._entities),
+            "by_domain": self.async_counts(INDEX_DOMAIN),
+            "by_area": by_area,
+            "by_floor": by_floor,
+            "by_device_class": by_device_class,
+        }
+
+    @callback
+    def _async_resolve_location(self, entity_id: str) -> tuple[str | None, str | None]:
+        """Return (area_id, floor_id) of an entity, falling back to its device."""
+        area_id = None
+        if entity_entry := self._entity_reg.async_get(entity_id):
+            area_id = entity_entry.area_id
+            if not area_id and entity_entry.device_id:
+                if device := self._device_reg.async_get(entity_entry.device_id):
+                    area_id = device.area_id
+
+        floor_id = None
+        if area_id and (area := self._area_reg.async_get_area(area_id)):
+            floor_id = area.floor_id
+        return area_id, floor_id
+
+    @callback
+    def _async_insert(self, entity_id: str, entity: IndexedEntity) -> None:
+        """Put an entity into its buckets."""
+        self._entities[entity_id] = entity
+        for index, buckets in self._buckets.items():
+            buckets.setdefault(entity.key(index), set()).add(entity_id)
+
+    @callback
+    def _async_remove(self, entity_id: str) -> IndexedEntity | None:
+        """Take an entity out of its buckets."""
+        if (entity := self._entities.pop(entity_id, None)) is None:
+            return None
+        for index, buckets in self._buckets.items():
+            key = entity.key(index)
+            if (ids := buckets.get(key)) is not None:
+                ids.discard(entity_id)
+                if not ids:
+                    del buckets[key]
+        return entity
+
+    @callback
+    def _async_move(
+        self, entity_id: str, index: str, old_key: str | None, new_key: str | None
+    ) -> None:
+        """Move an entity to another bucket of a single index."""
+        buckets = self._buckets[index]
+        if (ids := buckets.get(old_key)) is not None:
+            ids.discard(entity_id)
+            if not ids:
+                del buckets[old_key]
+        buckets.setdefault(new_key, set()).add(entity_id)
+
+    @callback
+    def _async_add(self, state: State) -> None:
+        """Index an entity from its state."""
+        area_id, floor_id = self._async_resolve_location(state.entity_id)
+        self._async_insert(
+            state.entity_id,
+            IndexedEntity(
+                state.domain,
+                area_id,
+                floor_id,
+                state.attributes.get(ATTR_DEVICE_CLASS),
+                state.state,
+            ),
+        )
+
+    @callback
+    def _async_relocate(self, entity_id: str) -> None:
+        """Re-resolve area and floor of an indexed entity."""
+        if (entity := self._async_remove(entity_id)) is None:
+            return
+        entity.area_id, entity.floor_id = self._async_resolve_location(entity_id)
+        self._async_insert(entity_id, entity)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Update the index from a state change."""
+        entity_id = event.data["entity_id"]
+        new_state: State | None = event.data.get("new_state")
+
+        if new_state is None:
+            self._async_remove(entity_id)
+            return
+
+        if (entity := self._entities.get(entity_id)) is None:
+            self._async_add(new_state)
+            return
+
+        # Registry data is kept up to date by the registry listeners,
+        # a state change can only move the entity to another state or device class
+        if new_state.state != entity.state:
+            self._async_move(entity_id, INDEX_STATE, entity.state, new_state.state)
+            entity.state = new_state.state
+        device_class = new_state.attributes.get(ATTR_DEVICE_CLASS)
+        if device_class != entity.device_class:
+            self._async_move(entity_id, INDEX_DEVICE_CLASS, entity.device_class, device_class)
+            entity.device_class = device_class
+
+    @callback
+    def _async_entity_registry_updated(self, event: Event) -> None:
+        """Handle entity registry changes (area, device or entity_id changes)."""
+        if event.data["action"] != "update":
+            # Creating or removing a registry entry is followed by a state change
+            return
+        if old_entity_id := event.data.get("old_entity_id"):
+            self._async_remove(old_entity_id)
+            if state := self.hass.states.get(event.data["entity_id"]):
+                self._async_add(state)
+            return
+        self._async_relocate(event.data["entity_id"])
+
+    @callback
+    def _async_device_registry_updated(self, event: Event) -> None:
+        """Handle device area changes."""
+        if event.data["action"] != "update" or "area_id" not in event.data.get(
+            "changes", {}
+        ):
+            return
+        for entity_entry in er.async_entries_for_device(
+            self._entity_reg, event.data["device_id"], include_disabled_entities=True
+        ):
+            self._async_relocate(entity_entry.entity_id)
+
+    @callback
+    def _async_area_registry_updated(self, event: Event) -> None:
+        """Handle area floor changes and removed areas."""
+        if event.data["action"] not in ("update", "remove"):
+            return
+        for entity_id in list(self.async_entity_ids(INDEX_AREA, event.data["area_id"])):
+            self._async_relocate(entity_id)
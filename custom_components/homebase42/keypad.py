@@ -0,0 +1,252 @@
+"""Keypad handler for Homebase42.
+
+Native replacement for the s42_frient_keypad blueprint. The topic is
+subscribed once, every message is parsed once and dispatched through a table
+of the keypad keys that is compiled from the options, instead of starting a
+full automation run with template parsing for every message.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from dataclasses import dataclass
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.json import json_dumps
+from homeassistant.util.json import json_loads
+
+from .const import (
+    DOMAIN,
+    CONF_KEYPAD_TOPIC,
+    CONF_KEYPAD_INVALID_CODE_NOTIFICATION,
+    DEFAULT_KEYPAD_DELAY,
+    KEYPAD_CODES,
+    KEYPAD_DELAY,
+    KEYPAD_KEYS,
+    KEYPAD_NOTIFICATION,
+    KEYPAD_SCRIPT,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.components.mqtt import ReceiveMessage
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fired after the delay of a valid code, for automations that react to the keypad
+EVENT_KEYPAD_ACTION = f"{DOMAIN}_keypad_action"
+
+MODE_INVALID_CODE = "invalid_code"
+MODE_ENTRY_DELAY = "entry_delay"
+MODE_EXIT_DELAY = "exit_delay"
+
+# Same limit as the blueprint (mode: parallel, max: 5)
+MAX_RUNNING = 5
+
+# Key -> label used in the notifications
+KEY_LABELS = {
+    "disarm": "DISARM",
+    "arm_all_zones": "ARM ALL ZONES",
+    "arm_day_zones": "ARM DAY ZONES",
+    "arm_night_zones": "ARM NIGHT ZONES",
+    "emergency": "EMERGENCY",
+}
+# Key -> short label used in the notification titles
+KEY_TITLES = {
+    "disarm": "DISARM",
+    "arm_all_zones": "ARM ALL",
+    "arm_day_zones": "ARM DAY",
+    "arm_night_zones": "ARM NIGHT",
+    "emergency": "EMERGENCY",
+}
+
+
+def parse_codes(codes: str) -> frozenset[int]:
+    """Parse a comma separated list of codes.
+
+    Raises ValueError for entries that are not numbers.
+    """
+    return frozenset(int(code) for code in codes.replace(" ", "").split(",") if code)
+
+
+def _parse_code(code: Any) -> int:
+    """Return the entered code as a number (0 if it is not one, like the blueprint)."""
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(frozen=True, slots=True)
+class KeypadKey:
+    """Compiled configuration of a keypad key."""
+
+    key: str
+    codes: frozenset[int]
+    script: str | None
+    delay: float
+    notification: bool
+    # Mode shown by the keypad while the delay runs
+    delay_mode: str
+
+
+class KeypadHandler:
+    """Handle the MQTT messages of a Frient keypad."""
+
+    def __init__(self, hass: HomeAssistant, options: Mapping[str, Any]) -> None:
+        """Compile the options."""
+        self.hass = hass
+        self._topic: str = options.get(CONF_KEYPAD_TOPIC, "")
+        self._set_topic = f"{self._topic}/set"
+        self._invalid_code_notification: bool = options.get(
+            CONF_KEYPAD_INVALID_CODE_NOTIFICATION, True
+        )
+        self._keys: dict[str, KeypadKey] = {}
+        for key in KEYPAD_KEYS:
+            try:
+                codes = parse_codes(options.get(f"keypad_{key}_{KEYPAD_CODES}", ""))
+            except ValueError:
+                _LOGGER.warning("Ignoring invalid keypad codes for %s", key)
+                codes = frozenset()
+            self._keys[key] = KeypadKey(
+                key=key,
+                codes=codes,
+                script=options.get(f"keypad_{key}_{KEYPAD_SCRIPT}"),
+                delay=options.get(
+                    f"keypad_{key}_{KEYPAD_DELAY}",
+                    0 if key == "emergency" else DEFAULT_KEYPAD_DELAY,
+                ),
+                notification=options.get(f"keypad_{key}_{KEYPAD_NOTIFICATION}", True),
+                delay_mode=MODE_ENTRY_DELAY if key == "disarm" else MODE_EXIT_DELAY,
+            )
+        self._unsub: CALLBACK_TYPE | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._unloaded = False
+
+    async def async_setup(self) -> None:
+        """Subscribe to the keypad topic once MQTT is available."""
+        if not self._topic:
+            return
+        # Imported here, MQTT is only needed when the keypad handler is enabled
+        from homeassistant.components import mqtt
+
+        if not await mqtt.async_wait_for_mqtt_client(self.hass):
+            _LOGGER.warning("MQTT is not available, keypad %s is not handled", self._topic)
+            return
+        unsub = await mqtt.async_subscribe(
+            self.hass, self._topic, self._async_message_received, qos=1
+        )
+        if self._unloaded:
+            unsub()
+            return
+        self._unsub = unsub
+        _LOGGER.debug("Handling keypad messages on %s", self._topic)
+
+    @callback
+    def async_unload(self) -> None:
+        """Unsubscribe and cancel running actions."""
+        self._unloaded = True
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    @callback
+    def _async_message_received(self, msg: ReceiveMessage) -> None:
+        """Parse a keypad message and dispatch it."""
+        try:
+            payload = json_loads(msg.payload)
+        except ValueError:
+            return
+        if not isinstance(payload, dict):
+            return
+        action = payload.get("action")
+        action_code = payload.get("action_code")
+        if not action or action_code is None or action_code == "":
+            return
+        code = _parse_code(action_code)
+        transaction = payload.get("action_transaction")
+
+        key = self._keys.get(action)
+        if key is None:
+            self._async_publish(MODE_INVALID_CODE, transaction)
+            if self._invalid_code_notification:
+                persistent_notification.async_create(
+                    self.hass,
+                    f"Unbekannte Keypad-Aktion: {action} mit Code {code}.",
+                    "Keypad Event nicht verarbeitet",
+                )
+            return
+
+        if code not in key.codes:
+            self._async_publish(MODE_INVALID_CODE, transaction)
+            if self._invalid_code_notification:
+                persistent_notification.async_create(
+                    self.hass,
+                    f"Ungültiger Code {code} für {KEY_LABELS[key.key]} eingegeben!",
+                    f"Keypad {KEY_TITLES[key.key]} Fehler",
+                )
+            return
+
+        if len(self._tasks) >= MAX_RUNNING:
+            _LOGGER.warning("Already running %d keypad actions, ignoring %s", MAX_RUNNING, action)
+            return
+        self._async_publish(key.key, transaction)
+        self._async_publish(key.delay_mode)
+        task = self.hass.async_create_task(self._async_run(key, code))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_run(self, key: KeypadKey, code: int) -> None:
+        """Run the actions of a valid code after the delay."""
+        if key.delay:
+            await asyncio.sleep(key.delay)
+
+        self.hass.bus.async_fire(
+            EVENT_KEYPAD_ACTION, {"action": key.key, "code": code, "topic": self._topic}
+        )
+        if key.script:
+            # Calling the script by its service waits until it has finished
+            try:
+                await self.hass.services.async_call(
+                    "script",
+                    key.script.split(".", 1)[1],
+                    {"action": key.key, "code": code},
+                    blocking=True,
+                )
+            except HomeAssistantError as err:
+                _LOGGER.warning("Keypad script %s failed: %s", key.script, err)
+
+        self._async_publish(key.key)
+        if key.notification:
+            if key.key == "disarm":
+                message = f"Code {code} für DISARM akzeptiert. Keypad disarmed."
+            elif key.key == "emergency":
+                message = f"Code {code} für EMERGENCY akzeptiert!"
+            else:
+                message = f"Code {code} für {KEY_LABELS[key.key]} akzeptiert. Keypad armed."
+            persistent_notification.async_create(
+                self.hass, message, f"Keypad {KEY_TITLES[key.key]} Erfolg"
+            )
+
+    @callback
+    def _async_publish(self, mode: str, transaction: Any = None) -> None:
+        """Set the mode of the keypad (with the transaction to answer a key press)."""
+        arm_mode: dict[str, Any] = {"mode": mode}
+        if transaction is not None:
+            arm_mode = {"transaction": transaction, "mode": mode}
+        self.hass.async_create_task(self._async_publish_payload(json_dumps({"arm_mode": arm_mode})))
+
+    async def _async_publish_payload(self, payload: str) -> None:
+        """Publish to the set topic of the keypad."""
+        from homeassistant.components import mqtt
+
+        try:
+            await mqtt.async_publish(self.hass, self._set_topic, payload, qos=1)
+        except HomeAssistantError as err:
+            _LOGGER.warning("Failed to publish to %s: %s", self._set_topic, err)
@@ -0,0 +1,153 @@
+"""Runtime metrics for Homebase42.
+
+Counts and times the work the integration does: handling events, updating
+the health entities and exporting states. Measuring costs two perf_counter()
+calls, so the metrics are always collected. They are shown by the diagnostic
+sensors and in the diagnostics download.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import wraps
+from time import perf_counter
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+
+from .profiling import ProfileSession
+
+# State and registry events handled by the entity index and the trackers
+METRIC_EVENTS = "events"
+# Updates of the health entities
+METRIC_HEALTH_UPDATES = "health_updates"
+# Snapshot of the states taken on the event loop for an export
+METRIC_EXPORT_SNAPSHOT = "export_snapshot"
+# Complete exports (snapshot, transform and write)
+METRIC_EXPORTS = "exports"
+
+METRICS = (METRIC_EVENTS, METRIC_HEALTH_UPDATES, METRIC_EXPORT_SNAPSHOT, METRIC_EXPORTS)
+# Metrics measured while blocking the event loop
+LOOP_METRICS = (METRIC_EVENTS, METRIC_HEALTH_UPDATES, METRIC_EXPORT_SNAPSHOT)
+
+
+@dataclass(slots=True)
+class Timing:
+    """Number and durations (seconds) of measured runs."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float = 0.0
+
+    def add(self, duration: float) -> None:
+        """Add a measured run."""
+        self.count += 1
+        self.total += duration
+        self.last = duration
+        if duration > self.max:
+            self.max = duration
+
+    @property
+    def average(self) -> float:
+        """Return the average duration."""
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the timing in milliseconds."""
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "average_ms": round(self.average * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+        }
+
+
+class IntegrationMetrics:
+    """Counters and timings of a config entry."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.since = dt_util.utcnow()
+        self.timings: dict[str, Timing] = {name: Timing() for name in METRICS}
+        # Running profile service call
+        self.profile: ProfileSession | None = None
+
+    @callback
+    def async_add(self, name: str, duration: float) -> None:
+        """Add a measured run of a metric."""
+        self.timings[name].add(duration)
+
+    @property
+    def loop_time(self) -> float:
+        """Return the seconds spent on the event loop."""
+        return sum(self.timings[name].total for name in LOOP_METRICS)
+
+    @callback
+    def async_as_dict(self) -> dict[str, Any]:
+        """Return all metrics."""
+        return {
+            "since": self.since.isoformat(),
+            "loop_time_ms": round(self.loop_time * 1000, 3),
+            **{name: timing.as_dict() for name, timing in self.timings.items()},
+        }
+
+
+def async_timed(
+    metrics: IntegrationMetrics | None, name: str, func: Callable[..., None]
+) -> Callable[..., None]:
+    """Return a callback that measures every call of func (func without metrics)."""
+    if metrics is None:
+        return func
+    timing = metrics.timings[name]
+
+    @callback
+    @wraps(func)
+    def _timed(*args: Any) -> None:
+        start = perf_counter()
+        try:
+            func(*args)
+        finally:
+            timing.add(perf_counter() - start)
+
+    return _timed
+
+
+def timed_update(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Measure an update method of a health entity (uses self._metrics).
+
+    While a profile service call waits for health updates, the update runs
+    under its profiler instead (profiled runs are not added to the timings).
+    """
+    if asyncio.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def _async_timed(self: Any, *args: Any) -> None:
+            if (session := self._metrics.profile) is not None and session.wants_update:
+                with session.async_profile_update():
+                    await func(self, *args)
+                return
+            start = perf_counter()
+            try:
+                await func(self, *args)
+            finally:
+                self._metrics.async_add(METRIC_HEALTH_UPDATES, perf_counter() - start)
+
+        return _async_timed
+
+    @wraps(func)
+    def _timed(self: Any, *args: Any) -> None:
+        if (session := self._metrics.profile) is not None and session.wants_update:
+            with session.async_profile_update():
+                func(self, *args)
+            return
+        start = perf_counter()
+        try:
+            func(self, *args)
+        finally:
+            self._metrics.async_add(METRIC_HEALTH_UPDATES, perf_counter() - start)
+
+    return _timed
@@ -0,0 +1,93 @@
+"""On-demand profiling for Homebase42.
+
+The profile service runs the next health updates and/or one export under
+cProfile and writes a .prof file plus a summary of the top functions. While
+no profile is running the health entities only check that no session is set.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterator
+import cProfile
+from contextlib import contextmanager
+import io
+from pathlib import Path
+import pstats
+from typing import Any, TypeVar
+
+from homeassistant.core import callback
+
+_T = TypeVar("_T")
+
+# Functions listed in the summary
+PROFILE_TOP_FUNCTIONS = 40
+
+
+class ProfileSession:
+    """Collect the profiles of a profile service call."""
+
+    def __init__(self, health_updates: int) -> None:
+        """Initialize the session."""
+        self.remaining = health_updates
+        self.health_updates = 0
+        self.exports = 0
+        # Only one profiler can be active at a time (Python 3.12+)
+        self.exporting = False
+        # Set once all requested health updates were profiled
+        self.done = asyncio.Event()
+        if not health_updates:
+            self.done.set()
+        # One profile per run (and per thread of an export)
+        self._profiles: list[cProfile.Profile] = []
+
+    @property
+    def wants_update(self) -> bool:
+        """Return True if the next health update should be profiled."""
+        return self.remaining > 0 and not self.exporting
+
+    @contextmanager
+    def async_profile_update(self) -> Iterator[None]:
+        """Profile a health update on the event loop."""
+        profiler = self.async_start()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.health_updates += 1
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.done.set()
+
+    @callback
+    def async_start(self) -> cProfile.Profile:
+        """Start a profile on the event loop (the caller disables it)."""
+        profiler = cProfile.Profile()
+        self._profiles.append(profiler)
+        profiler.enable()
+        return profiler
+
+    def runcall(self, func: Callable[..., _T], *args: Any) -> _T:
+        """Run a function under a profile (in any thread)."""
+        profiler = cProfile.Profile()
+        self._profiles.append(profiler)
+        return profiler.runcall(func, *args)
+
+    def write(self, path: Path) -> tuple[Path, Path] | None:
+        """Write the .prof file and the summary (runs in the executor).
+
+        Returns the paths, or None if nothing was profiled.
+        """
+        if not self._profiles:
+            return None
+        profile_path = path.with_suffix(".prof")
+        summary_path = path.with_suffix(".txt")
+        stream = io.StringIO()
+        stats = pstats.Stats(*self._profiles, stream=stream)
+        stats.dump_stats(profile_path)
+        stream.write(
+            f"Health updates: {self.health_updates}, exports: {self.exports}\n"
+        )
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP_FUNCTIONS)
+        summary_path.write_text(stream.getvalue(), encoding="utf-8")
+        return profile_path, summary_path
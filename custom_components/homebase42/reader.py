@@ -0,0 +1,121 @@
+"""Random-access reader for NDJSON state exports of Homebase42.
+
+Uses the sidecar index written next to an NDJSON export to read single
+entities, whole domains or areas without parsing the rest of the file:
+
+    with ExportReader("/config/homebase42_state_export.ndjson") as export:
+        light = export.get("light.kitchen")
+        sensors = export.domain("sensor")
+
+This module only depends on the standard library, so it can also be copied
+into tools that run outside of Home Assistant.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+from pathlib import Path
+from typing import Any
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 2
+
+
+class ExportReader:
+    """Read entities from an NDJSON export through its memory mapped body."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Open the export and load its sidecar index."""
+        self.path = Path(path)
+        index_path = self.path.with_suffix(INDEX_SUFFIX)
+        self._index: dict[str, Any] = json.loads(index_path.read_bytes())
+        if self._index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported export index version in {index_path}")
+
+        self._file = open(self.path, "rb")  # noqa: SIM115
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise
+        # Body and index are replaced one after the other, the export_id in
+        # the header line tells whether they belong to the same export
+        if len(self._mmap) != self._index["size"] or self._header_export_id() != (
+            self._index["export_id"]
+        ):
+            self.close()
+            raise ValueError(f"Export {self.path} does not match its index")
+
+    def _header_export_id(self) -> str | None:
+        """Return the export_id of the header line (None if it is not one)."""
+        try:
+            header = json.loads(self._read(*self._index["header"]))
+        except ValueError:
+            return None
+        return header.get("export_id") if isinstance(header, dict) else None
+
+    def close(self) -> None:
+        """Release the memory map and the file."""
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> ExportReader:
+        """Enter the context manager."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the reader when leaving the context manager."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Return the number of exported entities."""
+        return len(self._index["entities"])
+
+    def __contains__(self, entity_id: object) -> bool:
+        """Return True if the entity is part of the export."""
+        return entity_id in self._index["entities"]
+
+    @property
+    def entity_ids(self) -> list[str]:
+        """Return all exported entity_ids."""
+        return list(self._index["entities"])
+
+    @property
+    def domains(self) -> list[str]:
+        """Return all exported domains."""
+        return list(self._index["domains"])
+
+    @property
+    def areas(self) -> list[str]:
+        """Return all area names that have exported entities."""
+        return list(self._index["areas"])
+
+    def _read(self, offset: int, length: int) -> bytes:
+        """Return a slice of the body."""
+        return self._mmap[offset : offset + length]
+
+    @property
+    def header(self) -> dict[str, Any]:
+        """Return the export metadata (timestamp, summary, floors and areas)."""
+        return json.loads(self._read(*self._index["header"]))
+
+    def get(self, entity_id: str) -> dict[str, Any] | None:
+        """Return a single entity or None if it is not part of the export."""
+        if (location := self._index["entities"].get(entity_id)) is None:
+            return None
+        return json.loads(self._read(*location))
+
+    def domain(self, domain: str) -> list[dict[str, Any]]:
+        """Return all entities of a domain (sorted by entity_id)."""
+        if (location := self._index["domains"].get(domain)) is None:
+            return []
+        return [json.loads(line) for line in self._read(*location).splitlines()]
+
+    def area(self, area: str) -> list[dict[str, Any]]:
+        """Return all entities of an area (by name, "None" for no area)."""
+        return [
+            json.loads(self._read(*self._index["entities"][entity_id]))
+            for entity_id in self._index["areas"].get(area, [])
+        ]
@@ -0,0 +1,304 @@
+"""Include and exclude rules for the health monitoring.
+
+Rules select entities by integration, area, floor, label, device class and
+entity_id glob. They are compiled once into sets and a single regular
+expression, the decision per entity is cached and only made again when the
+registries change. The trackers ask before they store anything, so excluded
+entities are never tracked and checking one costs a dict lookup.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+import fnmatch
+import logging
+import re
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_DEVICE_CLASS
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+)
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import (
+    CONF_CONFIGURE_HEALTH_RULES,
+    DEFAULT_CONFIGURE_HEALTH_RULES,
+    HEALTH_RULE_AREAS,
+    HEALTH_RULE_DEVICE_CLASSES,
+    HEALTH_RULE_ENTITY_IDS,
+    HEALTH_RULE_EXCLUDE,
+    HEALTH_RULE_FLOORS,
+    HEALTH_RULE_INCLUDE,
+    HEALTH_RULE_INTEGRATIONS,
+    HEALTH_RULE_LABELS,
+    SIGNAL_RULES_UPDATED,
+)
+from .metrics import METRIC_EVENTS, IntegrationMetrics, async_timed
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class EntityFacts:
+    """What the rules look at for an entity."""
+
+    entity_id: str
+    integration: str | None
+    area_id: str | None
+    floor_id: str | None
+    labels: frozenset[str]
+    device_class: str | None
+
+
+@dataclass(slots=True, frozen=True)
+class RuleSet:
+    """Compiled rules of one mode (include or exclude)."""
+
+    integrations: frozenset[str] = frozenset()
+    areas: frozenset[str] = frozenset()
+    floors: frozenset[str] = frozenset()
+    labels: frozenset[str] = frozenset()
+    device_classes: frozenset[str] = frozenset()
+    # All entity_id globs joined into one expression
+    entity_ids: re.Pattern[str] | None = None
+
+    @classmethod
+    def compile(cls, options: Mapping[str, Any], mode: str) -> RuleSet:
+        """Compile the options of a mode (health_<mode>_<kind>)."""
+
+        def _values(kind: str) -> frozenset[str]:
+            return frozenset(
+                value.strip()
+                for value in options.get(f"health_{mode}_{kind}") or ()
+                if value and value.strip()
+            )
+
+        globs = _values(HEALTH_RULE_ENTITY_IDS)
+        return cls(
+            integrations=_values(HEALTH_RULE_INTEGRATIONS),
+            areas=_values(HEALTH_RULE_AREAS),
+            floors=_values(HEALTH_RULE_FLOORS),
+            labels=_values(HEALTH_RULE_LABELS),
+            device_classes=_values(HEALTH_RULE_DEVICE_CLASSES),
+            entity_ids=re.compile(
+                "|".join(fnmatch.translate(glob.lower()) for glob in sorted(globs))
+            )
+            if globs
+            else None,
+        )
+
+    def __bool__(self) -> bool:
+        """Return True if any rule is set."""
+        return bool(
+            self.integrations
+            or self.areas
+            or self.floors
+            or self.labels
+            or self.device_classes
+            or self.entity_ids
+        )
+
+    @property
+    def uses_location(self) -> bool:
+        """Return True if a rule depends on areas or floors."""
+        return bool(self.areas or self.floors)
+
+    def matches(self, facts: EntityFacts) -> bool:
+        """Return True if any rule matches the entity."""
+        return (
+            (facts.integration is not None and facts.integration in self.integrations)
+            or (facts.area_id is not None and facts.area_id in self.areas)
+            or (facts.floor_id is not None and facts.floor_id in self.floors)
+            or not self.labels.isdisjoint(facts.labels)
+            or (facts.device_class is not None and facts.device_class in self.device_classes)
+            or (self.entity_ids is not None and self.entity_ids.match(facts.entity_id) is not None)
+        )
+
+
+class HealthRules:
+    """Decide which entities the health trackers look at.
+
+    With include rules only matching entities are monitored, exclude rules
+    win over include rules. Without rules (or with the rules switched off in
+    the options) every entity is monitored.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        options: Mapping[str, Any],
+        metrics: IntegrationMetrics | None = None,
+    ) -> None:
+        """Initialize the rules."""
+        self.hass = hass
+        self._metrics = metrics
+        self._signal = f"{SIGNAL_RULES_UPDATED}_{entry.entry_id}"
+        self._include = RuleSet()
+        self._exclude = RuleSet()
+        self._active = False
+        # entity_id -> excluded, for every entity a tracker asked about
+        self._excluded: dict[str, bool] = {}
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._entity_reg = er.async_get(hass)
+        self._device_reg = dr.async_get(hass)
+        self._area_reg = ar.async_get(hass)
+        self._async_compile(options)
+
+    @callback
+    def async_setup(self) -> None:
+        """Start listening for registry changes."""
+        self._unsubs = [
+            self.hass.bus.async_listen(event_type, async_timed(self._metrics, METRIC_EVENTS, handler))
+            for event_type, handler in (
+                (er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_registry_updated),
+                (dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_registry_updated),
+                (ar.EVENT_AREA_REGISTRY_UPDATED, self._async_area_registry_updated),
+            )
+        ]
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop listening for registry changes."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    @callback
+    def async_configure(self, options: Mapping[str, Any]) -> None:
+        """Compile new rules, the trackers re-check all their entities."""
+        self._async_compile(options)
+        self._excluded.clear()
+        async_dispatcher_send(self.hass, self._signal, None)
+
+    @property
+    def active(self) -> bool:
+        """Return True if any rule is applied."""
+        return self._active
+
+    @property
+    def size(self) -> int:
+        """Return the number of cached decisions."""
+        return len(self._excluded)
+
+    @callback
+    def async_excluded(self, entity_id: str) -> bool:
+        """Return True if the health monitoring ignores an entity."""
+        if not self._active:
+            return False
+        if (excluded := self._excluded.get(entity_id)) is None:
+            excluded = self._excluded[entity_id] = self._async_decide(entity_id)
+        return excluded
+
+    @callback
+    def _async_compile(self, options: Mapping[str, Any]) -> None:
+        """Compile the rules of both modes (none if switched off)."""
+        if not options.get(CONF_CONFIGURE_HEALTH_RULES, DEFAULT_CONFIGURE_HEALTH_RULES):
+            self._include = self._exclude = RuleSet()
+            self._active = False
+            return
+        self._include = RuleSet.compile(options, HEALTH_RULE_INCLUDE)
+        self._exclude = RuleSet.compile(options, HEALTH_RULE_EXCLUDE)
+        self._active = bool(self._include or self._exclude)
+        _LOGGER.debug(
+            "Health rules compiled (include: %s, exclude: %s)",
+            bool(self._include),
+            bool(self._exclude),
+        )
+
+    @callback
+    def _async_facts(self, entity_id: str) -> EntityFacts:
+        """Collect integration, location, labels and device class of an entity."""
+        integration = area_id = floor_id = device_class = None
+        labels: frozenset[str] = frozenset()
+        if entity_entry := self._entity_reg.async_get(entity_id):
+            integration = entity_entry.platform
+            area_id = entity_entry.area_id
+            labels = frozenset(entity_entry.labels)
+            device_class = entity_entry.device_class or entity_entry.original_device_class
+            if entity_entry.device_id and (
+                device := self._device_reg.async_get(entity_entry.device_id)
+            ):
+                area_id = area_id or device.area_id
+                labels |= device.labels
+        if area_id and (area := self._area_reg.async_get_area(area_id)):
+            floor_id = area.floor_id
+        if device_class is None and (state := self.hass.states.get(entity_id)):
+            # Entities without a registry entry only have the state attribute
+            # (a device class changing later is not noticed)
+            device_class = state.attributes.get(ATTR_DEVICE_CLASS)
+        return EntityFacts(entity_id, integration, area_id, floor_id, labels, device_class)
+
+    @callback
+    def _async_decide(self, entity_id: str) -> bool:
+        """Return True if the rules exclude an entity."""
+        facts = self._async_facts(entity_id)
+        if self._exclude.matches(facts):
+            return True
+        return bool(self._include) and not self._include.matches(facts)
+
+    @callback
+    def _async_redecide(self, entity_ids: Iterable[str]) -> None:
+        """Decide again for cached entities, notify the trackers of changes."""
+        changed: set[str] = set()
+        for entity_id in entity_ids:
+            if (excluded := self._excluded.get(entity_id)) is None:
+                # No tracker asked yet, nothing depends on the decision
+                continue
+            if (new_excluded := self._async_decide(entity_id)) != excluded:
+                self._excluded[entity_id] = new_excluded
+                changed.add(entity_id)
+        if changed:
+            _LOGGER.debug("Health rules changed for %d entities", len(changed))
+            async_dispatcher_send(self.hass, self._signal, changed)
+
+    @callback
+    def _async_entity_registry_updated(self, event: Event) -> None:
+        """Decide again after an entity changed (integration, area, labels, entity_id)."""
+        if not self.active:
+            return
+        entity_id: str = event.data["entity_id"]
+        if event.data["action"] == "remove":
+            self._excluded.pop(entity_id, None)
+            return
+        if (old_entity_id := event.data.get("old_entity_id")) is not None:
+            self._excluded.pop(old_entity_id, None)
+            self._excluded.pop(entity_id, None)
+            async_dispatcher_send(self.hass, self._signal, {old_entity_id, entity_id})
+            return
+        self._async_redecide((entity_id,))
+
+    @callback
+    def _async_device_registry_updated(self, event: Event) -> None:
+        """Decide again for the entities of a device with a new area or labels."""
+        if not self.active or event.data["action"] != "update":
+            return
+        if not {"area_id", "labels"} & event.data.get("changes", {}).keys():
+            return
+        self._async_redecide(
+            entity_entry.entity_id
+            for entity_entry in er.async_entries_for_device(
+                self._entity_reg, event.data["device_id"], include_disabled_entities=True
+            )
+        )
+
+    @callback
+    def _async_area_registry_updated(self, event: Event) -> None:
+        """Decide again for all entities when an area moved to another floor."""
+        if event.data["action"] not in ("update", "remove"):
+            return
+        if self._include.uses_location or self._exclude.uses_location:
+            self._async_redecide(list(self._excluded))
+
+
+@callback
+def async_exclusion_check(rules: HealthRules | None) -> Callable[[str], bool]:
+    """Return the exclusion check of the rules (nothing is excluded without rules)."""
+    if rules is None:
+        return lambda entity_id: False
+    return rules.async_excluded
@@ -1,22 +1,39 @@
 """Sensor platform for Homebase42."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
 from typing import Any
 
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import (
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+    EntityCategory,
+    UnitOfPrecipitationDepth,
+    UnitOfTime,
+)
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.event import (
+    async_track_state_change_event,
+    async_track_time_interval,
+)
 from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.setup import async_when_setup
 from homeassistant.util import dt as dt_util
 
 from .const import (
@@ -24,19 +41,227 @@ from .const import (
     NAME,
     CONF_BATTERY_CRITICAL_THRESHOLD,
     CONF_BATTERY_LOW_THRESHOLD,
+    CONF_BATTERY_DUE_DAYS,
     CONF_UNAVAILABLE_NOTIFICATION_DELAY,
     CONF_INCLUDE_HIDDEN_ENTITIES,
     DEFAULT_BATTERY_CRITICAL,
     DEFAULT_BATTERY_LOW,
+    DEFAULT_BATTERY_DUE_DAYS,
     DEFAULT_UNAVAILABLE_DELAY,
     DEFAULT_INCLUDE_HIDDEN_ENTITIES,
     ATTR_ENTITIES,
+    ATTR_FORECASTS,
     ATTR_LAST_UPDATED,
+    HEALTH_SET_BATTERY_LOW,
+    RETIRED_TEMPLATES,
+    SIGNAL_OPTIONS_UPDATED,
+    UNRECORDED_ATTRIBUTES,
+    SIGNAL_BATTERY_UPDATED,
+    SIGNAL_STALE_UPDATED,
+)
+from .assets import (
+    ASSET_TEMPLATE,
+    AssetChange,
+    async_reload_assets,
+    async_remove_retired_templates,
+)
+from .battery import BatteryTracker
+from .coordinator import WeatherForecastCoordinator, WeatherForecasts
+from .health import HealthSets, StaleTracker, UnavailableTracker
+from .metrics import (
+    METRIC_EVENTS,
+    METRIC_EXPORTS,
+    METRIC_HEALTH_UPDATES,
+    IntegrationMetrics,
+    timed_update,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 SCAN_INTERVAL = timedelta(minutes=5)
+BATTERY_FORECAST_INTERVAL = timedelta(hours=1)
+
+# Seconds to wait for replaced template sensors to be removed
+TEMPLATE_REMOVAL_TIMEOUT = 10
+
+# Forecast attributes copied to the single day / single hour sensors
+DAY_ATTRIBUTES = ("condition", "cloud_coverage", "temperature", "datetime", "precipitation")
+HOUR_ATTRIBUTES = ("precipitation", "condition", "cloud_coverage", "temperature")
+
+
+def _forecast_item(forecast: list[dict[str, Any]], position: int) -> dict[str, Any] | None:
+    """Return a single forecast entry or None if the forecast is too short."""
+    return forecast[position] if len(forecast) > position else None
+
+
+def _forecast_attributes(
+    item: dict[str, Any] | None, keys: tuple[str, ...]
+) -> dict[str, Any]:
+    """Return the selected attributes of a forecast entry."""
+    if item is None:
+        return {}
+    return {key: item.get(key) for key in keys}
+
+
+def _max_temperature_time(data: WeatherForecasts) -> datetime | None:
+    """Return when the highest temperature of today is reached (first occurrence)."""
+    midnight = dt_util.start_of_local_day() + timedelta(days=1)
+    today: list[tuple[datetime, float]] = []
+    for item in data.hourly:
+        when = dt_util.parse_datetime(str(item.get("datetime")))
+        temperature = item.get("temperature")
+        if when is not None and temperature is not None and when < midnight:
+            today.append((when, temperature))
+    if not today:
+        return None
+    highest = max(temperature for _, temperature in today)
+    return min(when for when, temperature in today if temperature == highest)
+
+
+@dataclass(frozen=True, kw_only=True)
+class Homebase42ForecastSensorDescription(SensorEntityDescription):
+    """Describes a weather forecast sensor."""
+
+    # Object ID and unique ID of the replaced template sensor
+    legacy_object_id: str
+    legacy_unique_id: str
+    value_fn: Callable[[WeatherForecasts], Any]
+    attributes_fn: Callable[[WeatherForecasts], dict[str, Any]] = lambda data: {}
+
+
+FORECAST_SENSORS: tuple[Homebase42ForecastSensorDescription, ...] = (
+    Homebase42ForecastSensorDescription(
+        key="weather_forecast_daily",
+        translation_key="weather_forecast_daily",
+        icon="mdi:calendar-today",
+        legacy_object_id="wetter_vorhersage_taglich",
+        legacy_unique_id="s42_weather_forecast_daily",
+        value_fn=lambda data: data.condition,
+        attributes_fn=lambda data: {"forecast": data.daily},
+    ),
+    Homebase42ForecastSensorDescription(
+        key="forecast_today",
+        translation_key="forecast_today",
+        icon="mdi:weather-partly-cloudy",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        legacy_object_id="wetter_vorhersage_des_heutigen_tages",
+        legacy_unique_id="s42_forecast_today",
+        value_fn=lambda data: data.updated if data.daily else None,
+        attributes_fn=lambda data: _forecast_attributes(
+            _forecast_item(data.daily, 0), DAY_ATTRIBUTES
+        ),
+    ),
+    Homebase42ForecastSensorDescription(
+        key="forecast_next_1_day",
+        translation_key="forecast_next_1_day",
+        icon="mdi:weather-partly-cloudy",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        legacy_object_id="wetter_vorhersage_des_nachsten_tages",
+        legacy_unique_id="s42_forecast_next_1_day",
+        value_fn=lambda data: data.updated if len(data.daily) > 1 else None,
+        attributes_fn=lambda data: _forecast_attributes(
+            _forecast_item(data.daily, 1), DAY_ATTRIBUTES
+        ),
+    ),
+    Homebase42ForecastSensorDescription(
+        key="weather_forecast_hourly",
+        translation_key="weather_forecast_hourly",
+        icon="mdi:clock-outline",
+        legacy_object_id="wetter_vorhersage_stundlich",
+        legacy_unique_id="s42_weather_forecast_hourly",
+        value_fn=lambda data: data.condition,
+        attributes_fn=lambda data: {"forecast": data.hourly},
+    ),
+    Homebase42ForecastSensorDescription(
+        key="forecast_next_1_hour",
+        translation_key="forecast_next_1_hour",
+        icon="mdi:clock-time-one-outline",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        legacy_object_id="wetter_vorhersage_der_nachsten_stunde",
+        legacy_unique_id="s42_forecast_next_1_hour",
+        value_fn=lambda data: data.updated if len(data.hourly) > 1 else None,
+        attributes_fn=lambda data: _forecast_attributes(
+            _forecast_item(data.hourly, 1), HOUR_ATTRIBUTES
+        ),
+    ),
+    Homebase42ForecastSensorDescription(
+        key="forecast_precipitation_now",
+        translation_key="forecast_precipitation_now",
+        icon="mdi:weather-rainy",
+        device_class=SensorDeviceClass.PRECIPITATION,
+        native_unit_of_measurement=UnitOfPrecipitationDepth.MILLIMETERS,
+        legacy_object_id="regen_menge_der_jetzigen_stunde",
+        legacy_unique_id="s42_forecast_precipitation_now",
+        value_fn=lambda data: (_forecast_item(data.hourly, 0) or {}).get("precipitation"),
+    ),
+    Homebase42ForecastSensorDescription(
+        key="max_temperature_today_time",
+        translation_key="max_temperature_today_time",
+        icon="mdi:thermometer-high",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        legacy_object_id="hochsttemperatur_des_tages_uhrzeit",
+        legacy_unique_id="s42_max_temperature_today_time",
+        value_fn=_max_temperature_time,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class Homebase42MetricSensorDescription(SensorEntityDescription):
+    """Describes a diagnostic sensor of the runtime metrics."""
+
+    value_fn: Callable[[dict[str, Any]], Any]
+
+
+METRIC_SENSORS: tuple[Homebase42MetricSensorDescription, ...] = (
+    Homebase42MetricSensorDescription(
+        key="handled_events",
+        translation_key="handled_events",
+        icon="mdi:counter",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data: data["metrics"].timings[METRIC_EVENTS].count,
+    ),
+    Homebase42MetricSensorDescription(
+        key="loop_time",
+        translation_key="loop_time",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        suggested_display_precision=0,
+        value_fn=lambda data: data["metrics"].loop_time * 1000,
+    ),
+    Homebase42MetricSensorDescription(
+        key="health_update_time",
+        translation_key="health_update_time",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        value_fn=lambda data: data["metrics"].timings[METRIC_HEALTH_UPDATES].average * 1000,
+    ),
+    Homebase42MetricSensorDescription(
+        key="export_duration",
+        translation_key="export_duration",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        value_fn=lambda data: (
+            timing.last if (timing := data["metrics"].timings[METRIC_EXPORTS]).count else None
+        ),
+    ),
+    Homebase42MetricSensorDescription(
+        key="indexed_entities",
+        translation_key="indexed_entities",
+        icon="mdi:database",
+        native_unit_of_measurement="entities",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data: data["index"].size,
+    ),
+)
 
 
 async def async_setup_entry(
@@ -49,9 +274,115 @@ async def async_setup_entry(
     sensors = [
         Homebase42UnavailableCountSensor(hass, entry),
         Homebase42BatteryLowCountSensor(hass, entry),
+        Homebase42StaleCountSensor(hass, entry),
+        Homebase42BatteriesDueSensor(hass, entry),
     ]
     
     async_add_entities(sensors, True)
+    
+    # Runtime metrics (disabled by default)
+    async_add_entities(
+        Homebase42MetricSensor(hass, entry, description) for description in METRIC_SENSORS
+    )
+    
+    # Weather forecast sensors (replace the former template package)
+    coordinator: WeatherForecastCoordinator | None = hass.data[DOMAIN][entry.entry_id].get(
+        "weather"
+    )
+    if coordinator is not None:
+        legacy_entity_ids = await _async_remove_template_sensors(hass)
+        forecast_sensors = [
+            Homebase42ForecastSensor(
+                coordinator,
+                entry,
+                description,
+                legacy_entity_ids.get(
+                    description.legacy_unique_id,
+                    f"sensor.{description.legacy_object_id}",
+                ),
+            )
+            for description in FORECAST_SENSORS
+        ]
+        # No update before adding, the coordinator fetches the forecasts itself
+        async_add_entities(forecast_sensors)
+
+
+async def _async_remove_template_sensors(hass: HomeAssistant) -> dict[str, str]:
+    """Remove the template sensors of the former weather package.
+    
+    Returns the entity_ids by legacy unique_id, so the native sensors can take
+    them over and dashboards, automations and history keep working.
+    """
+    # The package has to be gone before the entity_ids are taken over,
+    # otherwise template sets the sensors up again (as sensor.*_2)
+    if changes := await async_remove_retired_templates(hass):
+        if "template" in hass.config.components:
+            await async_reload_assets(hass, changes)
+        else:
+            # Template is set up later with the configuration read at startup
+            # (still containing the package): reload it once it is set up and
+            # remove what it registered again
+            async_when_setup(hass, "template", _async_template_set_up)
+    
+    entity_reg = er.async_get(hass)
+    legacy_entity_ids: dict[str, str] = {}
+    for description in FORECAST_SENSORS:
+        if entity_id := entity_reg.async_get_entity_id(
+            "sensor", "template", description.legacy_unique_id
+        ):
+            legacy_entity_ids[description.legacy_unique_id] = entity_id
+    if not legacy_entity_ids:
+        return legacy_entity_ids
+    
+    # Loaded template entities remove their state asynchronously once their
+    # registry entry is gone, the entity_ids are only free after that
+    loaded = {
+        entity_id
+        for entity_id in legacy_entity_ids.values()
+        if hass.states.get(entity_id) is not None
+    }
+    removed = asyncio.Event()
+    
+    @callback
+    def _async_state_removed(event: Event) -> None:
+        if event.data.get("new_state") is None:
+            loaded.discard(event.data["entity_id"])
+            if not loaded:
+                removed.set()
+    
+    unsub = async_track_state_change_event(hass, list(loaded), _async_state_removed)
+    for entity_id in legacy_entity_ids.values():
+        _LOGGER.info("Replacing template sensor %s", entity_id)
+        entity_reg.async_remove(entity_id)
+    try:
+        if loaded:
+            async with asyncio.timeout(TEMPLATE_REMOVAL_TIMEOUT):
+                await removed.wait()
+    except TimeoutError:
+        _LOGGER.warning(
+            "Template sensors %s were not removed in time", ", ".join(sorted(loaded))
+        )
+    finally:
+        unsub()
+    return legacy_entity_ids
+
+
+async def _async_template_set_up(hass: HomeAssistant, component: str) -> None:
+    """Drop the template sensors set up from the removed weather package."""
+    await async_reload_assets(
+        hass,
+        [
+            AssetChange(ASSET_TEMPLATE, template_filename, "removed")
+            for template_filename in RETIRED_TEMPLATES
+        ],
+    )
+    entity_reg = er.async_get(hass)
+    for description in FORECAST_SENSORS:
+        if entity_id := entity_reg.async_get_entity_id(
+            "sensor", "template", description.legacy_unique_id
+        ):
+            _LOGGER.info("Removing template sensor %s set up from the removed package", entity_id)
+            entity_reg.async_remove(entity_id)
 
 
 class Homebase42UnavailableCountSensor(SensorEntity, RestoreEntity):
@@ -61,15 +392,18 @@ class Homebase42UnavailableCountSensor(SensorEntity, RestoreEntity):
     _attr_translation_key = "unavailable_count"
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_icon = "mdi:counter"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
     _attr_native_unit_of_measurement = "entities"
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize the sensor."""
         self.hass = hass
         self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
         self._attr_unique_id = f"{entry.entry_id}_unavailable_count"
         self._attr_native_value = 0
         self._unavailable_entities: list[str] = []
+        self._tracker: UnavailableTracker = hass.data[DOMAIN][entry.entry_id]["unavailable"]
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, entry.entry_id)},
             name=NAME,
@@ -100,13 +434,22 @@ class Homebase42UnavailableCountSensor(SensorEntity, RestoreEntity):
             )
         )
         
+        # Re-evaluate when options are changed (applied without a reload)
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{SIGNAL_OPTIONS_UPDATED}_{self._entry.entry_id}",
+                self._async_update,
+            )
+        )
+        
         # Initial update
         await self._async_update()
 
     @callback
+    @timed_update
     async def _async_update(self, now=None) -> None:
         """Update the sensor."""
-        unavailable_entities = []
         delay_hours = self._entry.options.get(
             CONF_UNAVAILABLE_NOTIFICATION_DELAY, DEFAULT_UNAVAILABLE_DELAY
         )
@@ -114,29 +457,12 @@ class Homebase42UnavailableCountSensor(SensorEntity, RestoreEntity):
         include_hidden = self._entry.options.get(
             CONF_INCLUDE_HIDDEN_ENTITIES, DEFAULT_INCLUDE_HIDDEN_ENTITIES
         )
-        now_time = dt_util.utcnow()
         
-        # Get entity registry to check visibility
-        entity_reg = er.async_get(self.hass)
-
-        # Iterate through all entities
-        for state in self.hass.states.async_all():
-            # Skip entities from this integration
-            if state.entity_id.startswith(f"binary_sensor.{DOMAIN}_") or \
-               state.entity_id.startswith(f"sensor.{DOMAIN}_"):
-                continue
-
-            # Skip hidden entities if not configured to include them
-            if not include_hidden:
-                entity_entry = entity_reg.async_get(state.entity_id)
-                if entity_entry and entity_entry.hidden_by is not None:
-                    continue
-
-            # Check if entity is unavailable
-            if state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
-                # Check if it has been unavailable for long enough
-                if state.last_changed and (now_time - state.last_changed) >= delay:
-                    unavailable_entities.append(state.entity_id)
+        # Only entities that are unavailable are tracked, no need to look at all states
+        unavailable_entities = [
+            entity_id
+            for entity_id, _ in self._tracker.async_unavailable(delay, include_hidden)
+        ]
         
         self._unavailable_entities = unavailable_entities
         self._attr_native_value = len(unavailable_entities)
@@ -159,13 +485,17 @@ class Homebase42BatteryLowCountSensor(SensorEntity, RestoreEntity):
     _attr_translation_key = "battery_low_count"
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_icon = "mdi:battery-low"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
     _attr_native_unit_of_measurement = "entities"
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize the sensor."""
         self.hass = hass
         self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
         self._attr_unique_id = f"{entry.entry_id}_battery_low_count"
+        self._health_sets: HealthSets = hass.data[DOMAIN]["health_sets"]
+        self._batteries: BatteryTracker = hass.data[DOMAIN][entry.entry_id]["batteries"]
         self._attr_native_value = 0
         self._low_batteries: list[str] = []
         self._attr_device_info = DeviceInfo(
@@ -198,10 +528,20 @@ class Homebase42BatteryLowCountSensor(SensorEntity, RestoreEntity):
             )
         )
         
+        # Re-evaluate when options are changed (applied without a reload)
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                f"{SIGNAL_OPTIONS_UPDATED}_{self._entry.entry_id}",
+                self._async_update,
+            )
+        )
+        
         # Initial update
         await self._async_update()
 
     @callback
+    @timed_update
     async def _async_update(self, now=None) -> None:
         """Update the sensor."""
         low_batteries = []
@@ -218,8 +558,10 @@ class Homebase42BatteryLowCountSensor(SensorEntity, RestoreEntity):
         # Get entity registry to check visibility
         entity_reg = er.async_get(self.hass)
 
-        # Iterate through all sensor entities
-        for state in self.hass.states.async_all("sensor"):
+        # Only the batteries of the tracker, excluded ones are never tracked
+        for entity_id in self._batteries.async_batteries():
+            if (state := self.hass.states.get(entity_id)) is None:
+                continue
             # Skip hidden entities if not configured to include them
             if not include_hidden:
                 entity_entry = entity_reg.async_get(state.entity_id)
@@ -242,6 +584,7 @@ class Homebase42BatteryLowCountSensor(SensorEntity, RestoreEntity):
         
         self._low_batteries = low_batteries
         self._attr_native_value = len(low_batteries)
+        self._health_sets.async_publish(HEALTH_SET_BATTERY_LOW, low_batteries)
         
         self.async_write_ha_state()
 
@@ -252,3 +595,241 @@ class Homebase42BatteryLowCountSensor(SensorEntity, RestoreEntity):
             ATTR_ENTITIES: self._low_batteries,
             ATTR_LAST_UPDATED: dt_util.utcnow().isoformat(),
         }
+
+
+class Homebase42StaleCountSensor(SensorEntity):
+    """Sensor for counting entities that stopped reporting."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "stale_count"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:timer-sand"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
+    _attr_native_unit_of_measurement = "entities"
+    _attr_should_poll = False
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self.hass = hass
+        self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+        self._attr_unique_id = f"{entry.entry_id}_stale_count"
+        self._attr_native_value = 0
+        self._stale_entities: list[str] = []
+        self._tracker: StaleTracker = hass.data[DOMAIN][entry.entry_id]["stale"]
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=NAME,
+            manufacturer="Simon42",
+            model="Homebase42",
+            sw_version="0.1.0",
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Handle entity added to hass."""
+        await super().async_added_to_hass()
+        
+        # The tracker reports changes, no periodic update needed
+        for signal in (SIGNAL_STALE_UPDATED, SIGNAL_OPTIONS_UPDATED):
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass, f"{signal}_{self._entry.entry_id}", self._async_update
+                )
+            )
+        
+        self._async_update()
+
+    @callback
+    @timed_update
+    def _async_update(self) -> None:
+        """Update the sensor."""
+        include_hidden = self._entry.options.get(
+            CONF_INCLUDE_HIDDEN_ENTITIES, DEFAULT_INCLUDE_HIDDEN_ENTITIES
+        )
+        self._stale_entities = [
+            entity_id for entity_id, _ in self._tracker.async_stale(include_hidden)
+        ]
+        self._attr_native_value = len(self._stale_entities)
+        
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            ATTR_ENTITIES: self._stale_entities,
+            ATTR_LAST_UPDATED: dt_util.utcnow().isoformat(),
+        }
+
+
+class Homebase42BatteriesDueSensor(SensorEntity):
+    """Sensor for batteries forecast to reach the critical level soon."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "batteries_due"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:battery-clock"
+    _unrecorded_attributes = UNRECORDED_ATTRIBUTES
+    _attr_native_unit_of_measurement = "entities"
+    _attr_should_poll = False
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self.hass = hass
+        self._entry = entry
+        self._metrics: IntegrationMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+        self._attr_unique_id = f"{entry.entry_id}_batteries_due"
+        self._attr_native_value = 0
+        self._due: dict[str, dict[str, Any]] = {}
+        self._tracker: BatteryTracker = hass.data[DOMAIN][entry.entry_id]["batteries"]
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=NAME,
+            manufacturer="Simon42",
+            model="Homebase42",
+            sw_version="0.1.0",
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Handle entity added to hass."""
+        await super().async_added_to_hass()
+        
+        # The remaining days shrink without new samples
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_update,
+                BATTERY_FORECAST_INTERVAL,
+            )
+        )
+        
+        # New samples and changed options
+        for signal in (SIGNAL_BATTERY_UPDATED, SIGNAL_OPTIONS_UPDATED):
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass, f"{signal}_{self._entry.entry_id}", self._async_update
+                )
+            )
+        
+        self._async_update()
+
+    @callback
+    @timed_update
+    def _async_update(self, now: datetime | None = None) -> None:
+        """Update the sensor."""
+        due_days = self._entry.options.get(CONF_BATTERY_DUE_DAYS, DEFAULT_BATTERY_DUE_DAYS)
+        now = dt_util.utcnow()
+        
+        due: list[tuple[float, str, dict[str, Any]]] = []
+        for entity_id, forecast in self._tracker.async_forecasts().items():
+            days = forecast.days_to_critical(now)
+            if days <= due_days:
+                due.append(
+                    (
+                        days,
+                        entity_id,
+                        {
+                            "level": forecast.level,
+                            "rate_per_day": forecast.rate,
+                            "days_to_critical": round(days, 1),
+                        },
+                    )
+                )
+        due.sort()
+        
+        self._due = {entity_id: details for _, entity_id, details in due}
+        self._attr_native_value = len(self._due)
+        
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return additional attributes."""
+        return {
+            ATTR_ENTITIES: list(self._due),
+            ATTR_FORECASTS: self._due,
+            ATTR_LAST_UPDATED: dt_util.utcnow().isoformat(),
+        }
+
+
+class Homebase42MetricSensor(SensorEntity):
+    """Diagnostic sensor showing a runtime metric of the integration."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    entity_description: Homebase42MetricSensorDescription
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        description: Homebase42MetricSensorDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._entry_data: dict[str, Any] = hass.data[DOMAIN][entry.entry_id]
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=NAME,
+            manufacturer="Simon42",
+            model="Homebase42",
+            sw_version="0.1.0",
+        )
+
+    @property
+    def native_value(self) -> Any:
+        """Return the current value of the metric."""
+        return self.entity_description.value_fn(self._entry_data)
+
+
+class Homebase42ForecastSensor(CoordinatorEntity[WeatherForecastCoordinator], SensorEntity):
+    """Sensor showing (a part of) the cached weather forecast."""
+
+    _attr_has_entity_name = True
+    entity_description: Homebase42ForecastSensorDescription
+
+    def __init__(
+        self,
+        coordinator: WeatherForecastCoordinator,
+        entry: ConfigEntry,
+        description: Homebase42ForecastSensorDescription,
+        entity_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        # Only used as suggestion when the entity is registered for the first time
+        self.entity_id = entity_id
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=NAME,
+            manufacturer="Simon42",
+            model="Homebase42",
+            sw_version="0.1.0",
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return True if there is a forecast for this sensor."""
+        return (
+            super().available
+            and self.coordinator.data is not None
+            and self.native_value is not None
+        )
+
+    @property
+    def native_value(self) -> Any:
+        """Return the state of the sensor."""
+        if self.coordinator.data is None:
+            return None
+        return self.entity_description.value_fn(self.coordinator.data)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the forecast attributes."""
+        if self.coordinator.data is None:
+            return {}
+        return self.entity_description.attributes_fn(self.coordinator.data)
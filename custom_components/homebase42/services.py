@@ -1,16 +1,31 @@
 """Services for Homebase42."""
 from __future__ import annotations
 
-import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import multiprocessing
+import time
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
 from typing import Any
 
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import area_registry as ar, device_registry as dr, entity_registry as er, floor_registry as fr
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -20,215 +35,523 @@ from .const import (
     DEFAULT_EXPORT_STATES_ENABLED,
     DEFAULT_EXPORT_STATES_PATH,
     DEFAULT_EXPORT_STATES_INTERVAL,
+    CONF_EXPORT_STATES_BACKEND,
+    DEFAULT_EXPORT_STATES_BACKEND,
+    EXPORT_BACKEND_EXECUTOR,
+    EXPORT_BACKEND_SUBPROCESS,
+    EXPORT_BACKENDS,
+    CONF_EXPORT_STATES_FORMAT,
+    DEFAULT_EXPORT_STATES_FORMAT,
+    EXPORT_FORMAT_NDJSON,
+    EXPORT_FORMATS,
+    CONF_UNAVAILABLE_NOTIFICATION_DELAY,
+    DEFAULT_UNAVAILABLE_DELAY,
+    CONF_INCLUDE_HIDDEN_ENTITIES,
+    DEFAULT_INCLUDE_HIDDEN_ENTITIES,
+)
+from .export import SKIPPED_ATTRIBUTES, index_path_for, run_export
+from .health import HEALTH_EVENTS, HealthLog, UnavailableTracker, render_digest
+from .index import (
+    INDEX_AREA,
+    INDEX_DEVICE_CLASS,
+    INDEX_DOMAIN,
+    INDEX_FLOOR,
+    INDEX_STATE,
+    EntityIndex,
 )
+from .metrics import METRIC_EXPORT_SNAPSHOT, METRIC_EXPORTS, IntegrationMetrics
+from .profiling import ProfileSession
 
 _LOGGER = logging.getLogger(__name__)
 
 SERVICE_EXPORT_STATES = "export_states"
+SERVICE_GET_SUMMARY = "get_summary"
+SERVICE_QUERY_STATES = "query_states"
+SERVICE_GET_UNAVAILABLE = "get_unavailable"
+SERVICE_GET_HEALTH_LOG = "get_health_log"
+SERVICE_PROFILE = "profile"
 EXPORT_STARTUP_DELAY = timedelta(minutes=5)
 
+# At least one indexed filter is required, attribute filters only narrow the
+# candidates down (a query never walks all entities)
+QUERY_STATES_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(INDEX_DOMAIN): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(INDEX_AREA): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(INDEX_FLOOR): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(INDEX_DEVICE_CLASS): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(INDEX_STATE): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional("attributes"): vol.Schema({cv.string: object}),
+            vol.Optional("include_attributes", default=False): cv.boolean,
+            vol.Optional("limit", default=100): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        }
+    ),
+    cv.has_at_least_one_key(
+        INDEX_DOMAIN, INDEX_AREA, INDEX_FLOOR, INDEX_DEVICE_CLASS, INDEX_STATE
+    ),
+)
 
-async def async_setup_services(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Set up services for Homebase42."""
+GET_UNAVAILABLE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("delay"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional("include_hidden"): cv.boolean,
+    }
+)
+
+GET_HEALTH_LOG_SCHEMA = vol.Schema(
+    {
+        vol.Optional("entity_id"): cv.entity_ids,
+        vol.Optional("event"): vol.In(HEALTH_EVENTS),
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("limit", default=100): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("health_updates", default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=1000)
+        ),
+        vol.Optional("export", default=False): cv.boolean,
+        vol.Optional("timeout", default=600): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+
+def _attribute_matches(value: Any, expected: Any) -> bool:
+    """Check an attribute value against a filter value (a list means any of)."""
+    if isinstance(expected, list):
+        return any(_attribute_matches(value, item) for item in expected)
+    return value == expected or (value is not None and str(value) == str(expected))
+
+
+@callback
+def _async_get_index(hass: HomeAssistant, entry: ConfigEntry) -> EntityIndex | None:
+    """Return the live entity index of a config entry."""
+    return hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("index")
+
+
+@callback
+def _async_get_unavailable_tracker(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> UnavailableTracker | None:
+    """Return the unavailable tracker of a config entry."""
+    return hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("unavailable")
+
+
+@callback
+def _async_get_metrics(hass: HomeAssistant, entry: ConfigEntry) -> IntegrationMetrics | None:
+    """Return the runtime metrics of a config entry."""
+    return hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("metrics")
+
+
+@callback
+def _async_get_health_log(hass: HomeAssistant, entry: ConfigEntry) -> HealthLog | None:
+    """Return the health log of a config entry."""
+    return hass.data.get(DOMAIN, {}).get(entry.entry_id, {}).get("health_log")
+
+
+@callback
+def _async_get_export_pool(hass: HomeAssistant) -> ProcessPoolExecutor:
+    """Return the worker process pool for exports, creating it on first use."""
+    hass.data.setdefault(DOMAIN, {})
+    if (pool := hass.data[DOMAIN].get("export_pool")) is None:
+        # Use spawn: forking a process with a running event loop and threads is unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        hass.data[DOMAIN]["export_pool"] = pool
+    return pool
+
+
+async def _async_shutdown_export_pool(hass: HomeAssistant) -> None:
+    """Shut down the export worker process pool if it is running."""
+    if (pool := hass.data.get(DOMAIN, {}).pop("export_pool", None)) is not None:
+        await hass.async_add_executor_job(
+            partial(pool.shutdown, wait=True, cancel_futures=True)
+        )
+
+
+async def async_export_states(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    output_path: str = "homebase42_state_export.json",
+    include_attributes: bool = True,
+    include_context: bool = True,
+    backend: str | None = None,
+    file_format: str | None = None,
+    profile: ProfileSession | None = None,
+) -> None:
+    """Export all states (backend and format default to the entry options).
+
+    With a profile session the export runs in the executor under its profiler.
+    """
+    _LOGGER.debug("Starting automatic state export to %s", output_path)
     
-    # Get configuration options
     options = entry.options
-    export_enabled = options.get(CONF_EXPORT_STATES_ENABLED, DEFAULT_EXPORT_STATES_ENABLED)
-    export_path = options.get(CONF_EXPORT_STATES_PATH, DEFAULT_EXPORT_STATES_PATH)
-    export_interval_minutes = options.get(CONF_EXPORT_STATES_INTERVAL, DEFAULT_EXPORT_STATES_INTERVAL)
+    if backend is None:
+        backend = options.get(CONF_EXPORT_STATES_BACKEND, DEFAULT_EXPORT_STATES_BACKEND)
+    if file_format is None:
+        file_format = options.get(CONF_EXPORT_STATES_FORMAT, DEFAULT_EXPORT_STATES_FORMAT)
     
-    async def export_states_internal(
-        output_path: str = "homebase42_state_export.json",
-        include_attributes: bool = True,
-        include_context: bool = True,
-    ) -> None:
-        """Internal function to export states."""
-        _LOGGER.debug("Starting automatic state export to %s", output_path)
+    if profile is not None:
+        # cProfile only sees this process
+        backend = EXPORT_BACKEND_EXECUTOR
+        profile.exports += 1
+        profile.exporting = True
+    
+    export_start = time.perf_counter()
+    metrics = _async_get_metrics(hass, entry)
+    profiler = profile.async_start() if profile is not None else None
+    try:
+        # Get registries for additional context
+        entity_reg = er.async_get(hass)
+        area_reg = ar.async_get(hass)
+        device_reg = dr.async_get(hass)
+        floor_reg = fr.async_get(hass)
         
-        try:
-            # Get registries for additional context
-            entity_reg = er.async_get(hass)
-            area_reg = ar.async_get(hass)
-            device_reg = dr.async_get(hass)
-            floor_reg = fr.async_get(hass)
-            
-            # Add summary by domain and area
-            summary = {
-                "by_domain": {},
-                "by_area": {},
+        # Collect floors and areas structure with IDs and names
+        floors_and_areas = {}
+        for floor in floor_reg.async_list_floors():
+            floors_and_areas[floor.floor_id] = {
+                "floor_id": floor.floor_id,
+                "name": floor.name,
+                "level": floor.level,
+                "areas": []
             }
-            
-            # Collect floors and areas structure with IDs and names
-            floors_and_areas = {}
-            for floor in floor_reg.async_list_floors():
-                floors_and_areas[floor.floor_id] = {
-                    "floor_id": floor.floor_id,
-                    "name": floor.name,
-                    "level": floor.level,
-                    "areas": []
-                }
-            
-            # Add areas to their respective floors
-            for area in area_reg.async_list_areas():
-                area_info = {
-                    "area_id": area.id,
-                    "name": area.name,
-                }
-                
-                floor_id = area.floor_id or "no_floor"
-                if floor_id == "no_floor":
-                    # Create "no_floor" entry if it doesn't exist
-                    if floor_id not in floors_and_areas:
-                        floors_and_areas[floor_id] = {
-                            "floor_id": "no_floor",
-                            "name": "No Floor",
-                            "level": None,
-                            "areas": []
-                        }
-                
-                if floor_id in floors_and_areas:
-                    floors_and_areas[floor_id]["areas"].append(area_info)
-            
-            # Collect all states
-            states_by_domain = {}
-            for state in hass.states.async_all():
-                entity_data = {
-                    "entity_id": state.entity_id,
-                    "state": state.state,
-                    "domain": state.domain,
-                }
-                
-                # Add basic attributes
-                attributes = state.attributes or {}
-                entity_data["friendly_name"] = attributes.get("friendly_name", "")
-                entity_data["device_class"] = attributes.get("device_class", "")
-                entity_data["unit"] = attributes.get("unit_of_measurement", "")
-                entity_data["supported_features"] = attributes.get("supported_features", 0)
-                
-                # Get area from entity registry
-                area_name = "None"
-                if entity_entry := entity_reg.async_get(state.entity_id):
-                    # Try to get area from entity first
-                    if entity_entry.area_id:
-                        if area := area_reg.async_get_area(entity_entry.area_id):
-                            area_name = area.name
-                    # If no area on entity, try device
-                    elif entity_entry.device_id:
-                        if device := device_reg.async_get(entity_entry.device_id):
-                            if device.area_id:
-                                if area := area_reg.async_get_area(device.area_id):
-                                    area_name = area.name
-                    
-                    # Add entity registry info if requested
-                    if include_context:
-                        entity_data["entity_category"] = entity_entry.entity_category
-                        entity_data["disabled"] = entity_entry.disabled
-                        entity_data["hidden"] = entity_entry.hidden_by is not None
-                        entity_data["platform"] = entity_entry.platform
-                        entity_data["original_name"] = entity_entry.original_name
-                
-                entity_data["area"] = area_name
-                
-                # Add timestamps if requested
-                if include_context:
-                    entity_data["last_changed"] = state.last_changed.isoformat()
-                    entity_data["last_updated"] = state.last_updated.isoformat()
-                
-                # Add all attributes if requested
-                if include_attributes:
-                    # Filter out large attributes and internal ones, convert datetime to string
-                    filtered_attrs = {}
-                    for k, v in attributes.items():
-                        if k in ["entity_picture", "friendly_name", "icon", "device_class", 
-                                "unit_of_measurement", "supported_features", "attribution"]:
-                            continue
-                        if isinstance(v, (bytes, bytearray)):
-                            continue
-                        # Convert datetime objects to ISO format strings
-                        if isinstance(v, datetime):
-                            v = v.isoformat()
-                        filtered_attrs[k] = v
-                    
-                    if filtered_attrs:
-                        entity_data["attributes"] = filtered_attrs
-                
-                # Group by domain
-                domain = state.domain
-                if domain not in states_by_domain:
-                    states_by_domain[domain] = []
-                states_by_domain[domain].append(entity_data)
-                
-                # Update summary
-                summary["by_domain"][domain] = summary["by_domain"].get(domain, 0) + 1
-                summary["by_area"][area_name] = summary["by_area"].get(area_name, 0) + 1
-            
-            # Sort entities within each domain by entity_id
-            for domain in states_by_domain:
-                states_by_domain[domain].sort(key=lambda x: x["entity_id"])
-            
-            # Build export data with summary first
-            total_entities = sum(len(entities) for entities in states_by_domain.values())
-            export_data = {
-                "export_timestamp": datetime.now().isoformat(),
-                "home_assistant_version": hass.config.as_dict().get("version", "unknown"),
-                "total_entities": total_entities,
-                "summary": summary,
-                "floors_and_areas": floors_and_areas,
-                "states_by_domain": states_by_domain,
+        
+        # Add areas to their respective floors
+        for area in area_reg.async_list_areas():
+            area_info = {
+                "area_id": area.id,
+                "name": area.name,
             }
             
-            # Determine output file path
-            if output_path.startswith("/"):
-                # Absolute path
-                file_path = Path(output_path)
-            else:
-                # Relative to config directory
-                file_path = Path(hass.config.path(output_path))
+            floor_id = area.floor_id or "no_floor"
+            if floor_id == "no_floor":
+                # Create "no_floor" entry if it doesn't exist
+                if floor_id not in floors_and_areas:
+                    floors_and_areas[floor_id] = {
+                        "floor_id": "no_floor",
+                        "name": "No Floor",
+                        "level": None,
+                        "areas": []
+                    }
             
-            # Add .json extension if not present
-            if file_path.suffix != ".json":
-                file_path = file_path.with_suffix(".json")
-            
-            # Write to file using executor to avoid blocking
-            def _write_json_file():
-                """Write JSON file synchronously in executor."""
-                # Ensure directory exists
-                file_path.parent.mkdir(parents=True, exist_ok=True)
+            if floor_id in floors_and_areas:
+                floors_and_areas[floor_id]["areas"].append(area_info)
+        
+        # Take a compact snapshot of all states with resolved registry data.
+        # Only this part needs the event loop, the transform and serialization
+        # run in the executor or in a worker process (see export.py).
+        snapshot = []
+        for state in hass.states.async_all():
+            # Get area from entity registry
+            area_name = "None"
+            registry = None
+            if entity_entry := entity_reg.async_get(state.entity_id):
+                # Try to get area from entity first
+                if entity_entry.area_id:
+                    if area := area_reg.async_get_area(entity_entry.area_id):
+                        area_name = area.name
+                # If no area on entity, try device
+                elif entity_entry.device_id:
+                    if device := device_reg.async_get(entity_entry.device_id):
+                        if device.area_id:
+                            if area := area_reg.async_get_area(device.area_id):
+                                area_name = area.name
                 
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(export_data, f, indent=2, ensure_ascii=False, default=str)
-            
-            await hass.async_add_executor_job(_write_json_file)
+                if include_context:
+                    registry = (
+                        entity_entry.entity_category,
+                        entity_entry.disabled,
+                        entity_entry.hidden_by is not None,
+                        entity_entry.platform,
+                        entity_entry.original_name,
+                    )
             
-            _LOGGER.info(
-                "Successfully exported %d entities to %s",
-                total_entities,
-                file_path,
+            snapshot.append(
+                (
+                    state.entity_id,
+                    state.domain,
+                    state.state,
+                    dict(state.attributes),
+                    state.last_changed,
+                    state.last_updated,
+                    area_name,
+                    registry,
+                )
             )
-            
-            # Fire event for automation triggers
-            hass.bus.async_fire(
-                f"{DOMAIN}_state_export_complete",
-                {
-                    "file_path": str(file_path),
-                    "entity_count": total_entities,
-                    "timestamp": export_data["export_timestamp"],
-                },
+        
+        header = {
+            "export_timestamp": datetime.now().isoformat(),
+            "home_assistant_version": hass.config.as_dict().get("version", "unknown"),
+        }
+        
+        # Determine output file path
+        if output_path.startswith("/"):
+            # Absolute path
+            file_path = Path(output_path)
+        else:
+            # Relative to config directory
+            file_path = Path(hass.config.path(output_path))
+        
+        # Add .json (or .ndjson) extension if not present
+        suffix = f".{file_format}"
+        if file_path.suffix != suffix:
+            file_path = file_path.with_suffix(suffix)
+        
+        # Counts come from the live entity index instead of being recounted
+        summary = None
+        if (index := _async_get_index(hass, entry)) is not None:
+            summary = index.async_summary()
+            del summary["total_entities"]
+        
+        export_args = (
+            file_path,
+            header,
+            floors_and_areas,
+            snapshot,
+            include_attributes,
+            include_context,
+            summary,
+            file_format,
+        )
+        if profiler is not None:
+            profiler.disable()
+            profiler = None
+        if metrics is not None:
+            metrics.async_add(METRIC_EXPORT_SNAPSHOT, time.perf_counter() - export_start)
+        total_entities = None
+        if backend == EXPORT_BACKEND_SUBPROCESS:
+            try:
+                # Submitting may start the worker process, keep that off the loop
+                future = await hass.async_add_executor_job(
+                    _async_get_export_pool(hass).submit, run_export, *export_args
+                )
+                total_entities = await asyncio.wrap_future(future)
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning(
+                    "Export worker process failed (%s), falling back to in-process export",
+                    err,
+                )
+                await _async_shutdown_export_pool(hass)
+        
+        if total_entities is None and profile is not None:
+            total_entities = await hass.async_add_executor_job(
+                partial(profile.runcall, run_export, *export_args)
             )
-            
-        except Exception as err:
-            _LOGGER.error("Failed to export states: %s", err, exc_info=True)
+        if total_entities is None:
+            # Transform and write in the executor to avoid blocking
+            total_entities = await hass.async_add_executor_job(run_export, *export_args)
+        
+        _LOGGER.info(
+            "Successfully exported %d entities to %s",
+            total_entities,
+            file_path,
+        )
+        if metrics is not None:
+            metrics.async_add(METRIC_EXPORTS, time.perf_counter() - export_start)
+        
+        # Fire event for automation triggers
+        event_data = {
+            "file_path": str(file_path),
+            "entity_count": total_entities,
+            "timestamp": header["export_timestamp"],
+        }
+        if file_format == EXPORT_FORMAT_NDJSON:
+            event_data["index_path"] = str(index_path_for(file_path))
+        hass.bus.async_fire(f"{DOMAIN}_state_export_complete", event_data)
+        
+    except Exception as err:
+        _LOGGER.error("Failed to export states: %s", err, exc_info=True)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if profile is not None:
+            profile.exporting = False
+
 
+async def async_setup_services(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Set up services for Homebase42."""
+    
     async def handle_export_states(call: ServiceCall) -> None:
         """Handle the export_states service call."""
         # Get parameters from service call
         include_attributes = call.data.get("include_attributes", True)
         include_context = call.data.get("include_context", True)
         output_path = call.data.get("output_path", "homebase42_state_export.json")
+        backend = call.data.get("backend")
+        if backend is not None and backend not in EXPORT_BACKENDS:
+            _LOGGER.warning("Unknown export backend '%s', using the configured one", backend)
+            backend = None
+        file_format = call.data.get("format")
+        if file_format is not None and file_format not in EXPORT_FORMATS:
+            _LOGGER.warning("Unknown export format '%s', using the configured one", file_format)
+            file_format = None
         
         _LOGGER.info("Manual state export triggered to %s", output_path)
         
-        await export_states_internal(output_path, include_attributes, include_context)
+        await async_export_states(
+            hass, entry, output_path, include_attributes, include_context, backend, file_format
+        )
+
+    @callback
+    def handle_get_summary(call: ServiceCall) -> ServiceResponse:
+        """Return entity counts by domain, area, floor and device class."""
+        if (index := _async_get_index(hass, entry)) is None:
+            return {"total_entities": 0}
+        return index.async_summary()
+
+    @callback
+    def handle_query_states(call: ServiceCall) -> ServiceResponse:
+        """Return the entities matching the given filters from the live index."""
+        if (index := _async_get_index(hass, entry)) is None:
+            return {"count": 0, "entities": []}
+        
+        # Indexed filters (area and floor accept IDs or names)
+        filters: dict[str, list[str | None]] = {}
+        for key in (INDEX_DOMAIN, INDEX_DEVICE_CLASS, INDEX_STATE):
+            if key in call.data:
+                filters[key] = call.data[key]
+        if INDEX_AREA in call.data:
+            filters[INDEX_AREA] = index.async_resolve_area_ids(call.data[INDEX_AREA])
+        if INDEX_FLOOR in call.data:
+            filters[INDEX_FLOOR] = index.async_resolve_floor_ids(call.data[INDEX_FLOOR])
+        
+        entity_ids = index.async_query(filters)
+        
+        # Attribute filters are checked on the remaining candidates only
+        attribute_filters = call.data.get("attributes") or {}
+        include_attributes = call.data["include_attributes"]
+        matches = []
+        for entity_id in entity_ids:
+            if (state := hass.states.get(entity_id)) is None:
+                continue
+            if not all(
+                _attribute_matches(state.attributes.get(attribute), expected)
+                for attribute, expected in attribute_filters.items()
+            ):
+                continue
+            matches.append(state)
+        
+        matches.sort(key=lambda state: state.entity_id)
+        entities = []
+        for state in matches[: call.data["limit"]]:
+            indexed = index.async_get(state.entity_id)
+            entity_data = {
+                "entity_id": state.entity_id,
+                "state": state.state,
+                "friendly_name": state.attributes.get("friendly_name", ""),
+                "device_class": state.attributes.get("device_class", ""),
+                "unit": state.attributes.get("unit_of_measurement", ""),
+                "area": index.async_area_name(indexed.area_id if indexed else None),
+                "floor": index.async_floor_name(indexed.floor_id if indexed else None),
+                "last_changed": state.last_changed.isoformat(),
+            }
+            if include_attributes:
+                entity_data["attributes"] = {
+                    k: v
+                    for k, v in state.attributes.items()
+                    if k not in SKIPPED_ATTRIBUTES and not isinstance(v, (bytes, bytearray))
+                }
+            entities.append(entity_data)
+        
+        return {"count": len(matches), "entities": entities}
+
+    @callback
+    def handle_get_unavailable(call: ServiceCall) -> ServiceResponse:
+        """Return unavailable entities with durations and a pre-rendered digest."""
+        if (tracker := _async_get_unavailable_tracker(hass, entry)) is None:
+            return {"count": 0, "entities": [], "digest": ""}
+        
+        # Defaults come from the options (same selection as the binary sensor)
+        delay_hours = call.data.get(
+            "delay",
+            entry.options.get(CONF_UNAVAILABLE_NOTIFICATION_DELAY, DEFAULT_UNAVAILABLE_DELAY),
+        )
+        include_hidden = call.data.get(
+            "include_hidden",
+            entry.options.get(CONF_INCLUDE_HIDDEN_ENTITIES, DEFAULT_INCLUDE_HIDDEN_ENTITIES),
+        )
+        now = dt_util.utcnow()
+        unavailable = tracker.async_unavailable(
+            timedelta(hours=delay_hours), include_hidden, now
+        )
+        return {
+            "count": len(unavailable),
+            "entities": tracker.async_details(unavailable, now),
+            "digest": render_digest(unavailable, now),
+        }
+
+    @callback
+    def handle_get_health_log(call: ServiceCall) -> ServiceResponse:
+        """Return the logged health transitions, newest first."""
+        if (health_log := _async_get_health_log(hass, entry)) is None:
+            return {"count": 0, "transitions": []}
+        
+        # Times without a timezone are local times
+        start = call.data.get("start")
+        end = call.data.get("end")
+        transitions = health_log.async_query(
+            set(call.data["entity_id"]) if "entity_id" in call.data else None,
+            call.data.get("event"),
+            dt_util.as_utc(start) if start else None,
+            dt_util.as_utc(end) if end else None,
+            call.data["limit"],
+        )
+        return {"count": len(transitions), "transitions": transitions}
+
+    async def handle_profile(call: ServiceCall) -> ServiceResponse:
+        """Profile the next health updates and/or one export."""
+        if (metrics := _async_get_metrics(hass, entry)) is None:
+            return None
+        if metrics.profile is not None:
+            raise HomeAssistantError("A profile is already running")
+        
+        session = ProfileSession(call.data["health_updates"])
+        metrics.profile = session
+        try:
+            if call.data["export"]:
+                await async_export_states(
+                    hass,
+                    entry,
+                    entry.options.get(CONF_EXPORT_STATES_PATH, DEFAULT_EXPORT_STATES_PATH),
+                    profile=session,
+                )
+            try:
+                async with asyncio.timeout(call.data["timeout"]):
+                    await session.done.wait()
+            except TimeoutError:
+                _LOGGER.warning(
+                    "Profiled %d of %d health updates before the timeout",
+                    session.health_updates,
+                    call.data["health_updates"],
+                )
+        finally:
+            metrics.profile = None
+        
+        path = Path(
+            hass.config.path(f"{DOMAIN}_profile_{dt_util.now().strftime('%Y%m%d_%H%M%S')}")
+        )
+        paths = await hass.async_add_executor_job(session.write, path)
+        if paths is None:
+            _LOGGER.warning("Nothing was profiled")
+        else:
+            _LOGGER.info("Profile written to %s (summary in %s)", *paths)
+        if not call.return_response:
+            return None
+        return {
+            "health_updates": session.health_updates,
+            "exports": session.exports,
+            "profile_path": str(paths[0]) if paths else None,
+            "summary_path": str(paths[1]) if paths else None,
+        }
 
     # Register services
     hass.services.async_register(
@@ -237,53 +560,118 @@ async def async_setup_services(hass: HomeAssistant, entry: ConfigEntry) -> None:
         handle_export_states,
         schema=None,  # We'll add validation in services.yaml
     )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_SUMMARY,
+        handle_get_summary,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_STATES,
+        handle_query_states,
+        schema=QUERY_STATES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_UNAVAILABLE,
+        handle_get_unavailable,
+        schema=GET_UNAVAILABLE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HEALTH_LOG,
+        handle_get_health_log,
+        schema=GET_HEALTH_LOG_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        handle_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
 
-    # Set up automatic export if enabled
-    if export_enabled:
-        # Automatic export timer callback
-        @callback
-        async def _handle_automatic_export(now=None) -> None:
-            """Handle automatic state export."""
-            await export_states_internal(export_path)
-        
-        # Schedule initial export after startup delay
+    # Schedule the initial export after startup delay (only when booting)
+    if not hass.is_running:
         async def _schedule_initial_export(event) -> None:
             """Schedule the initial export after startup."""
-            _LOGGER.info("Scheduling initial state export in %s to %s", EXPORT_STARTUP_DELAY, export_path)
+            if not entry.options.get(CONF_EXPORT_STATES_ENABLED, DEFAULT_EXPORT_STATES_ENABLED):
+                return
+            _LOGGER.info("Scheduling initial state export in %s", EXPORT_STARTUP_DELAY)
             async_call_later(
                 hass,
                 EXPORT_STARTUP_DELAY.total_seconds(),
-                _handle_automatic_export,
+                partial(_async_handle_automatic_export, hass, entry),
             )
         
         # Listen for HA start event
         hass.bus.async_listen_once("homeassistant_started", _schedule_initial_export)
-        
-        # Set up periodic export timer
-        export_interval = timedelta(minutes=export_interval_minutes)
-        hass.data.setdefault(DOMAIN, {})
-        hass.data[DOMAIN]["export_timer_remove"] = async_track_time_interval(
-            hass,
-            _handle_automatic_export,
-            export_interval,
-        )
+    
+    # Set up periodic export timer
+    async_schedule_automatic_export(hass, entry)
+    
+    _LOGGER.info("Homebase42 services registered")
 
-        _LOGGER.info(
-            "Homebase42 services registered (automatic export every %d minutes to %s)",
-            export_interval_minutes,
-            export_path,
-        )
-    else:
-        _LOGGER.info("Homebase42 services registered (automatic export disabled)")
+
+async def _async_handle_automatic_export(
+    hass: HomeAssistant, entry: ConfigEntry, now=None
+) -> None:
+    """Handle automatic state export."""
+    await async_export_states(
+        hass,
+        entry,
+        entry.options.get(CONF_EXPORT_STATES_PATH, DEFAULT_EXPORT_STATES_PATH),
+    )
+
+
+@callback
+def async_schedule_automatic_export(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """(Re)schedule the automatic export from the current options."""
+    hass.data.setdefault(DOMAIN, {})
+    
+    # Cancel a previously scheduled timer
+    if (remove_timer := hass.data[DOMAIN].pop("export_timer_remove", None)) is not None:
+        remove_timer()
+    
+    options = entry.options
+    if not options.get(CONF_EXPORT_STATES_ENABLED, DEFAULT_EXPORT_STATES_ENABLED):
+        _LOGGER.info("Automatic export disabled")
+        return
+    
+    export_path = options.get(CONF_EXPORT_STATES_PATH, DEFAULT_EXPORT_STATES_PATH)
+    export_interval_minutes = options.get(CONF_EXPORT_STATES_INTERVAL, DEFAULT_EXPORT_STATES_INTERVAL)
+    hass.data[DOMAIN]["export_timer_remove"] = async_track_time_interval(
+        hass,
+        partial(_async_handle_automatic_export, hass, entry),
+        timedelta(minutes=export_interval_minutes),
+    )
+    
+    _LOGGER.info(
+        "Automatic export every %d minutes to %s",
+        export_interval_minutes,
+        export_path,
+    )
 
 
 async def async_unload_services(hass: HomeAssistant) -> None:
     """Unload Homebase42 services."""
     hass.services.async_remove(DOMAIN, SERVICE_EXPORT_STATES)
+    hass.services.async_remove(DOMAIN, SERVICE_GET_SUMMARY)
+    hass.services.async_remove(DOMAIN, SERVICE_QUERY_STATES)
+    hass.services.async_remove(DOMAIN, SERVICE_GET_UNAVAILABLE)
+    hass.services.async_remove(DOMAIN, SERVICE_GET_HEALTH_LOG)
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
     
     # Cancel automatic export timer if it exists
-    if DOMAIN in hass.data and "export_timer_remove" in hass.data[DOMAIN]:
-        hass.data[DOMAIN]["export_timer_remove"]()
+    if (remove_timer := hass.data.get(DOMAIN, {}).pop("export_timer_remove", None)) is not None:
+        remove_timer()
         _LOGGER.debug("Automatic export timer cancelled")
     
+    # Stop the export worker process if one was started
+    await _async_shutdown_export_pool(hass)
+    
     _LOGGER.info("Homebase42 services unloaded")
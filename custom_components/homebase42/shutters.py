@@ -0,0 +1,501 @@
+"""Shutter controller for Homebase42.
+
+Native replacement for the s42_cover_automation blueprint. The shutter/window
+sensor pairs are compiled into a map once, the controller only listens to the
+entities it needs and cover service calls issued in the same event loop
+iteration are sent as one call per service and position.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from datetime import datetime
+from functools import partial
+import logging
+from typing import Any
+
+from homeassistant.components.cover import ATTR_CURRENT_POSITION, ATTR_POSITION
+from homeassistant.components.cover import DOMAIN as COVER_DOMAIN
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    SERVICE_CLOSE_COVER,
+    SERVICE_OPEN_COVER,
+    SERVICE_SET_COVER_POSITION,
+    STATE_CLOSED,
+    STATE_OFF,
+    STATE_ON,
+    STATE_OPEN,
+    UnitOfSpeed,
+)
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import area_registry as ar, device_registry as dr, entity_registry as er
+from homeassistant.helpers.event import (
+    async_call_later,
+    async_track_state_change_event,
+    async_track_time_change,
+)
+from homeassistant.util import slugify
+from homeassistant.util.unit_conversion import SpeedConverter
+
+from .const import (
+    CONF_SHUTTER_COVERS,
+    CONF_SHUTTER_WINDOW_SENSORS,
+    CONF_SHUTTER_MORNING_TIME,
+    CONF_SHUTTER_MORNING_COVERS,
+    CONF_SHUTTER_MORNING_POSITION,
+    CONF_SHUTTER_TILTED_POSITION,
+    CONF_SHUTTER_RECLOSE_TIMEOUT,
+    CONF_SHUTTER_FORCE_CLOSE,
+    CONF_SHUTTER_WEATHER_ENTITY,
+    CONF_SHUTTER_WIND_THRESHOLD,
+    CONF_SHUTTER_PANZER_MODE,
+    CONF_SHUTTER_FORCE_STORM_ACTION,
+    CONF_SHUTTER_NIGHT_MODE,
+    CONF_SHUTTER_NOTIFY_DEVICES,
+    CONF_SHUTTER_NOTIFY_TIMEOUT,
+    CONF_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+    CONF_SHUTTER_USE_AREA_NAME,
+    CONF_SHUTTER_SLEEP_MODE,
+    DEFAULT_WEATHER_ENTITY,
+    DEFAULT_SHUTTER_MORNING_POSITION,
+    DEFAULT_SHUTTER_TILTED_POSITION,
+    DEFAULT_SHUTTER_RECLOSE_TIMEOUT,
+    DEFAULT_SHUTTER_WIND_THRESHOLD,
+    DEFAULT_SHUTTER_NOTIFY_TIMEOUT,
+    DEFAULT_SHUTTER_NOTIFY_TIMEOUT_TILTED,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Window sensor states (binary_sensor on/off or a sensor with open/tilted/closed)
+WINDOW_OPEN_STATES = (STATE_ON, STATE_OPEN)
+WINDOW_TILTED = "tilted"
+WINDOW_CLOSED_STATES = (STATE_OFF, STATE_CLOSED)
+
+# Seconds a window has to stay open or tilted before the shutter moves
+WINDOW_DEBOUNCE = 2
+# Position for the night when the window is fully open
+NIGHT_OPEN_WINDOW_POSITION = 15
+
+ATTR_WIND_SPEED = "wind_speed"
+ATTR_WIND_SPEED_UNIT = "wind_speed_unit"
+
+EVENT_NOTIFICATION_ACTION = "mobile_app_notification_action"
+NOTIFICATION_ACTION_PREFIX = "CLOSE_SHUTTER__"
+
+# (service, position) of a queued cover command
+Command = tuple[str, int | None]
+
+
+def _position(state: State | None) -> int | None:
+    """Return the current position of a cover."""
+    if state is None:
+        return None
+    try:
+        return int(state.attributes[ATTR_CURRENT_POSITION])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _wind_speed(state: State | None) -> float | None:
+    """Return the wind speed of a weather entity in km/h."""
+    if state is None:
+        return None
+    try:
+        wind_speed = float(state.attributes[ATTR_WIND_SPEED])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if (unit := state.attributes.get(ATTR_WIND_SPEED_UNIT)) and (
+        unit != UnitOfSpeed.KILOMETERS_PER_HOUR
+    ):
+        try:
+            return SpeedConverter.convert(wind_speed, unit, UnitOfSpeed.KILOMETERS_PER_HOUR)
+        except HomeAssistantError:
+            pass
+    return wind_speed
+
+
+class ShutterController:
+    """Control shutters from window sensors, time, night mode and wind."""
+
+    def __init__(self, hass: HomeAssistant, options: Mapping[str, Any]) -> None:
+        """Compile the options."""
+        self.hass = hass
+        covers: list[str] = options.get(CONF_SHUTTER_COVERS, [])
+        sensors: list[str] = options.get(CONF_SHUTTER_WINDOW_SENSORS, [])
+        # Pairs are matched by position (both lists have the same length)
+        self._shutter_by_sensor: dict[str, str] = dict(zip(sensors, covers))
+
+        self._morning_time: str | None = options.get(CONF_SHUTTER_MORNING_TIME)
+        self._morning_covers: list[str] = options.get(CONF_SHUTTER_MORNING_COVERS, [])
+        self._morning_position: int = int(
+            options.get(CONF_SHUTTER_MORNING_POSITION, DEFAULT_SHUTTER_MORNING_POSITION)
+        )
+        self._tilted_position: int = int(
+            options.get(CONF_SHUTTER_TILTED_POSITION, DEFAULT_SHUTTER_TILTED_POSITION)
+        )
+        self._reclose_timeout: float = 60 * options.get(
+            CONF_SHUTTER_RECLOSE_TIMEOUT, DEFAULT_SHUTTER_RECLOSE_TIMEOUT
+        )
+        self._force_close: bool = options.get(CONF_SHUTTER_FORCE_CLOSE, False)
+        self._weather_entity: str = options.get(
+            CONF_SHUTTER_WEATHER_ENTITY, DEFAULT_WEATHER_ENTITY
+        )
+        self._wind_threshold: float = options.get(
+            CONF_SHUTTER_WIND_THRESHOLD, DEFAULT_SHUTTER_WIND_THRESHOLD
+        )
+        self._panzer_mode: bool = options.get(CONF_SHUTTER_PANZER_MODE, False)
+        self._force_storm_action: bool = options.get(CONF_SHUTTER_FORCE_STORM_ACTION, False)
+        self._night_mode: str | None = options.get(CONF_SHUTTER_NIGHT_MODE)
+        self._notify_devices: list[str] = options.get(CONF_SHUTTER_NOTIFY_DEVICES, [])
+        self._notify_timeouts: dict[bool, float] = {
+            # tilted -> minutes
+            False: options.get(CONF_SHUTTER_NOTIFY_TIMEOUT, DEFAULT_SHUTTER_NOTIFY_TIMEOUT),
+            True: options.get(
+                CONF_SHUTTER_NOTIFY_TIMEOUT_TILTED, DEFAULT_SHUTTER_NOTIFY_TIMEOUT_TILTED
+            ),
+        }
+        self._use_area_name: bool = options.get(CONF_SHUTTER_USE_AREA_NAME, False)
+        self._sleep_mode: str | None = options.get(CONF_SHUTTER_SLEEP_MODE)
+
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._unsub_morning: CALLBACK_TYPE | None = None
+        # Per window sensor timers
+        self._window_timers: dict[str, CALLBACK_TYPE] = {}
+        self._notify_timers: dict[str, CALLBACK_TYPE] = {}
+        self._reclose_timers: dict[str, CALLBACK_TYPE] = {}
+        # Shutter -> (state, position) before it was moved for an open window
+        self._snapshots: dict[str, tuple[str, int | None]] = {}
+        self._storm = False
+        # Commands collected in the current loop iteration (last one per shutter wins)
+        self._pending: dict[str, Command] = {}
+        self._flush_handle: asyncio.Handle | None = None
+
+    @property
+    def shutters(self) -> dict[str, str]:
+        """Return the shutter of every window sensor."""
+        return self._shutter_by_sensor
+
+    @callback
+    def async_setup(self) -> None:
+        """Start listening to the configured entities."""
+        if self._shutter_by_sensor:
+            self._unsubs.append(
+                async_track_state_change_event(
+                    self.hass, list(self._shutter_by_sensor), self._async_window_changed
+                )
+            )
+        if self._night_mode:
+            self._unsubs.append(
+                async_track_state_change_event(
+                    self.hass, [self._night_mode], self._async_night_mode_changed
+                )
+            )
+        if self._shutter_by_sensor and self._weather_entity:
+            # Only a rising edge above the threshold triggers the storm protection
+            wind_speed = _wind_speed(self.hass.states.get(self._weather_entity))
+            self._storm = wind_speed is not None and wind_speed > self._wind_threshold
+            self._unsubs.append(
+                async_track_state_change_event(
+                    self.hass, [self._weather_entity], self._async_weather_changed
+                )
+            )
+        if self._morning_time and self._morning_covers:
+            self._async_schedule_morning()
+            self._unsubs.append(
+                async_track_state_change_event(
+                    self.hass, [self._morning_time], self._async_morning_time_changed
+                )
+            )
+        if self._notify_devices:
+            self._unsubs.append(
+                self.hass.bus.async_listen(
+                    EVENT_NOTIFICATION_ACTION, self._async_notification_action
+                )
+            )
+        _LOGGER.debug("Shutter controller started for %d shutters", len(self._shutter_by_sensor))
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop listening and cancel all timers."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+        if self._unsub_morning is not None:
+            self._unsub_morning()
+            self._unsub_morning = None
+        for timers in (self._window_timers, self._notify_timers, self._reclose_timers):
+            for cancel in timers.values():
+                cancel()
+            timers.clear()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending.clear()
+
+    @callback
+    def _async_queue(self, shutter: str, service: str, position: int | None = None) -> None:
+        """Queue a cover command, all commands are sent at the end of the loop iteration."""
+        self._pending[shutter] = (service, position)
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_soon(self._async_flush)
+
+    @callback
+    def _async_flush(self) -> None:
+        """Send the queued commands, one service call per service and position."""
+        self._flush_handle = None
+        batches: dict[Command, list[str]] = {}
+        for shutter, command in self._pending.items():
+            batches.setdefault(command, []).append(shutter)
+        self._pending.clear()
+
+        for (service, position), shutters in batches.items():
+            data: dict[str, Any] = {ATTR_ENTITY_ID: shutters}
+            if position is not None:
+                data[ATTR_POSITION] = position
+            _LOGGER.debug("%s.%s %s", COVER_DOMAIN, service, data)
+            self.hass.async_create_task(self._async_call(COVER_DOMAIN, service, data))
+
+    @callback
+    def _async_cancel(self, timers: dict[str, CALLBACK_TYPE], sensor: str) -> None:
+        """Cancel a timer of a window sensor."""
+        if (cancel := timers.pop(sensor, None)) is not None:
+            cancel()
+
+    @callback
+    def _async_window_changed(self, event: Event) -> None:
+        """Handle a window sensor change."""
+        sensor: str = event.data["entity_id"]
+        if (new_state := event.data.get("new_state")) is None:
+            return
+        # Only attributes changed: no transition, the timers keep running
+        # (like the to:/for: triggers of the blueprint)
+        if (old_state := event.data.get("old_state")) is not None and (
+            old_state.state == new_state.state
+        ):
+            return
+        state = new_state.state
+
+        # Every change of the state restarts the "for" timers
+        self._async_cancel(self._window_timers, sensor)
+        self._async_cancel(self._notify_timers, sensor)
+
+        if state in WINDOW_CLOSED_STATES:
+            # Closed again within the reclose timeout: back to the previous position
+            if (cancel := self._reclose_timers.pop(sensor, None)) is not None:
+                cancel()
+                self._async_restore(self._shutter_by_sensor[sensor])
+            return
+
+        tilted = state == WINDOW_TILTED
+        if not tilted and state not in WINDOW_OPEN_STATES:
+            return
+
+        self._window_timers[sensor] = async_call_later(
+            self.hass, WINDOW_DEBOUNCE, partial(self._async_window_opened, sensor, tilted)
+        )
+        if self._notify_devices:
+            self._notify_timers[sensor] = async_call_later(
+                self.hass,
+                60 * self._notify_timeouts[tilted],
+                partial(self._async_notify_window, sensor, tilted),
+            )
+
+    @callback
+    def _async_window_opened(self, sensor: str, tilted: bool, now: datetime) -> None:
+        """Move the shutter of a window that has been opened or tilted."""
+        self._window_timers.pop(sensor, None)
+        shutter = self._shutter_by_sensor[sensor]
+        shutter_state = self.hass.states.get(shutter)
+
+        # Keep the position from before the window was opened (open -> tilted -> open)
+        if (cancel := self._reclose_timers.pop(sensor, None)) is not None:
+            cancel()
+        elif shutter_state is not None:
+            self._snapshots[shutter] = (shutter_state.state, _position(shutter_state))
+
+        if tilted:
+            position = _position(shutter_state)
+            if position is not None and position < self._tilted_position:
+                self._async_queue(shutter, SERVICE_SET_COVER_POSITION, self._tilted_position)
+        else:
+            self._async_queue(shutter, SERVICE_OPEN_COVER)
+
+        self._reclose_timers[sensor] = async_call_later(
+            self.hass, self._reclose_timeout, partial(self._async_reclose_timeout, sensor)
+        )
+
+    @callback
+    def _async_reclose_timeout(self, sensor: str, now: datetime) -> None:
+        """Handle a window that was not closed within the reclose timeout."""
+        self._reclose_timers.pop(sensor, None)
+        shutter = self._shutter_by_sensor[sensor]
+        self._snapshots.pop(shutter, None)
+        if self._force_close:
+            self._async_queue(shutter, SERVICE_CLOSE_COVER)
+
+    @callback
+    def _async_restore(self, shutter: str) -> None:
+        """Move a shutter back to its snapshot."""
+        if (snapshot := self._snapshots.pop(shutter, None)) is None:
+            return
+        state, position = snapshot
+        if position is not None:
+            self._async_queue(shutter, SERVICE_SET_COVER_POSITION, position)
+        elif state == STATE_CLOSED:
+            self._async_queue(shutter, SERVICE_CLOSE_COVER)
+        elif state == STATE_OPEN:
+            self._async_queue(shutter, SERVICE_OPEN_COVER)
+
+    @callback
+    def _async_night_mode_changed(self, event: Event) -> None:
+        """Close the shutters for the night (windows that are open only partly)."""
+        new_state = event.data.get("new_state")
+        old_state = event.data.get("old_state")
+        if new_state is None or new_state.state != STATE_ON:
+            return
+        if old_state is not None and old_state.state == STATE_ON:
+            return
+
+        for sensor, shutter in self._shutter_by_sensor.items():
+            window = self.hass.states.get(sensor)
+            window_state = window.state if window else None
+            if window_state == WINDOW_TILTED:
+                self._async_queue(shutter, SERVICE_SET_COVER_POSITION, self._tilted_position)
+            elif window_state in WINDOW_OPEN_STATES:
+                self._async_queue(
+                    shutter, SERVICE_SET_COVER_POSITION, NIGHT_OPEN_WINDOW_POSITION
+                )
+            else:
+                self._async_queue(shutter, SERVICE_CLOSE_COVER)
+
+    @callback
+    def _async_weather_changed(self, event: Event) -> None:
+        """Open (or in panzer mode close) the shutters when the wind gets too strong."""
+        wind_speed = _wind_speed(event.data.get("new_state"))
+        storm = wind_speed is not None and wind_speed > self._wind_threshold
+        if storm == self._storm:
+            return
+        self._storm = storm
+        if not storm:
+            return
+
+        _LOGGER.info("Wind speed %.0f km/h, storm protection triggered", wind_speed)
+        service = SERVICE_CLOSE_COVER if self._panzer_mode else SERVICE_OPEN_COVER
+        for sensor, shutter in self._shutter_by_sensor.items():
+            window = self.hass.states.get(sensor)
+            if self._force_storm_action or (
+                window is not None and window.state in WINDOW_CLOSED_STATES
+            ):
+                self._async_queue(shutter, service)
+
+    @callback
+    def _async_schedule_morning(self) -> None:
+        """Schedule the morning opening from the time of the input_datetime helper."""
+        if self._unsub_morning is not None:
+            self._unsub_morning()
+            self._unsub_morning = None
+        if (state := self.hass.states.get(self._morning_time)) is None:
+            return
+        try:
+            hour = int(state.attributes["hour"])
+            minute = int(state.attributes["minute"])
+            second = int(state.attributes.get("second", 0))
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.warning("%s has no time, morning opening disabled", self._morning_time)
+            return
+        self._unsub_morning = async_track_time_change(
+            self.hass, self._async_morning, hour=hour, minute=minute, second=second
+        )
+
+    @callback
+    def _async_morning_time_changed(self, event: Event) -> None:
+        """Reschedule the morning opening when the helper changes."""
+        # The state holds the time, attribute-only changes keep the schedule
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+        if old_state is not None and new_state is not None and old_state.state == new_state.state:
+            return
+        self._async_schedule_morning()
+
+    @callback
+    def _async_morning(self, now: datetime) -> None:
+        """Open the morning shutters that are more closed than the morning position."""
+        for shutter in self._morning_covers:
+            position = _position(self.hass.states.get(shutter))
+            if position is not None and position < self._morning_position:
+                self._async_queue(shutter, SERVICE_SET_COVER_POSITION, self._morning_position)
+
+    @callback
+    def _async_notification_action(self, event: Event) -> None:
+        """Close a shutter from the action of a window notification."""
+        action: str = event.data.get("action") or ""
+        if not action.startswith(NOTIFICATION_ACTION_PREFIX):
+            return
+        sensor = action.removeprefix(NOTIFICATION_ACTION_PREFIX)
+        if (shutter := self._shutter_by_sensor.get(sensor)) is not None:
+            self._async_queue(shutter, SERVICE_CLOSE_COVER)
+
+    @callback
+    def _async_area_name(self, entity_id: str) -> str | None:
+        """Return the area name of an entity (or its device)."""
+        if (entity_entry := er.async_get(self.hass).async_get(entity_id)) is None:
+            return None
+        area_id = entity_entry.area_id
+        if not area_id and entity_entry.device_id:
+            if device := dr.async_get(self.hass).async_get(entity_entry.device_id):
+                area_id = device.area_id
+        if area_id and (area := ar.async_get(self.hass).async_get_area(area_id)):
+            return area.name
+        return None
+
+    @callback
+    def _async_notify_window(self, sensor: str, tilted: bool, now: datetime) -> None:
+        """Notify that a window is open or tilted for too long."""
+        self._notify_timers.pop(sensor, None)
+        if self._sleep_mode and (sleep := self.hass.states.get(self._sleep_mode)):
+            if sleep.state == STATE_ON:
+                return
+
+        timeout = self._notify_timeouts[tilted]
+        what = "gekippt" if tilted else "offen"
+        area_name = self._async_area_name(sensor) if self._use_area_name else None
+        if area_name:
+            title = f"Fenster {what} in {area_name}"
+            message = (
+                f"Das Fenster im Bereich '{area_name}' ist seit über {timeout} Minuten {what}."
+            )
+        else:
+            window = self.hass.states.get(sensor)
+            title = f"Fenster {what}"
+            message = (
+                f"Fenster '{window.name if window else sensor}' ist seit über "
+                f"{timeout} Minuten {what}."
+            )
+
+        data = {
+            "title": title,
+            "message": message,
+            "data": {
+                "actions": [
+                    {
+                        "action": f"{NOTIFICATION_ACTION_PREFIX}{sensor}",
+                        "title": "Rollladen schließen",
+                    }
+                ]
+            },
+        }
+        device_reg = dr.async_get(self.hass)
+        for device_id in self._notify_devices:
+            if (device := device_reg.async_get(device_id)) is None:
+                continue
+            service = f"mobile_app_{slugify(device.name or '')}"
+            self.hass.async_create_task(self._async_call("notify", service, data))
+
+    async def _async_call(self, domain: str, service: str, data: dict[str, Any]) -> None:
+        """Call a service without waiting for it, logging failures."""
+        try:
+            await self.hass.services.async_call(domain, service, data)
+        except HomeAssistantError as err:
+            _LOGGER.warning("Failed to call %s.%s: %s", domain, service, err)
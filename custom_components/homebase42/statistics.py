@@ -0,0 +1,229 @@
+"""Long-term statistics for Homebase42.
+
+The health counts (unavailable entities and low batteries) are sampled every
+few minutes and written once per hour as external statistics (min, max and
+mean), in total and broken down by area and by integration. Dashboards read
+these pre-aggregated rows instead of scanning the state history.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_DEVICE_CLASS, STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_track_utc_time_change
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    DOMAIN,
+    NAME,
+    CONF_BATTERY_CRITICAL_THRESHOLD,
+    CONF_BATTERY_LOW_THRESHOLD,
+    CONF_INCLUDE_HIDDEN_ENTITIES,
+    CONF_UNAVAILABLE_NOTIFICATION_DELAY,
+    DEFAULT_BATTERY_CRITICAL,
+    DEFAULT_BATTERY_LOW,
+    DEFAULT_INCLUDE_HIDDEN_ENTITIES,
+    DEFAULT_UNAVAILABLE_DELAY,
+)
+from .battery import BatteryTracker
+from .health import UnavailableTracker
+from .index import EntityIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+# Minutes between two samples (every 5 minutes, like the count sensors)
+SAMPLE_MINUTES = "/5"
+
+METRIC_UNAVAILABLE = "unavailable"
+METRIC_BATTERY_LOW = "battery_low"
+METRIC_NAMES = {
+    METRIC_UNAVAILABLE: "Nicht verfügbare Entitäten",
+    METRIC_BATTERY_LOW: "Niedrige Batterien",
+}
+
+
+@dataclass(slots=True)
+class HourlyAggregate:
+    """Min, max and sum of the samples of a statistic in the current hour."""
+
+    min: int
+    max: int
+    total: int
+
+
+class HealthStatistics:
+    """Write hourly statistics of the health counts."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the statistics."""
+        self.hass = hass
+        self._entry = entry
+        self._index: EntityIndex = hass.data[DOMAIN][entry.entry_id]["index"]
+        self._tracker: UnavailableTracker = hass.data[DOMAIN][entry.entry_id]["unavailable"]
+        self._batteries: BatteryTracker = hass.data[DOMAIN][entry.entry_id]["batteries"]
+        self._entity_reg = er.async_get(hass)
+        self._hour: datetime | None = None
+        self._samples = 0
+        # statistic_id -> aggregate of the current hour
+        self._aggregates: dict[str, HourlyAggregate] = {}
+        # statistic_id -> name, for every statistic written since setup
+        self._names: dict[str, str] = {}
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_setup(self) -> None:
+        """Start sampling if the recorder is available."""
+        if "recorder" not in self.hass.config.components:
+            _LOGGER.debug("Recorder is not loaded, no health statistics")
+            return
+        self._unsub = async_track_utc_time_change(
+            self.hass, self._async_sample, minute=SAMPLE_MINUTES, second=0
+        )
+        self._async_sample()
+
+    @callback
+    def async_unload(self) -> None:
+        """Stop sampling (the samples of the current hour are dropped)."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @property
+    def size(self) -> int:
+        """Return the number of statistics."""
+        return len(self._names)
+
+    @callback
+    def _async_sample(self, now: datetime | None = None) -> None:
+        """Add the current counts to the aggregates of the hour."""
+        now = now or dt_util.utcnow()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        if self._hour is not None and hour != self._hour:
+            self._async_write()
+        self._hour = hour
+
+        # Statistics written before continue with 0 instead of leaving gaps
+        counts = dict.fromkeys(self._names, 0)
+        counts.update(self._async_counts())
+        for statistic_id, count in counts.items():
+            if (aggregate := self._aggregates.get(statistic_id)) is None:
+                # Earlier samples of this hour were 0
+                self._aggregates[statistic_id] = HourlyAggregate(
+                    min=count if not self._samples else 0, max=count, total=count
+                )
+                continue
+            aggregate.min = min(aggregate.min, count)
+            aggregate.max = max(aggregate.max, count)
+            aggregate.total += count
+        self._samples += 1
+
+    @callback
+    def _async_counts(self) -> dict[str, int]:
+        """Return the current counts in total, by area and by integration."""
+        options = self._entry.options
+        include_hidden = options.get(
+            CONF_INCLUDE_HIDDEN_ENTITIES, DEFAULT_INCLUDE_HIDDEN_ENTITIES
+        )
+        counts: dict[str, int] = {}
+
+        # Same selection as the count sensors
+        delay = timedelta(
+            hours=options.get(CONF_UNAVAILABLE_NOTIFICATION_DELAY, DEFAULT_UNAVAILABLE_DELAY)
+        )
+        self._async_count_metric(counts, METRIC_UNAVAILABLE)
+        for entity_id, _ in self._tracker.async_unavailable(delay, include_hidden):
+            self._async_count(counts, METRIC_UNAVAILABLE, entity_id)
+
+        low = options.get(CONF_BATTERY_LOW_THRESHOLD, DEFAULT_BATTERY_LOW)
+        critical = options.get(CONF_BATTERY_CRITICAL_THRESHOLD, DEFAULT_BATTERY_CRITICAL)
+        self._async_count_metric(counts, METRIC_BATTERY_LOW)
+        # Only the batteries of the tracker, excluded ones are never tracked
+        for entity_id in self._batteries.async_batteries():
+            state = self.hass.states.get(entity_id)
+            if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+                continue
+            if state.attributes.get(ATTR_DEVICE_CLASS) != "battery":
+                continue
+            if not include_hidden and (
+                entity_entry := self._entity_reg.async_get(entity_id)
+            ) and entity_entry.hidden_by is not None:
+                continue
+            try:
+                level = float(state.state)
+            except ValueError:
+                continue
+            if critical < level <= low:
+                self._async_count(counts, METRIC_BATTERY_LOW, entity_id)
+        return counts
+
+    @callback
+    def _async_count_metric(self, counts: dict[str, int], metric: str) -> None:
+        """Add the total of a metric (also when it is 0)."""
+        statistic_id = f"{DOMAIN}:{metric}"
+        counts.setdefault(statistic_id, 0)
+        self._names.setdefault(statistic_id, f"{NAME} {METRIC_NAMES[metric]}")
+
+    @callback
+    def _async_count(self, counts: dict[str, int], metric: str, entity_id: str) -> None:
+        """Count an entity in the total, its area and its integration."""
+        counts[f"{DOMAIN}:{metric}"] += 1
+
+        indexed = self._index.async_get(entity_id)
+        area_id = indexed.area_id if indexed else None
+        statistic_id = f"{DOMAIN}:{metric}_area_{slugify(area_id or 'none')}"
+        counts[statistic_id] = counts.get(statistic_id, 0) + 1
+        if statistic_id not in self._names:
+            area_name = self._index.async_area_name(area_id)
+            self._names[statistic_id] = f"{NAME} {METRIC_NAMES[metric]} ({area_name})"
+
+        entity_entry = self._entity_reg.async_get(entity_id)
+        platform = entity_entry.platform if entity_entry else "none"
+        statistic_id = f"{DOMAIN}:{metric}_integration_{slugify(platform)}"
+        counts[statistic_id] = counts.get(statistic_id, 0) + 1
+        if statistic_id not in self._names:
+            self._names[statistic_id] = f"{NAME} {METRIC_NAMES[metric]} ({platform})"
+
+    @callback
+    def _async_write(self) -> None:
+        """Write the aggregates of the finished hour to the recorder."""
+        # Imported here, the recorder is only needed once statistics are written
+        from homeassistant.components.recorder.models import (
+            StatisticData,
+            StatisticMetaData,
+        )
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        if self._hour is None or not self._samples:
+            return
+        for statistic_id, aggregate in self._aggregates.items():
+            async_add_external_statistics(
+                self.hass,
+                StatisticMetaData(
+                    has_mean=True,
+                    has_sum=False,
+                    name=self._names[statistic_id],
+                    source=DOMAIN,
+                    statistic_id=statistic_id,
+                    unit_of_measurement="entities",
+                ),
+                [
+                    StatisticData(
+                        start=self._hour,
+                        mean=aggregate.total / self._samples,
+                        min=aggregate.min,
+                        max=aggregate.max,
+                    )
+                ],
+            )
+        _LOGGER.debug(
+            "Wrote %d health statistics for %s", len(self._aggregates), self._hour
+        )
+        self._aggregates = {}
+        self._samples = 0
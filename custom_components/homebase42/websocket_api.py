@@ -0,0 +1,64 @@
+"""Websocket API of the Homebase42 integration.
+
+homebase42/health/subscribe streams the entity sets of the health entities:
+first all sets, then only the entities added to or removed from a set. A
+dashboard watching the health entities on a large installation gets a few
+bytes per change instead of the whole entities attribute with every state.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, HEALTH_SETS
+from .health import HealthSets
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe_health)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "homebase42/health/subscribe",
+        vol.Optional("sets"): vol.All([vol.In(HEALTH_SETS)], vol.Length(min=1)),
+    }
+)
+@callback
+def websocket_subscribe_health(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Send the health sets, then the changes of the sets.
+
+    The first event is {"sets": {name: [entity_id, ...]}}, every further
+    event {"set": name, "added": [...], "removed": [...]}.
+    """
+    health_sets: HealthSets = hass.data[DOMAIN]["health_sets"]
+    names = set(msg.get("sets", HEALTH_SETS))
+
+    @callback
+    def _async_forward(name: str, added: list[str], removed: list[str]) -> None:
+        if name not in names:
+            return
+        connection.send_message(
+            websocket_api.event_message(
+                msg["id"], {"set": name, "added": added, "removed": removed}
+            )
+        )
+
+    connection.subscriptions[msg["id"]] = health_sets.async_subscribe(_async_forward)
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(
+            msg["id"],
+            {"sets": {name: health_sets.async_get(name) for name in HEALTH_SETS if name in names}},
+        )
+    )